@@ -24,9 +24,11 @@ from google.genai import types
 
 from google.adk.agents import Agent
 from google.adk.agents.callback_context import CallbackContext
+from google.adk.agents.readonly_context import ReadonlyContext
 from google.adk.tools import load_artifacts
 
 from .sub_agents import bqml_agent
+from .sub_agents.bigquery.schema_index import prune_schema
 from .sub_agents.bigquery.tools import (
     get_database_settings as get_bq_database_settings,
 )
@@ -42,7 +44,6 @@ date_today = date.today()
 
 def setup_before_agent_call(callback_context: CallbackContext):
     """Setup the agent."""
-    current_date = date.today() # Get current date inside the callback
 
     # setting up database settings in session.state
     if "database_settings" not in callback_context.state:
@@ -50,35 +51,46 @@ def setup_before_agent_call(callback_context: CallbackContext):
         db_settings["use_database"] = "BigQuery"
         callback_context.state["all_db_settings"] = db_settings
 
-    # setting up schema in instruction
-    # The agent's base instruction is set during Agent initialization.
-    # We will prepend the date and append the schema to it.
-    current_agent_instruction = callback_context._invocation_context.agent.instruction
-    if not current_agent_instruction: # Should be set from Agent constructor
-        current_agent_instruction = return_instructions_root()
-
-    # Prepend date
-    dated_instruction = (
-        f"Today's date is: {current_date}.\n\n"
-        f"{current_agent_instruction}"
-    )
-
+    # setting up the schema for the instruction
     if callback_context.state["all_db_settings"]["use_database"] == "BigQuery":
         callback_context.state["database_settings"] = get_bq_database_settings()
-        schema = callback_context.state["database_settings"]["bq_ddl_schema"]
-        final_instruction = (
-            dated_instruction
-            + f"""
+        # Only the tables relevant to the user's message, so the instruction
+        # size does not grow with the dataset
+        user_content = callback_context.user_content
+        parts = user_content.parts if user_content and user_content.parts else []
+        question = " ".join(part.text for part in parts if part.text)
+        callback_context.state["relevant_schema"] = prune_schema(
+            callback_context.state["database_settings"]["bq_ddl_schema"], question
+        )
+
+
+def root_instruction(context: ReadonlyContext) -> str:
+    """Builds the instruction of the root agent for the current turn.
+
+    The agent is shared by all sessions, so the instruction is rebuilt from
+    return_instructions_root() and the session state on every call instead of
+    being stored on the agent.
+
+    Args:
+        context (ReadonlyContext): The context of the invocation.
+
+    Returns:
+        str: The root instruction with today's date and the relevant schema.
+    """
+    instruction = (
+        f"Today's date is: {date.today()}.\n\n"
+        f"{return_instructions_root()}"
+    )
+
+    schema = context.state.get("relevant_schema")
+    if schema is not None:
+        instruction += f"""
 
     --------- The BigQuery schema of the relevant data with a few sample rows. ---------
     {schema}
 
     """
-        )
-        callback_context._invocation_context.agent.instruction = final_instruction
-    else:
-        callback_context._invocation_context.agent.instruction = dated_instruction
-
+    return instruction
 
 
 TARGET_FOLDER_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "/")
@@ -87,7 +99,7 @@ TARGET_FOLDER_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "/
 data_science_agent = Agent(
     model=os.getenv("ROOT_AGENT_MODEL", "gemini-1.5-flash-latest"),
     name="db_ds_multiagent",
-    instruction=return_instructions_root(), # Initial instruction
+    instruction=root_instruction, # Rebuilt for every turn from the session state
     global_instruction=( # Static global instruction
         f"""
         You are a Data Science and Data Analytics Multi Agent System.
@@ -20,6 +20,8 @@ import os
 from google.adk.tools import ToolContext
 
 # pylint: disable=g-importing-member
+from ..nl2sql_cache import cached_nl2sql
+from ..schema_index import prune_schema
 from .dc_prompt_template import DC_PROMPT_TEMPLATE
 from .llm_utils import GeminiModel
 from .qp_prompt_template import QP_PROMPT_TEMPLATE
@@ -93,7 +95,7 @@ def initial_bq_nl2sql(
       str: An SQL statement to answer this question.
     """
     print("****** Running agent with ChaseSQL algorithm.")
-    ddl_schema = tool_context.state["database_settings"]["bq_ddl_schema"]
+    full_ddl_schema = tool_context.state["database_settings"]["bq_ddl_schema"]
     project = tool_context.state["database_settings"]["bq_project_id"]
     db = tool_context.state["database_settings"]["bq_dataset_id"]
     transpile_to_bigquery = tool_context.state["database_settings"][
@@ -108,40 +110,52 @@ def initial_bq_nl2sql(
     number_of_candidates = tool_context.state["database_settings"][
         "number_of_candidates"
     ]
-    model = tool_context.state["database_settings"]["model"]
+    model_name = tool_context.state["database_settings"]["model"]
     temperature = tool_context.state["database_settings"]["temperature"]
     generate_sql_type = tool_context.state["database_settings"]["generate_sql_type"]
 
-    if generate_sql_type == GenerateSQLType.DC.value:
-        prompt = DC_PROMPT_TEMPLATE.format(
-            SCHEMA=ddl_schema, QUESTION=question, BQ_PROJECT_ID=BQ_PROJECT_ID
-        )
-    elif generate_sql_type == GenerateSQLType.QP.value:
-        prompt = QP_PROMPT_TEMPLATE.format(
-            SCHEMA=ddl_schema, QUESTION=question, BQ_PROJECT_ID=BQ_PROJECT_ID
-        )
-    else:
-        raise ValueError(f"Unsupported generate_sql_type: {generate_sql_type}")
-
-    model = GeminiModel(model_name=model, temperature=temperature)
-    requests = [prompt for _ in range(number_of_candidates)]
-    responses = model.call_parallel(requests, parser_func=parse_response)
-    # Take just the first response.
-    responses = responses[0]
-
-    # If postprocessing of the SQL to transpile it to BigQuery is required,
-    # then do it here.
-    if transpile_to_bigquery:
-        translator = sql_translator.SqlTranslator(
-            model=model,
-            temperature=temperature,
-            process_input_errors=process_input_errors,
-            process_tool_output_errors=process_tool_output_errors,
-        )
-        # pylint: disable=g-bad-todo
-        # pylint: enable=g-bad-todo
-        responses: str = translator.translate(
-            responses, ddl_schema=ddl_schema, db=db, catalog=project
-        )
-
-    return responses
+    def generate_sql():
+        ddl_schema = prune_schema(full_ddl_schema, question)
+
+        if generate_sql_type == GenerateSQLType.DC.value:
+            prompt = DC_PROMPT_TEMPLATE.format(
+                SCHEMA=ddl_schema, QUESTION=question, BQ_PROJECT_ID=BQ_PROJECT_ID
+            )
+        elif generate_sql_type == GenerateSQLType.QP.value:
+            prompt = QP_PROMPT_TEMPLATE.format(
+                SCHEMA=ddl_schema, QUESTION=question, BQ_PROJECT_ID=BQ_PROJECT_ID
+            )
+        else:
+            raise ValueError(f"Unsupported generate_sql_type: {generate_sql_type}")
+
+        model = GeminiModel(model_name=model_name, temperature=temperature)
+        requests = [prompt for _ in range(number_of_candidates)]
+        responses = model.call_parallel(requests, parser_func=parse_response)
+        # Take just the first response.
+        responses = responses[0]
+
+        # If postprocessing of the SQL to transpile it to BigQuery is required,
+        # then do it here.
+        if transpile_to_bigquery:
+            translator = sql_translator.SqlTranslator(
+                model=model,
+                temperature=temperature,
+                process_input_errors=process_input_errors,
+                process_tool_output_errors=process_tool_output_errors,
+            )
+            # pylint: disable=g-bad-todo
+            # pylint: enable=g-bad-todo
+            responses: str = translator.translate(
+                responses, ddl_schema=ddl_schema, db=db, catalog=project
+            )
+
+        return responses
+
+    # Questions asked again (e.g. by dashboards) skip the model calls
+    method = (
+        f"chase-{generate_sql_type}-{number_of_candidates}"
+        f"-{transpile_to_bigquery}-{process_input_errors}-{process_tool_output_errors}"
+    )
+    return cached_nl2sql(
+        question, full_ddl_schema, model_name, temperature, method, generate_sql
+    )
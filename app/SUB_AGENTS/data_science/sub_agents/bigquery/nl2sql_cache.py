@@ -0,0 +1,249 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Persistent cache of the SQL generated by the NL2SQL tools.
+
+Entries are keyed by the normalized question and a fingerprint of everything
+else that determines the generated SQL: the DDL schema, the model, the
+temperature and the generation method. They expire after `NL2SQL_CACHE_TTL`
+seconds, and beyond `NL2SQL_CACHE_SIZE` entries the least recently used ones
+are evicted.
+
+Optionally (`NL2SQL_CACHE_SIMILARITY` > 0), a question without an exact match
+reuses the SQL of a near-duplicate one: a question of the same fingerprint whose
+word shingles overlap at least that much (Jaccard similarity) and which has
+exactly the same numbers and quoted literals.
+"""
+
+import functools
+import hashlib
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from typing import FrozenSet, Optional
+
+NL2SQL_CACHE_PATH = os.getenv(
+    "BQ_NL2SQL_CACHE_PATH",
+    os.path.join(
+        os.path.expanduser("~"), ".cache", "data_science_agent", "nl2sql.sqlite"
+    ),
+)
+
+# Maximum number of cached questions; 0 disables the cache
+NL2SQL_CACHE_SIZE = int(os.getenv("BQ_NL2SQL_CACHE_SIZE", "1000"))
+
+# Seconds after which a cached SQL query is generated again
+NL2SQL_CACHE_TTL = float(os.getenv("BQ_NL2SQL_CACHE_TTL", str(24 * 60 * 60)))
+
+# Minimum shingle similarity of a near-duplicate question; 0 disables the lookup
+NL2SQL_CACHE_SIMILARITY = float(os.getenv("BQ_NL2SQL_CACHE_SIMILARITY", "0"))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS nl2sql (
+    key TEXT PRIMARY KEY,
+    fingerprint TEXT NOT NULL,
+    question TEXT NOT NULL,
+    literals TEXT NOT NULL,
+    sql TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    last_used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS nl2sql_fingerprint ON nl2sql (fingerprint);
+CREATE INDEX IF NOT EXISTS nl2sql_last_used ON nl2sql (last_used);
+"""
+
+_WORD = re.compile(r"\w+")
+_LITERAL = re.compile(r"'[^']*'|\"[^\"]*\"|\d+(?:\.\d+)?")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_question(question: str) -> str:
+    """Lowercases a question and collapses its whitespace and final punctuation.
+
+    Quoted values and numbers are kept as written: `'ACME'` and `'acme'` can select
+    different rows, so they must not share a cached query.
+    """
+    question = unicodedata.normalize("NFKC", question)
+    parts = []
+    position = 0
+    for literal in _LITERAL.finditer(question):
+        parts.append(_WHITESPACE.sub(" ", question[position:literal.start()].casefold()))
+        parts.append(literal.group())
+        position = literal.end()
+    parts.append(_WHITESPACE.sub(" ", question[position:].casefold()))
+    return "".join(parts).strip().rstrip("?!. ")
+
+
+def _shingles(normalized_question: str) -> FrozenSet[str]:
+    """The words and pairs of consecutive words of a normalized question."""
+    words = _WORD.findall(normalized_question)
+    return frozenset(words + [f"{a} {b}" for a, b in zip(words, words[1:])])
+
+
+def _literals(normalized_question: str) -> str:
+    """The numbers and quoted values of a question, which a reused SQL must share."""
+    return "\n".join(sorted(_LITERAL.findall(normalized_question)))
+
+
+@functools.lru_cache(maxsize=4)
+def schema_hash(ddl_schema: str) -> str:
+    """The SHA-256 of a DDL schema, computed once per schema string."""
+    return hashlib.sha256(ddl_schema.encode("utf-8")).hexdigest()
+
+
+class NL2SQLCache:
+    """SQLite-backed cache of generated SQL, safe to share between threads."""
+
+    def __init__(
+        self,
+        db_path: str = NL2SQL_CACHE_PATH,
+        max_entries: int = NL2SQL_CACHE_SIZE,
+        ttl_seconds: float = NL2SQL_CACHE_TTL,
+        similarity: float = NL2SQL_CACHE_SIMILARITY,
+    ):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.similarity = similarity
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        self._conn = sqlite3.connect(db_path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+
+    @staticmethod
+    def fingerprint(ddl_schema: str, model: str, temperature: float, method: str) -> str:
+        """The hash of everything but the question that determines the SQL."""
+        return hashlib.sha256(
+            f"{method}\0{model}\0{temperature!r}\0{schema_hash(ddl_schema)}".encode(
+                "utf-8"
+            )
+        ).hexdigest()
+
+    def get(self, question: str, fingerprint: str) -> Optional[str]:
+        """Returns the cached SQL of a question (or of a near-duplicate), or None."""
+        question = normalize_question(question)
+        key = hashlib.sha256(f"{fingerprint}\0{question}".encode("utf-8")).hexdigest()
+        now = time.time()
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                "SELECT key, sql FROM nl2sql WHERE key = ? AND created_at > ?",
+                (key, now - self.ttl_seconds),
+            ).fetchone()
+            if row is None and self.similarity > 0:
+                row = self._near_duplicate(question, fingerprint, now)
+            if row is None:
+                return None
+            self._conn.execute(
+                "UPDATE nl2sql SET last_used = ? WHERE key = ?", (now, row[0])
+            )
+            return row[1]
+
+    def _near_duplicate(self, question: str, fingerprint: str, now: float):
+        shingles = _shingles(question)
+        literals = _literals(question)
+        best, best_similarity = None, self.similarity
+        for key, other_question, sql in self._conn.execute(
+            "SELECT key, question, sql FROM nl2sql"
+            " WHERE fingerprint = ? AND literals = ? AND created_at > ?",
+            (fingerprint, literals, now - self.ttl_seconds),
+        ):
+            other_shingles = _shingles(other_question)
+            similarity = len(shingles & other_shingles) / (
+                len(shingles | other_shingles) or 1
+            )
+            if similarity >= best_similarity:
+                best, best_similarity = (key, sql), similarity
+        return best
+
+    def put(self, question: str, fingerprint: str, sql: str) -> None:
+        """Caches the SQL of a question, evicting the least recently used entries."""
+        question = normalize_question(question)
+        key = hashlib.sha256(f"{fingerprint}\0{question}".encode("utf-8")).hexdigest()
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO nl2sql"
+                " (key, fingerprint, question, literals, sql, created_at, last_used)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, fingerprint, question, _literals(question), sql, now, now),
+            )
+            self._conn.execute(
+                "DELETE FROM nl2sql WHERE created_at <= ?", (now - self.ttl_seconds,)
+            )
+            self._conn.execute(
+                "DELETE FROM nl2sql WHERE key IN (SELECT key FROM nl2sql"
+                " ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+
+
+_nl2sql_cache = None
+_nl2sql_cache_lock = threading.Lock()
+
+
+def get_nl2sql_cache() -> Optional[NL2SQLCache]:
+    """Returns the shared cache, or None if it is disabled or cannot be opened."""
+    global _nl2sql_cache
+    if NL2SQL_CACHE_SIZE <= 0:
+        return None
+    with _nl2sql_cache_lock:
+        if _nl2sql_cache is None:
+            try:
+                _nl2sql_cache = NL2SQLCache()
+            except (OSError, sqlite3.Error) as e:
+                logging.warning("NL2SQL cache disabled: %s", e)
+                _nl2sql_cache = False
+    return _nl2sql_cache or None
+
+
+def cached_nl2sql(question, ddl_schema, model, temperature, method, generate):
+    """Returns the SQL of a question from the cache, or generates and caches it.
+
+    Cache failures are logged and fall back to generating the SQL.
+
+    Args:
+        question (str): Natural language question.
+        ddl_schema (str): The full DDL schema the SQL is generated from.
+        model (str): Name of the generating model.
+        temperature (float): Generation temperature.
+        method (str): Generation method and settings (e.g. "baseline").
+        generate (callable): Generates the SQL of the question, without arguments.
+
+    Returns:
+        str: The SQL statement.
+    """
+    cache = get_nl2sql_cache()
+    if cache is None:
+        return generate()
+    fingerprint = NL2SQLCache.fingerprint(ddl_schema, model, temperature, method)
+    try:
+        sql = cache.get(question, fingerprint)
+    except sqlite3.Error as e:
+        logging.warning("NL2SQL cache lookup failed: %s", e)
+        sql = None
+    if sql is not None:
+        logging.info("NL2SQL cache hit for question: %s", question)
+        return sql
+
+    sql = generate()
+    if sql:
+        try:
+            cache.put(question, fingerprint, sql)
+        except sqlite3.Error as e:
+            logging.warning("NL2SQL cache update failed: %s", e)
+    return sql
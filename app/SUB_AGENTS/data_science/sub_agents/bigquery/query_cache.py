@@ -0,0 +1,225 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""In-memory cache of the results of run_bigquery_validation.
+
+Queries are canonicalized with sqlglot: whitespace, keyword and function name
+casing, and table alias names do not change the cache key. The key also holds
+the `modified` timestamp of every table the query reads, so a result is only
+reused while none of them changed.
+
+Queries whose result is not a function of their text and of these tables
+(non-deterministic functions, wildcard tables, INFORMATION_SCHEMA, sampling,
+...) are never cached.
+"""
+
+import copy
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+import sqlglot
+from sqlglot import exp
+
+# Total size of the cached results (approximate, in bytes); 0 disables the cache
+QUERY_CACHE_MAX_BYTES = int(
+    os.getenv("BQ_QUERY_CACHE_MAX_BYTES", str(64 * 1024 * 1024))
+)
+
+# Seconds after which a cached result is fetched again, even if its tables did
+# not change (e.g. for rows still in a streaming buffer)
+QUERY_CACHE_TTL = float(os.getenv("BQ_QUERY_CACHE_TTL", str(60 * 60)))
+
+# Functions whose result differs between two runs of the same query
+_NON_DETERMINISTIC_FUNCTIONS = frozenset(
+    [
+        "CURRENT_DATE",
+        "CURRENT_DATETIME",
+        "CURRENT_TIME",
+        "CURRENT_TIMESTAMP",
+        "GENERATE_UUID",
+        "NOW",
+        "RAND",
+        "SESSION_USER",
+    ]
+)
+
+_ALIAS_PREFIX = "__alias"
+
+
+def _function_name(function: exp.Func) -> str:
+    if isinstance(function, exp.Anonymous):
+        return function.name.upper()
+    return function.sql_name()
+
+
+def _rename_table_aliases(tree: exp.Expression) -> None:
+    """Renames the aliases of tables and subqueries to __alias0, __alias1, ...
+
+    An alias is only renamed if all of its other occurrences are the table part
+    of column references, so that the renaming cannot change what a name refers
+    to (e.g. `SELECT t FROM table AS t`, where `t` is the whole row).
+    """
+    identifiers = [identifier.name.lower() for identifier in tree.find_all(exp.Identifier)]
+    if any(name.startswith(_ALIAS_PREFIX) for name in identifiers):
+        return
+
+    definitions = []
+    for source in tree.find_all(exp.Table, exp.Subquery):
+        alias = source.args.get("alias")
+        if isinstance(alias, exp.TableAlias) and alias.name:
+            definitions.append(alias)
+    references = [
+        column
+        for column in tree.find_all(exp.Column)
+        if isinstance(column.args.get("table"), exp.Identifier)
+    ]
+
+    occurrences = {}
+    for name in identifiers:
+        occurrences[name] = occurrences.get(name, 0) + 1
+    expected = {}
+    for alias in definitions:
+        expected[alias.name.lower()] = expected.get(alias.name.lower(), 0) + 1
+    for column in references:
+        name = column.args["table"].name.lower()
+        if name in expected:
+            expected[name] += 1
+
+    renames = {}
+    for alias in definitions:
+        name = alias.name.lower()
+        if occurrences.get(name) != expected[name]:
+            continue
+        if name not in renames:
+            renames[name] = f"{_ALIAS_PREFIX}{len(renames)}"
+        alias.set("this", exp.to_identifier(renames[name]))
+    for column in references:
+        name = column.args["table"].name.lower()
+        if name in renames:
+            column.set("table", exp.to_identifier(renames[name]))
+
+
+def canonicalize_sql(sql: str) -> Optional[Tuple[str, List[Tuple[str, str, str]]]]:
+    """Returns the canonical form of a query and the tables it reads.
+
+    Args:
+        sql (str): A BigQuery query.
+
+    Returns:
+        The canonical SQL and the (project, dataset, table) of every table it reads
+        (project is empty if not given), or None if the query cannot be parsed or
+        its result cannot be cached.
+    """
+    try:
+        statements = sqlglot.parse(sql, read="bigquery")
+    except sqlglot.errors.SqlglotError:
+        return None
+    if len(statements) != 1 or statements[0] is None:
+        return None
+    tree = statements[0]
+
+    for function in tree.find_all(exp.Func):
+        if _function_name(function) in _NON_DETERMINISTIC_FUNCTIONS:
+            return None
+    if tree.find(exp.TableSample) is not None:
+        return None
+
+    cte_names = {cte.alias_or_name.lower() for cte in tree.find_all(exp.CTE)}
+    tables = set()
+    for table in tree.find_all(exp.Table):
+        if not table.db:
+            if table.name.lower() in cte_names:
+                continue
+            # Resolved against the job's default dataset, which is not part of the key
+            return None
+        # INFORMATION_SCHEMA can be any part of the name (e.g. `p.d.INFORMATION_SCHEMA.TABLES`)
+        if "*" in table.name or any(
+            part.name.lower() == "information_schema" for part in table.parts
+        ):
+            return None
+        tables.add((table.catalog, table.db, table.name))
+
+    _rename_table_aliases(tree)
+    return tree.sql(dialect="bigquery", normalize_functions="upper"), sorted(tables)
+
+
+class QueryResultCache:
+    """Thread-safe LRU cache of query results, bounded by their total size."""
+
+    def __init__(
+        self, max_bytes: int = QUERY_CACHE_MAX_BYTES, ttl_seconds: float = QUERY_CACHE_TTL
+    ):
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()  # key -> (value, size, created_at)
+        self._size = 0
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "uncacheable": 0, "evictions": 0}
+
+    @staticmethod
+    def key(canonical_sql: str, table_versions: List[Tuple[str, str]], max_rows: int) -> str:
+        """The cache key of a canonical query over tables at given versions."""
+        versions = "\n".join(f"{table}@{version}" for table, version in table_versions)
+        return hashlib.sha256(
+            f"{canonical_sql}\0{versions}\0{max_rows}".encode("utf-8")
+        ).hexdigest()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Returns a copy of the cached result, or None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.monotonic() - entry[2] > self.ttl_seconds:
+                self._remove(key)
+                entry = None
+            if entry is None:
+                self._stats["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._stats["hits"] += 1
+            value = entry[0]
+        return copy.deepcopy(value)
+
+    def put(self, key: str, value: Dict[str, Any]) -> None:
+        """Caches a result, evicting the least recently used ones beyond max_bytes."""
+        value = copy.deepcopy(value)
+        size = len(repr(value))
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (value, size, time.monotonic())
+            self._size += size
+            while self._size > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self._stats["evictions"] += 1
+
+    def record_uncacheable(self) -> None:
+        with self._lock:
+            self._stats["uncacheable"] += 1
+
+    def _remove(self, key: str) -> None:
+        self._size -= self._entries.pop(key)[1]
+
+    def stats(self) -> Dict[str, int]:
+        """Returns the hit, miss, uncacheable and eviction counts, and the cache size."""
+        with self._lock:
+            return {**self._stats, "entries": len(self._entries), "bytes": self._size}
+
+
+query_result_cache = QueryResultCache()
@@ -0,0 +1,75 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""On-disk cache of the per-table DDL generated by get_bigquery_schema.
+
+One JSON file per dataset maps each table ID to its DDL (with sample rows) and
+the table's `modified` timestamp when the DDL was generated. An entry is only
+reused while the table's current `modified` timestamp is unchanged.
+"""
+
+import json
+import logging
+import os
+import tempfile
+from typing import Dict, Optional
+
+SCHEMA_CACHE_DIR = os.getenv(
+    "BQ_SCHEMA_CACHE_DIR",
+    os.path.join(os.path.expanduser("~"), ".cache", "data_science_agent", "schemas"),
+)
+
+
+class SchemaCache:
+    """DDL cache of one BigQuery dataset."""
+
+    def __init__(self, project_id: str, dataset_id: str, cache_dir: Optional[str] = None):
+        self.path = os.path.join(
+            cache_dir or SCHEMA_CACHE_DIR, f"{project_id}.{dataset_id}.json"
+        )
+        self.entries: Dict[str, Dict[str, str]] = {}
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                self.entries = json.load(f)
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError) as e:
+            logging.warning("Ignoring unreadable schema cache %s: %s", self.path, e)
+
+    def get(self, table_id: str, modified: str) -> Optional[str]:
+        """Returns the cached DDL of a table if it was not modified since, else None."""
+        entry = self.entries.get(table_id)
+        if entry is not None and entry["modified"] == modified:
+            return entry["ddl"]
+        return None
+
+    def save(self, entries: Dict[str, Dict[str, str]]) -> None:
+        """Replaces the cache content with {table_id: {"modified": ..., "ddl": ...}}.
+
+        Tables missing from entries (e.g. dropped ones) are removed from the cache.
+        Failures are logged: the cache only speeds up the next schema retrieval.
+        """
+        self.entries = entries
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(self.path))
+            try:
+                with os.fdopen(fd, "w", encoding="utf-8") as f:
+                    json.dump(entries, f)
+                os.replace(temp_path, self.path)
+            except BaseException:
+                os.remove(temp_path)
+                raise
+        except OSError as e:
+            logging.warning("Could not write schema cache %s: %s", self.path, e)
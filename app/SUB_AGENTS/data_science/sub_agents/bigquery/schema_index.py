@@ -0,0 +1,252 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Question-dependent pruning of the DDL schema pasted into NL2SQL prompts.
+
+The DDL generated by `get_bigquery_schema` is split into one entry per table,
+and the tables are ranked against the question with BM25 over their names,
+column names, column descriptions and example values. A prompt then contains
+the `SCHEMA_TOP_K` best tables, plus the tables needed to join them through
+shared key columns, instead of the whole dataset. Very wide tables are further
+reduced to the columns matching the question and their join keys.
+"""
+
+import functools
+import math
+import os
+import re
+from collections import Counter
+from typing import Dict, List, Optional, Set
+
+# Number of best-ranked tables included in a pruned schema
+SCHEMA_TOP_K = int(os.getenv("BQ_SCHEMA_TOP_K", "8"))
+
+# Tables with more columns than this only keep the relevant ones and their keys
+SCHEMA_MAX_COLUMNS = int(os.getenv("BQ_SCHEMA_MAX_COLUMNS", "50"))
+
+# BM25 parameters
+_K1 = 1.5
+_B = 0.75
+
+# Table names count this many times more than a column or value
+_TABLE_NAME_WEIGHT = 3
+
+_TABLE_START = re.compile(r"^CREATE OR REPLACE TABLE `([^`]+)` \(\n", re.MULTILINE)
+_COLUMN = re.compile(r"^  `([^`]+)` (\S+)")
+_WORD = re.compile(r"[A-Z]+(?![a-z])|[A-Z]?[a-z]+|\d+")
+_KEY_COLUMN = re.compile(r"(^|_)(id|key|code|sk|no|num|number)$|[a-z]Id$|ID$")
+
+_STOPWORDS = frozenset(
+    "a an and are as at be by did do does for from had has have how i in is it "
+    "its me my of on or our show that the their them there these this to was "
+    "were what when where which who whose why will with you your give list "
+    "find get tell all each per".split()
+)
+
+
+def _tokens(text: str) -> List[str]:
+    """Splits text, including snake_case and camelCase names, into search terms."""
+    terms = []
+    for word in _WORD.findall(text):
+        word = word.lower()
+        if word in _STOPWORDS:
+            continue
+        # Crude plural folding, so that "orders" matches the `order_id` column
+        if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+            word = word[:-1]
+        terms.append(word)
+    return terms
+
+
+class _Table:
+    """The DDL of one table, split into its parts."""
+
+    def __init__(self, name: str, ddl: str):
+        self.name = name
+        self.ddl = ddl
+        head, _, self.examples = ddl.partition("\n);\n\n")
+        self.header, _, body = head.partition("\n")
+        # Column lines, in order; a description spanning lines stays with its column
+        self.column_lines: List[str] = []
+        self.columns: Dict[str, str] = {}
+        for line in body.split("\n"):
+            match = _COLUMN.match(line)
+            if match:
+                self.columns[match.group(1)] = match.group(2).rstrip(",")
+                self.column_lines.append(line)
+            elif self.column_lines:
+                self.column_lines[-1] += "\n" + line
+        self.keys = {
+            column: column_type
+            for column, column_type in self.columns.items()
+            if _KEY_COLUMN.search(column)
+        }
+
+    def terms(self) -> List[str]:
+        short_name = self.name.rsplit(".", 1)[-1]
+        return (
+            _tokens(short_name) * _TABLE_NAME_WEIGHT
+            + _tokens("\n".join(self.column_lines))
+            + _tokens(self.examples)
+        )
+
+    def joins(self, other: "_Table") -> bool:
+        """Whether both tables share a key column with the same name and type."""
+        return any(
+            other.keys.get(column) == column_type
+            for column, column_type in self.keys.items()
+        )
+
+    def pruned_ddl(self, query_terms: Set[str], keys: Set[str]) -> str:
+        """The DDL with only the columns matching the question and the given keys.
+
+        Example rows are dropped with the columns, since their values are positional.
+        """
+        if len(self.column_lines) <= SCHEMA_MAX_COLUMNS:
+            return self.ddl
+        kept = [
+            line
+            for column, line in zip(self.columns, self.column_lines)
+            if column in keys or query_terms.intersection(_tokens(line))
+        ][:SCHEMA_MAX_COLUMNS]
+        if not kept:
+            kept = self.column_lines[:SCHEMA_MAX_COLUMNS]
+        omitted = len(self.column_lines) - len(kept)
+        return (
+            f"{self.header}\n"
+            + "\n".join(line.rstrip(",") + "," for line in kept)[:-1]
+            + f"\n  -- {omitted} columns not relevant to the question are omitted\n);\n\n"
+        )
+
+
+class SchemaIndex:
+    """BM25 index of the tables of a DDL schema."""
+
+    def __init__(self, ddl_schema: str):
+        starts = [match.start() for match in _TABLE_START.finditer(ddl_schema)]
+        self.tables = [
+            _Table(_TABLE_START.match(ddl_schema, start).group(1), ddl_schema[start:end])
+            for start, end in zip(starts, starts[1:] + [len(ddl_schema)])
+        ]
+        self._term_counts = [Counter(table.terms()) for table in self.tables]
+        self._lengths = [sum(counts.values()) for counts in self._term_counts]
+        self._average_length = (
+            sum(self._lengths) / len(self._lengths) if self._lengths else 0
+        )
+        document_frequency = Counter(
+            term for counts in self._term_counts for term in counts
+        )
+        n = len(self.tables)
+        self._idf = {
+            term: math.log(1 + (n - df + 0.5) / (df + 0.5))
+            for term, df in document_frequency.items()
+        }
+
+    def scores(self, question: str) -> List[float]:
+        """The BM25 score of each table for the question."""
+        query_terms = set(_tokens(question))
+        scores = []
+        for counts, length in zip(self._term_counts, self._lengths):
+            score = 0.0
+            normalization = _K1 * (1 - _B + _B * length / (self._average_length or 1))
+            for term in query_terms:
+                frequency = counts.get(term)
+                if frequency:
+                    score += (
+                        self._idf[term]
+                        * frequency
+                        * (_K1 + 1)
+                        / (frequency + normalization)
+                    )
+            scores.append(score)
+        return scores
+
+    def select(self, question: str, top_k: Optional[int] = None) -> List[int]:
+        """Indices of the tables relevant to the question, in schema order.
+
+        These are the top_k best-scoring tables, plus, for two selected tables
+        without a common key, one table sharing a key with each of them.
+        """
+        top_k = top_k or SCHEMA_TOP_K
+        scores = self.scores(question)
+        ranked = sorted(range(len(self.tables)), key=lambda i: -scores[i])
+        selected = [i for i in ranked[:top_k] if scores[i] > 0] or ranked[:top_k]
+
+        bridges = []
+        for position, i in enumerate(selected):
+            for j in selected[position + 1:]:
+                first, second = self.tables[i], self.tables[j]
+                if first.joins(second):
+                    continue
+                bridge = next(
+                    (
+                        k
+                        for k in ranked
+                        if k not in selected
+                        and self.tables[k].joins(first)
+                        and self.tables[k].joins(second)
+                    ),
+                    None,
+                )
+                if bridge is not None and bridge not in bridges and len(bridges) < top_k:
+                    bridges.append(bridge)
+        return sorted(selected + bridges)
+
+    def pruned_schema(self, question: str, top_k: Optional[int] = None) -> str:
+        """The DDL of the tables (and columns) relevant to the question."""
+        top_k = top_k or SCHEMA_TOP_K
+        if len(self.tables) <= top_k and all(
+            len(table.column_lines) <= SCHEMA_MAX_COLUMNS for table in self.tables
+        ):
+            return "".join(table.ddl for table in self.tables)
+
+        selected = [self.tables[i] for i in self.select(question, top_k)]
+        query_terms = set(_tokens(question))
+        pruned = []
+        for table in selected:
+            keys = {
+                column
+                for other in selected
+                if other is not table
+                for column in table.keys
+                if other.keys.get(column) == table.keys[column]
+            }
+            pruned.append(table.pruned_ddl(query_terms, keys))
+        return "".join(pruned)
+
+
+@functools.lru_cache(maxsize=4)
+def get_schema_index(ddl_schema: str) -> SchemaIndex:
+    """Returns the index of a DDL schema, built once per schema."""
+    return SchemaIndex(ddl_schema)
+
+
+def prune_schema(ddl_schema: str, question: Optional[str]) -> str:
+    """Returns the part of a DDL schema relevant to a question.
+
+    Args:
+        ddl_schema (str): The DDL generated by `get_bigquery_schema`.
+        question (str): The natural language question. If empty, the whole
+          schema is returned.
+
+    Returns:
+        str: The DDL of at most `SCHEMA_TOP_K` best matching tables (plus the
+          tables joining them), whatever the size of the dataset.
+    """
+    if not question or not ddl_schema:
+        return ddl_schema
+    index = get_schema_index(ddl_schema)
+    if not index.tables:
+        return ddl_schema
+    return index.pruned_schema(question)
@@ -15,16 +15,24 @@
 """This file contains the tools used by the database agent."""
 
 import datetime
+import itertools
 import logging
 import os
 import re
+from concurrent.futures import ThreadPoolExecutor
 
 from app.utils.utils import get_env_var
 from google.adk.tools import ToolContext
 from google.cloud import bigquery
 from google.genai import Client
+import sqlglot
+from sqlglot import exp
 
 from .chase_sql import chase_constants
+from .nl2sql_cache import cached_nl2sql
+from .query_cache import QueryResultCache, canonicalize_sql, query_result_cache
+from .schema_cache import SchemaCache
+from .schema_index import prune_schema
 
 # Assume that `BQ_PROJECT_ID` is set in the environment. See the
 # `data_agent` README for more details.
@@ -34,6 +42,9 @@ llm_client = Client(vertexai=True, project=project, location=location)
 
 MAX_NUM_ROWS = 80
 
+# Number of tables whose metadata and example rows are fetched concurrently
+SCHEMA_MAX_WORKERS = int(os.getenv("BQ_SCHEMA_MAX_WORKERS", "16"))
+
 
 database_settings = None
 bq_client = None
@@ -73,13 +84,64 @@ def update_database_settings():
     return database_settings
 
 
-def get_bigquery_schema(dataset_id, client=None, project_id=None):
+def _table_ddl(client, table_obj):
+    """Generates the DDL of a table, followed by a few example rows as INSERTs.
+
+    Args:
+        client (bigquery.Client): A BigQuery client.
+        table_obj (bigquery.Table): The table, as returned by `get_table`.
+
+    Returns:
+        str: The DDL statements of the table.
+    """
+    table_ref = table_obj.reference
+    ddl_statement = f"CREATE OR REPLACE TABLE `{table_ref}` (\n"
+
+    for field in table_obj.schema:
+        ddl_statement += f"  `{field.name}` {field.field_type}"
+        if field.mode == "REPEATED":
+            ddl_statement += " ARRAY"
+        if field.description:
+            ddl_statement += f" COMMENT '{field.description}'"
+        ddl_statement += ",\n"
+
+    ddl_statement = ddl_statement[:-2] + "\n);\n\n"
+
+    # Add example values if available (limited to first row)
+    rows = client.list_rows(table_obj, max_results=5).to_dataframe()
+    if not rows.empty:
+        ddl_statement += f"-- Example values for table `{table_ref}`:\n"
+        for _, row in rows.iterrows():  # Iterate over DataFrame rows
+            ddl_statement += f"INSERT INTO `{table_ref}` VALUES\n"
+            example_row_str = "("
+            for value in row.values:  # Now row is a pandas Series and has values
+                if isinstance(value, str):
+                    example_row_str += f"'{value}',"
+                elif value is None:
+                    example_row_str += "NULL,"
+                else:
+                    example_row_str += f"{value},"
+            example_row_str = (
+                example_row_str[:-1] + ");\n\n"
+            )  # remove trailing comma
+            ddl_statement += example_row_str
+
+    return ddl_statement
+
+
+def get_bigquery_schema(dataset_id, client=None, project_id=None, use_cache=True):
     """Retrieves schema and generates DDL with example values for a BigQuery dataset.
 
+    Table metadata and example rows are fetched concurrently, on up to
+    `SCHEMA_MAX_WORKERS` threads. The DDL of each table is cached on disk (see
+    `schema_cache`) together with the table's `modified` timestamp, so only
+    tables changed since the last retrieval have their example rows fetched again.
+
     Args:
         dataset_id (str): The ID of the BigQuery dataset (e.g., 'my_dataset').
         client (bigquery.Client): A BigQuery client.
         project_id (str): The ID of your Google Cloud Project.
+        use_cache (bool): Whether to reuse and update the on-disk DDL cache.
 
     Returns:
         str: A string containing the generated DDL statements.
@@ -90,52 +152,138 @@ def get_bigquery_schema(dataset_id, client=None, project_id=None):
 
     # dataset_ref = client.dataset(dataset_id)
     dataset_ref = bigquery.DatasetReference(project_id, dataset_id)
-    
+    cache = SchemaCache(project_id, dataset_id) if use_cache else None
 
-    ddl_statements = ""
-
-    for table in client.list_tables(dataset_ref):
-        table_ref = dataset_ref.table(table.table_id)
-        table_obj = client.get_table(table_ref)
+    def table_entry(table_item):
+        table_obj = client.get_table(table_item.reference)
 
         # Check if table is a view
         if table_obj.table_type != "TABLE":
-            continue
-
-        ddl_statement = f"CREATE OR REPLACE TABLE `{table_ref}` (\n"
-
-        for field in table_obj.schema:
-            ddl_statement += f"  `{field.name}` {field.field_type}"
-            if field.mode == "REPEATED":
-                ddl_statement += " ARRAY"
-            if field.description:
-                ddl_statement += f" COMMENT '{field.description}'"
-            ddl_statement += ",\n"
-
-        ddl_statement = ddl_statement[:-2] + "\n);\n\n"
-
-        # Add example values if available (limited to first row)
-        rows = client.list_rows(table_ref, max_results=5).to_dataframe()
-        if not rows.empty:
-            ddl_statement += f"-- Example values for table `{table_ref}`:\n"
-            for _, row in rows.iterrows():  # Iterate over DataFrame rows
-                ddl_statement += f"INSERT INTO `{table_ref}` VALUES\n"
-                example_row_str = "("
-                for value in row.values:  # Now row is a pandas Series and has values
-                    if isinstance(value, str):
-                        example_row_str += f"'{value}',"
-                    elif value is None:
-                        example_row_str += "NULL,"
-                    else:
-                        example_row_str += f"{value},"
-                example_row_str = (
-                    example_row_str[:-1] + ");\n\n"
-                )  # remove trailing comma
-                ddl_statement += example_row_str
-
-        ddl_statements += ddl_statement
-
-    return ddl_statements
+            return None
+
+        modified = table_obj.modified.isoformat() if table_obj.modified else ""
+        ddl = cache.get(table_obj.table_id, modified) if cache else None
+        if ddl is None:
+            ddl = _table_ddl(client, table_obj)
+        return {"modified": modified, "ddl": ddl}
+
+    # Views are already known from the listing and need no further calls
+    table_items = [
+        table_item
+        for table_item in client.list_tables(dataset_ref)
+        if table_item.table_type in ("TABLE", None)
+    ]
+    if not table_items:
+        return ""
+
+    with ThreadPoolExecutor(
+        max_workers=min(SCHEMA_MAX_WORKERS, len(table_items))
+    ) as executor:
+        entries = list(executor.map(table_entry, table_items))
+
+    # Keep the order of list_tables in the generated DDL
+    table_entries = {
+        table_item.table_id: entry
+        for table_item, entry in zip(table_items, entries)
+        if entry is not None
+    }
+    if cache is not None:
+        cache.save(table_entries)
+
+    return "".join(entry["ddl"] for entry in table_entries.values())
+
+
+def _query_cache_key(sql_string):
+    """Returns the result cache key of a query, or None if it cannot be cached.
+
+    Args:
+        sql_string (str): The cleaned-up SQL query.
+
+    Returns:
+        str: A key made of the canonical query and the `modified` timestamp of
+          each table it reads, or None.
+    """
+    canonical = canonicalize_sql(sql_string)
+    if canonical is None:
+        return None
+    canonical_sql, tables = canonical
+
+    client = get_bq_client()
+    table_versions = []
+    for project_id, dataset_id, table_id in tables:
+        table_name = f"{project_id or client.project}.{dataset_id}.{table_id}"
+        try:
+            table_obj = client.get_table(table_name)
+        except Exception:  # pylint: disable=broad-exception-caught
+            # e.g. not found: the query fails, and its error is not cached
+            return None
+        # The `modified` timestamp of a view does not change with its data
+        if table_obj.table_type != "TABLE" or table_obj.modified is None:
+            return None
+        table_versions.append((table_name, table_obj.modified.isoformat()))
+
+    return QueryResultCache.key(canonical_sql, table_versions, MAX_NUM_ROWS)
+
+
+def limit_query(sql_string, max_rows=MAX_NUM_ROWS):
+    """Makes a query return at most `max_rows` rows.
+
+    The query is parsed with sqlglot, so that only its top-level LIMIT counts
+    (not the one of a subquery, nor a column named e.g. `limit_value`). A missing
+    LIMIT is appended after the query's last token (before any trailing comment
+    or semicolon), and a larger one is lowered; the rest of the text is kept.
+
+    Args:
+        sql_string (str): The SQL query.
+        max_rows (int): Maximum number of rows.
+
+    Returns:
+        str: The SQL query with a top-level LIMIT of at most `max_rows`.
+    """
+    try:
+        tokens = sqlglot.tokenize(sql_string, read="bigquery")
+        statements = sqlglot.parse(sql_string, read="bigquery")
+    except sqlglot.errors.SqlglotError:
+        # Fall back to the textual check for queries sqlglot cannot parse
+        if re.search(r"(?i)\blimit\b", sql_string):
+            return sql_string
+        return sql_string.rstrip().rstrip(";") + f" LIMIT {max_rows}"
+    if len(statements) != 1 or not isinstance(statements[0], exp.Query):
+        return sql_string
+
+    tokens = [
+        token
+        for token in tokens
+        if token.token_type != sqlglot.tokens.TokenType.SEMICOLON
+    ]
+    limit = statements[0].args.get("limit")
+    if limit is None:
+        end = tokens[-1].end + 1
+        return f"{sql_string[:end]} LIMIT {max_rows}{sql_string[end:]}"
+
+    # Find the top-level LIMIT and lower its value if it is a larger literal
+    depth = 0
+    for position, token in enumerate(tokens):
+        if token.token_type == sqlglot.tokens.TokenType.L_PAREN:
+            depth += 1
+        elif token.token_type == sqlglot.tokens.TokenType.R_PAREN:
+            depth -= 1
+        elif (
+            depth == 0
+            and token.token_type == sqlglot.tokens.TokenType.LIMIT
+            and position + 1 < len(tokens)
+        ):
+            value = tokens[position + 1]
+            if (
+                value.token_type == sqlglot.tokens.TokenType.NUMBER
+                and value.text.isdigit()
+                and int(value.text) > max_rows
+            ):
+                return (
+                    f"{sql_string[:value.start]}{max_rows}"
+                    f"{sql_string[value.end + 1:]}"
+                )
+    return sql_string
 
 
 def initial_bq_nl2sql(
@@ -184,21 +332,34 @@ The database structure is defined by the following table schemas (possibly with
 
    """
 
-    ddl_schema = tool_context.state["database_settings"]["bq_ddl_schema"]
+    full_ddl_schema = tool_context.state["database_settings"]["bq_ddl_schema"]
+    model = os.getenv("BASELINE_NL2SQL_MODEL", "gemini-1.5-flash-latest")
+    temperature = 0.1
 
-    prompt = prompt_template.format(
-        MAX_NUM_ROWS=MAX_NUM_ROWS, SCHEMA=ddl_schema, QUESTION=question
-    )
+    def generate_sql():
+        # Only the tables relevant to the question, so the prompt size does not
+        # grow with the dataset
+        ddl_schema = prune_schema(full_ddl_schema, question)
 
-    response = llm_client.models.generate_content(
-        model=os.getenv("BASELINE_NL2SQL_MODEL", "gemini-1.5-flash-latest"),
-        contents=prompt,
-        config={"temperature": 0.1},
-    )
+        prompt = prompt_template.format(
+            MAX_NUM_ROWS=MAX_NUM_ROWS, SCHEMA=ddl_schema, QUESTION=question
+        )
+
+        response = llm_client.models.generate_content(
+            model=model,
+            contents=prompt,
+            config={"temperature": temperature},
+        )
 
-    sql = response.text
-    if sql:
-        sql = sql.replace("```sql", "").replace("```", "").strip()
+        sql = response.text
+        if sql:
+            sql = sql.replace("```sql", "").replace("```", "").strip()
+        return sql
+
+    # Questions asked again (e.g. by dashboards) skip the model call
+    sql = cached_nl2sql(
+        question, full_ddl_schema, model, temperature, "baseline", generate_sql
+    )
 
     print("\n sql:", sql)
 
@@ -255,9 +416,8 @@ def run_bigquery_validation(
         # 4. Replace escaped newlines (those not preceded by a backslash)
         sql_string = sql_string.replace("\\n", "\n")
 
-        # 5. Add limit clause if not present
-        if "limit" not in sql_string.lower():
-            sql_string = sql_string + " limit " + str(MAX_NUM_ROWS)
+        # 5. Add limit clause if not present, or lower it to MAX_NUM_ROWS
+        sql_string = limit_query(sql_string)
 
         return sql_string
 
@@ -276,9 +436,27 @@ def run_bigquery_validation(
         )
         return final_result
 
+    # Queries repeated while refining a question are answered from the cache
+    cache_key = None
+    if query_result_cache.max_bytes > 0:
+        cache_key = _query_cache_key(sql_string)
+        if cache_key is None:
+            query_result_cache.record_uncacheable()
+        else:
+            cached_result = query_result_cache.get(cache_key)
+            logging.info("Query result cache: %s", query_result_cache.stats())
+            if cached_result is not None:
+                if cached_result["query_result"] is not None:
+                    tool_context.state["query_result"] = cached_result["query_result"]
+                return cached_result
+
     try:
         query_job = get_bq_client().query(sql_string)
-        results = query_job.result()  # Get the query results
+        # Get the query results; at most MAX_NUM_ROWS rows are downloaded, in a
+        # single page, even if the query returns more
+        results = query_job.result(
+            max_results=MAX_NUM_ROWS, page_size=MAX_NUM_ROWS
+        )
 
         if results.schema:  # Check if query returned data
             rows = [
@@ -290,9 +468,7 @@ def run_bigquery_validation(
                     )
                     for (key, value) in row.items()
                 }
-                for row in results
-            ][
-                :MAX_NUM_ROWS
+                for row in itertools.islice(results, MAX_NUM_ROWS)
             ]  # Convert BigQuery RowIterator to list of dicts
             # return f"Valid SQL. Results: {rows}"
             final_result["query_result"] = rows
@@ -304,6 +480,9 @@ def run_bigquery_validation(
                 "Valid SQL. Query executed successfully (no results)."
             )
 
+        if cache_key is not None:
+            query_result_cache.put(cache_key, final_result)
+
     except (
         Exception
     ) as e:  # Catch generic exceptions from BigQuery  # pylint: disable=broad-exception-caught
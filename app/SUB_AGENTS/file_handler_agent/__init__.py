@@ -17,6 +17,7 @@ __all__ = [
     "list_files_with_metadata",
     "check_file_exists",
     "append_to_file",
+    "flush_file_buffers",
     "rename_file",
     "copy_file",
     "check_is_directory",
@@ -27,11 +28,18 @@ __all__ = [
     "set_file_permissions",
     "filter_file_content",
     "get_file_metadata",
+    "get_files_metadata",
     "compare_files",
     "calculate_file_hash",
+    "find_duplicate_files",
     "zip_files",
     "extract_zip",
+    "archive_create",
+    "archive_extract",
     "batch_process_files",
+    "get_batch_status",
     "search_file_content",
+    "search_directory_content",
+    "grep_directory",
     "set_working_directory"
 ]
@@ -6,6 +6,7 @@ from typing import Dict, Any
 
 from google.adk.tools import ToolContext
 from google.adk.agents.callback_context import CallbackContext
+from .async_tools import async_tool
 from .prompt import FILE_HANDLER_AGENT_PROMPT
 from .tools import *
 
@@ -27,7 +28,8 @@ file_handler_agent = LlmAgent(
     name="FileHandler",
     model=FILE_HANDLER_MODEL,
     instruction=FILE_HANDLER_AGENT_PROMPT, 
-    tools = [
+    # Tools run on the file handler's I/O thread pools, so they never block the event loop
+    tools = [async_tool(tool) for tool in [
         read_file,
         write_to_file,
         create_new_file,
@@ -37,24 +39,32 @@ file_handler_agent = LlmAgent(
         list_files_with_metadata,
         check_file_exists,
         append_to_file,
+        flush_file_buffers,
         rename_file,
         copy_file,
         check_is_directory,
         check_is_file,
         search_file_content,
+        search_directory_content,
+        grep_directory,
         set_working_directory,
         get_current_working_directory,
         list_folder_tree,
         get_file_permissions,
         set_file_permissions,
         get_file_metadata,
+        get_files_metadata,
         compare_files,
         calculate_file_hash,
+        find_duplicate_files,
         zip_files,
         extract_zip,
+        archive_create,
+        archive_extract,
         batch_process_files,
+        get_batch_status,
         filter_file_content,
-    ],
+    ]],
     description="Manages file system operations safely and efficiently.",
     before_agent_callback=setup_before_agent_call,
     output_key="file_handler_output"
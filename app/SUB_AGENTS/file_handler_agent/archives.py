@@ -0,0 +1,466 @@
+"""Archive helpers used by the file handler's archive tools.
+
+ZIP members are deflated on a thread pool (zlib releases the GIL while
+compressing) and written into the archive in their original order as each one
+becomes ready. Files whose content is already compressed are stored as-is.
+Extraction streams members through bounded buffers, also on a thread pool.
+
+Tar archives are written and read as streams, so no member is ever held in
+memory. gzip and xz output is compressed in independent blocks on a thread pool
+(concatenated gzip members and xz streams are valid files); zstd uses the
+zstandard package's own worker threads.
+"""
+
+import fnmatch
+import gzip
+import lzma
+import os
+import re
+import shutil
+import sys
+import tarfile
+import tempfile
+import threading
+import zipfile
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - depends on the environment
+    zstandard = None
+
+DEFAULT_MAX_WORKERS = min(32, os.cpu_count() or 1)
+
+# Extensions of formats whose content is already compressed; deflating them again
+# costs CPU time and saves (almost) nothing
+PRECOMPRESSED_EXTENSIONS = {
+    '.7z', '.aac', '.avi', '.br', '.bz2', '.docx', '.flac', '.gif', '.gz', '.heic', '.jar',
+    '.jpeg', '.jpg', '.lz4', '.m4a', '.mkv', '.mov', '.mp3', '.mp4', '.ogg', '.parquet', '.png',
+    '.pptx', '.rar', '.tgz', '.webm', '.webp', '.whl', '.xlsx', '.xz', '.zip', '.zst'
+}
+
+_COPY_BUFFER_SIZE = 1024 * 1024
+
+# Archive formats by file name suffix
+ARCHIVE_FORMATS = {
+    'zip': '.zip',
+    'tar': '.tar',
+    'tar.gz': '.tar.gz',
+    'tar.xz': '.tar.xz',
+    'tar.zst': '.tar.zst',
+}
+_FORMAT_ALIASES = {'.tgz': 'tar.gz', '.txz': 'tar.xz', '.tzst': 'tar.zst'}
+
+# Default compression levels of the tar codecs
+_DEFAULT_LEVELS = {'tar.gz': 6, 'tar.xz': 6, 'tar.zst': 3}
+
+# Size of the blocks gzip and xz output is compressed in, in parallel
+_COMPRESSION_BLOCK_SIZE = 4 * 1024 * 1024
+
+# Extraction tasks cover members totalling at least this many bytes, or this many members
+_EXTRACT_BATCH_BYTES = 8 * 1024 * 1024
+_EXTRACT_BATCH_MEMBERS = 512
+
+# Compressed members up to this size are kept in memory until they are written
+_SPOOL_MAX_SIZE = 16 * 1024 * 1024
+
+
+def is_precompressed(path: str) -> bool:
+    """Returns True if the file name indicates already-compressed content."""
+    return os.path.splitext(path)[1].lower() in PRECOMPRESSED_EXTENSIONS
+
+
+def _deflate_member(file_path: str, zinfo: zipfile.ZipInfo, compression_level: int):
+    """Deflates one file into a spooled temporary file, computing its CRC on the way."""
+    compressor = zlib.compressobj(compression_level, zlib.DEFLATED, -zlib.MAX_WBITS)
+    spool = tempfile.SpooledTemporaryFile(max_size=_SPOOL_MAX_SIZE)
+    try:
+        crc = 0
+        file_size = 0
+        with open(file_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(_COPY_BUFFER_SIZE), b""):
+                crc = zlib.crc32(chunk, crc)
+                file_size += len(chunk)
+                spool.write(compressor.compress(chunk))
+        spool.write(compressor.flush())
+        zinfo.CRC = crc
+        zinfo.file_size = file_size
+        zinfo.compress_size = spool.tell()
+        spool.seek(0)
+        return spool
+    except BaseException:
+        spool.close()
+        raise
+
+
+def _can_write_deflated_members(zipf: zipfile.ZipFile) -> bool:
+    """Whether _write_deflated_member can be used with this Python's zipfile.
+
+    It relies on zipfile internals, checked against CPython 3.8 to 3.13; on other
+    versions, members are deflated by zipfile itself while they are written.
+    """
+    return (
+        sys.implementation.name == 'cpython'
+        and (3, 8) <= sys.version_info[:2] <= (3, 13)
+        and all(hasattr(zipf, name) for name in ('_writecheck', '_didModify', 'start_dir', 'fp'))
+        and hasattr(zipfile.ZipInfo, 'FileHeader')
+    )
+
+
+def _set_compression_level(zinfo: zipfile.ZipInfo, compression_level: int) -> None:
+    if hasattr(zipfile.ZipInfo, 'compress_level'):  # Python 3.13+
+        zinfo.compress_level = compression_level
+    else:
+        zinfo._compresslevel = compression_level
+
+
+def _write_deflated_member(zipf: zipfile.ZipFile, zinfo: zipfile.ZipInfo, data) -> None:
+    """Appends an already deflated member to an archive opened for writing.
+
+    zipfile has no public API for this; the steps mirror ZipFile._open_to_write
+    followed by closing the write handle. Only call it if
+    _can_write_deflated_members(zipf) is True.
+    """
+    zinfo.flag_bits = 0
+    zip64 = zinfo.file_size > zipfile.ZIP64_LIMIT or zinfo.compress_size > zipfile.ZIP64_LIMIT
+    zipf.fp.seek(zipf.start_dir)
+    zinfo.header_offset = zipf.fp.tell()
+    zipf._writecheck(zinfo)
+    zipf._didModify = True
+    zipf.fp.write(zinfo.FileHeader(zip64))
+    shutil.copyfileobj(data, zipf.fp, _COPY_BUFFER_SIZE)
+    zipf.filelist.append(zinfo)
+    zipf.NameToInfo[zinfo.filename] = zinfo
+    zipf.start_dir = zipf.fp.tell()
+
+
+def write_zip(output_path: str, members: List[Tuple[str, str]], compression_level: int = 9,
+              max_workers: Optional[int] = None) -> Dict[str, int]:
+    """Writes files into a new ZIP archive.
+
+    Args:
+        output_path: Path of the archive to create (overwritten if it exists).
+        members: (file path, name in the archive) pairs, in archive order.
+        compression_level: Deflate level (0-9). 0 stores every member uncompressed.
+        max_workers: Number of members compressed concurrently. Defaults to
+            DEFAULT_MAX_WORKERS.
+
+    Returns:
+        A dictionary with 'uncompressed_size', 'compressed_size' (sum over members)
+        and 'stored_files' (members stored without compression).
+    """
+    stats = {'uncompressed_size': 0, 'compressed_size': 0, 'stored_files': 0}
+    max_workers = max_workers or DEFAULT_MAX_WORKERS
+
+    with zipfile.ZipFile(output_path, 'w', zipfile.ZIP_DEFLATED, compresslevel=compression_level) as zipf, \
+            ThreadPoolExecutor(max_workers=max_workers) as executor:
+
+        parallel = _can_write_deflated_members(zipf)
+
+        def write_member(file_path, zinfo, pending):
+            if pending is None:
+                # Stored members (and, without parallel deflating, all members) are
+                # streamed straight into the archive
+                with open(file_path, 'rb') as src, zipf.open(zinfo, 'w') as dest:
+                    shutil.copyfileobj(src, dest, _COPY_BUFFER_SIZE)
+                if zinfo.compress_type == zipfile.ZIP_STORED:
+                    stats['stored_files'] += 1
+            else:
+                with pending.result() as data:
+                    _write_deflated_member(zipf, zinfo, data)
+            stats['uncompressed_size'] += zinfo.file_size
+            stats['compressed_size'] += zinfo.compress_size
+
+        # Members are submitted ahead of the writer, but at most a bounded number
+        # of compressed members wait in memory or temporary files at any time
+        window = []
+        try:
+            for file_path, arcname in members:
+                zinfo = zipfile.ZipInfo.from_file(file_path, arcname)
+                if compression_level == 0 or is_precompressed(file_path) or zinfo.file_size == 0:
+                    zinfo.compress_type = zipfile.ZIP_STORED
+                    pending = None
+                else:
+                    zinfo.compress_type = zipfile.ZIP_DEFLATED
+                    _set_compression_level(zinfo, compression_level)
+                    pending = executor.submit(_deflate_member, file_path, zinfo, compression_level) if parallel else None
+                window.append((file_path, zinfo, pending))
+                if len(window) > 2 * max_workers:
+                    write_member(*window.pop(0))
+            while window:
+                write_member(*window.pop(0))
+        finally:
+            # Discard the compressed data of members that were not written after an error
+            for _, _, pending in window:
+                if pending is not None and not pending.cancel() and pending.exception() is None:
+                    pending.result().close()
+
+    return stats
+
+
+def compile_member_filter(patterns: Iterable[str]) -> Callable[[str], bool]:
+    """Compiles glob patterns into a single predicate on archive member names.
+
+    A pattern matches the full member name ('data/*.csv'), or only the base name if
+    the pattern contains no '/' ('*.csv').
+    """
+    full_name_patterns = []
+    base_name_patterns = []
+    for pattern in patterns:
+        (full_name_patterns if '/' in pattern else base_name_patterns).append(fnmatch.translate(pattern))
+    full_name_regex = re.compile('|'.join(full_name_patterns)) if full_name_patterns else None
+    base_name_regex = re.compile('|'.join(base_name_patterns)) if base_name_patterns else None
+
+    def matches(name: str) -> bool:
+        if full_name_regex is not None and full_name_regex.match(name):
+            return True
+        return base_name_regex is not None and base_name_regex.match(name.rstrip('/').rsplit('/', 1)[-1]) is not None
+
+    return matches
+
+
+def member_target_path(output_dir: str, member_name: str) -> str:
+    """Returns where an archive member is extracted to, with the sanitizing rules of
+    ZipFile.extract: absolute paths become relative, and '.', '..' and drive
+    components are dropped, so members can never be written outside output_dir.
+    """
+    arcname = member_name.replace('/', os.path.sep)
+    if os.path.altsep:
+        arcname = arcname.replace(os.path.altsep, os.path.sep)
+    arcname = os.path.splitdrive(arcname)[1]
+    invalid_path_parts = ('', os.path.curdir, os.path.pardir)
+    arcname = os.path.sep.join(x for x in arcname.split(os.path.sep) if x not in invalid_path_parts)
+    return os.path.normpath(os.path.join(output_dir, arcname))
+
+
+def extract_zip_members(zipf: zipfile.ZipFile, members: List[zipfile.ZipInfo], output_dir: str,
+                        max_workers: Optional[int] = None) -> List[str]:
+    """Extracts members of an open ZIP archive in parallel.
+
+    Directories are created up front on the calling thread; file members are then
+    streamed to disk through bounded buffers by the worker threads, all reading
+    from the same archive handle.
+
+    Args:
+        zipf: The archive, opened for reading.
+        members: The members to extract.
+        output_dir: Directory to extract into.
+        max_workers: Number of members extracted concurrently. Defaults to DEFAULT_MAX_WORKERS.
+
+    Returns:
+        The target paths of the extracted members, in member order.
+    """
+    targets = [member_target_path(output_dir, member.filename) for member in members]
+    directories = {target if member.is_dir() else os.path.dirname(target) for member, target in zip(members, targets)}
+    for directory in sorted(directories):
+        os.makedirs(directory, exist_ok=True)
+
+    # ZipFile.open/close update shared bookkeeping on the archive; reads of open
+    # members are synchronized by zipfile itself
+    open_lock = threading.Lock()
+
+    def extract_batch(batch):
+        for member, target in batch:
+            with open_lock:
+                source = zipf.open(member)
+            try:
+                with open(target, 'wb') as dest:
+                    shutil.copyfileobj(source, dest, _COPY_BUFFER_SIZE)
+            finally:
+                with open_lock:
+                    source.close()
+
+    # Small members are grouped into batches, so that per-task overhead does not
+    # dominate archives with many tiny files
+    batches = [[]]
+    batch_size = 0
+    for member, target in zip(members, targets):
+        if member.is_dir():
+            continue
+        if batch_size >= _EXTRACT_BATCH_BYTES or len(batches[-1]) >= _EXTRACT_BATCH_MEMBERS:
+            batches.append([])
+            batch_size = 0
+        batches[-1].append((member, target))
+        batch_size += member.file_size
+
+    max_workers = min(max_workers or DEFAULT_MAX_WORKERS, len(batches))
+    if max_workers <= 1:
+        for batch in batches:
+            extract_batch(batch)
+    else:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            for future in [executor.submit(extract_batch, batch) for batch in batches]:
+                future.result()
+    return targets
+
+
+def detect_archive_format(path: str) -> Optional[str]:
+    """Returns the archive format (a key of ARCHIVE_FORMATS) indicated by a file name."""
+    name = path.lower()
+    for archive_format, suffix in sorted(ARCHIVE_FORMATS.items(), key=lambda item: -len(item[1])):
+        if name.endswith(suffix):
+            return archive_format
+    return _FORMAT_ALIASES.get(os.path.splitext(name)[1])
+
+
+def check_archive_format(archive_format: str) -> None:
+    """Raises ValueError if the format is unknown or needs a package that is not installed."""
+    if archive_format not in ARCHIVE_FORMATS:
+        raise ValueError(f"Unsupported archive format: {archive_format}. Supported formats are: {', '.join(ARCHIVE_FORMATS)}")
+    if archive_format == 'tar.zst' and zstandard is None:
+        raise ValueError("Archive format 'tar.zst' requires the 'zstandard' package")
+
+
+class _ParallelBlockWriter:
+    """Write-only file object that compresses fixed-size blocks on a thread pool
+    and writes the compressed blocks to the target file in order."""
+
+    def __init__(self, fileobj, compress_block: Callable[[bytes], bytes], max_workers: int):
+        self._fileobj = fileobj
+        self._compress_block = compress_block
+        self._max_workers = max_workers
+        self._executor = ThreadPoolExecutor(max_workers=max_workers)
+        self._pending = []
+        self._submitted = 0
+        self._buffer = bytearray()
+
+    def write(self, data) -> int:
+        self._buffer += data
+        while len(self._buffer) >= _COMPRESSION_BLOCK_SIZE:
+            self._submit(bytes(self._buffer[:_COMPRESSION_BLOCK_SIZE]))
+            del self._buffer[:_COMPRESSION_BLOCK_SIZE]
+        return len(data)
+
+    def _submit(self, block: bytes) -> None:
+        self._pending.append(self._executor.submit(self._compress_block, block))
+        self._submitted += 1
+        # Bound the number of blocks held in memory
+        while len(self._pending) > 2 * self._max_workers:
+            self._fileobj.write(self._pending.pop(0).result())
+
+    def close(self) -> None:
+        try:
+            if self._buffer or not self._submitted:
+                self._submit(bytes(self._buffer))
+                self._buffer.clear()
+            while self._pending:
+                self._fileobj.write(self._pending.pop(0).result())
+        finally:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+
+
+def _open_compressed_writer(fileobj, archive_format: str, compression_level: int, max_workers: int):
+    """Returns a write-only file object that compresses into fileobj, and a function closing it."""
+    if archive_format == 'tar':
+        return fileobj, lambda: None
+    if archive_format == 'tar.zst':
+        compressor = zstandard.ZstdCompressor(level=compression_level, threads=max_workers if max_workers > 1 else 0)
+        writer = compressor.stream_writer(fileobj, closefd=False)
+        return writer, writer.close
+    if archive_format == 'tar.gz':
+        writer = _ParallelBlockWriter(fileobj, lambda block: gzip.compress(block, compression_level, mtime=0), max_workers)
+    else:
+        writer = _ParallelBlockWriter(fileobj, lambda block: lzma.compress(block, preset=compression_level), max_workers)
+    return writer, writer.close
+
+
+def _open_decompressed_reader(fileobj, archive_format: str):
+    """Returns a readable file object with the decompressed content of fileobj."""
+    if archive_format == 'tar':
+        return fileobj
+    if archive_format == 'tar.gz':
+        return gzip.GzipFile(fileobj=fileobj, mode='rb')
+    if archive_format == 'tar.xz':
+        return lzma.LZMAFile(fileobj, mode='rb')
+    return zstandard.ZstdDecompressor().stream_reader(fileobj, read_across_frames=True)
+
+
+def write_tar(output_path: str, members: List[Tuple[str, str]], archive_format: str = 'tar.gz',
+              compression_level: Optional[int] = None, max_workers: Optional[int] = None) -> Dict[str, int]:
+    """Writes files and directories into a new tar archive as a stream.
+
+    Args:
+        output_path: Path of the archive to create (overwritten if it exists).
+        members: (path, name in the archive) pairs, in archive order. Directories are
+            added as entries only, not recursively.
+        archive_format: 'tar', 'tar.gz', 'tar.xz' or 'tar.zst'.
+        compression_level: Codec compression level. Defaults to 6 for gzip and xz and
+            3 for zstd.
+        max_workers: Number of compression threads. Defaults to DEFAULT_MAX_WORKERS.
+
+    Returns:
+        A dictionary with 'uncompressed_size' (sum of member file sizes).
+    """
+    check_archive_format(archive_format)
+    if compression_level is None:
+        compression_level = _DEFAULT_LEVELS.get(archive_format, 0)
+    stats = {'uncompressed_size': 0}
+
+    with open(output_path, 'wb') as f:
+        writer, close_writer = _open_compressed_writer(f, archive_format, compression_level, max_workers or DEFAULT_MAX_WORKERS)
+        try:
+            with tarfile.open(fileobj=writer, mode='w|', format=tarfile.PAX_FORMAT, bufsize=_COPY_BUFFER_SIZE) as tar:
+                for path, arcname in members:
+                    tarinfo = tar.gettarinfo(path, arcname)
+                    if tarinfo.isreg():
+                        with open(path, 'rb') as member_file:
+                            tar.addfile(tarinfo, member_file)
+                        stats['uncompressed_size'] += tarinfo.size
+                    else:
+                        tar.addfile(tarinfo)
+        finally:
+            close_writer()
+    return stats
+
+
+def _extract_tar_member(tar: tarfile.TarFile, tarinfo: tarfile.TarInfo, output_dir: str) -> None:
+    if hasattr(tarfile, 'data_filter'):
+        tar.extract(tarinfo, output_dir, filter='data')
+        return
+    # Python versions without extraction filters: sanitize the name like ZipFile.extract
+    # and skip links, which could point outside output_dir
+    if tarinfo.issym() or tarinfo.islnk():
+        return
+    tarinfo.name = os.path.relpath(member_target_path(output_dir, tarinfo.name), output_dir)
+    tar.extract(tarinfo, output_dir)
+
+
+def read_tar(archive_path: str, output_dir: Optional[str] = None, archive_format: Optional[str] = None,
+             select: Optional[Callable[[str], bool]] = None) -> List[Dict[str, Any]]:
+    """Streams through a tar archive, extracting the selected members.
+
+    Members are extracted with the tarfile 'data' filter, so absolute paths, '..'
+    components and links pointing outside output_dir are rejected.
+
+    Args:
+        archive_path: Path of the archive.
+        output_dir: Directory to extract into. None only lists the members (dry run).
+        archive_format: Format of the archive. Detected from the file name if None.
+        select: Predicate on member names. None selects all members.
+
+    Returns:
+        The 'name', 'size' and 'type' of every selected member.
+    """
+    archive_format = archive_format or detect_archive_format(archive_path) or 'tar'
+    check_archive_format(archive_format)
+    selected = []
+    with open(archive_path, 'rb') as f:
+        reader = _open_decompressed_reader(f, archive_format)
+        try:
+            with tarfile.open(fileobj=reader, mode='r|', bufsize=_COPY_BUFFER_SIZE) as tar:
+                for tarinfo in tar:
+                    if select is not None and not select(tarinfo.name):
+                        continue
+                    selected.append({
+                        'name': tarinfo.name,
+                        'size': tarinfo.size,
+                        'type': 'directory' if tarinfo.isdir() else 'file' if tarinfo.isreg() else 'other'
+                    })
+                    if output_dir is not None:
+                        _extract_tar_member(tar, tarinfo, output_dir)
+        finally:
+            if reader is not f:
+                reader.close()
+    return selected
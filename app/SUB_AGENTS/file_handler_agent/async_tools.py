@@ -0,0 +1,63 @@
+"""Asyncio-native variants of the file handler tools.
+
+The tools in tools.py do blocking file system work. Awaited directly by the ADK
+runner they would stall its event loop, and with it every other session. The
+variants created here run the blocking function on a dedicated, bounded thread
+pool and await its completion, so the event loop stays free.
+
+Long-running tools (archives, batch operations, directory-wide searches, ...) get a
+separate, smaller pool: a few large jobs can fill it, but never delay the quick
+calls (reads, writes, stats) of other sessions queued on the interactive pool.
+"""
+
+import asyncio
+import contextvars
+import functools
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Awaitable, Callable
+
+# Number of threads running quick tool calls
+IO_POOL_SIZE = int(os.getenv("FILE_HANDLER_IO_THREADS", "32"))
+
+# Number of threads running long-running tool calls
+BULK_POOL_SIZE = int(os.getenv("FILE_HANDLER_BULK_THREADS", "4"))
+
+# Tools whose calls can take seconds to minutes on large inputs
+BULK_TOOLS = frozenset([
+    "list_folder_tree",
+    "get_files_metadata",
+    "compare_files",
+    "calculate_file_hash",
+    "find_duplicate_files",
+    "zip_files",
+    "extract_zip",
+    "archive_create",
+    "archive_extract",
+    "batch_process_files",
+    "search_directory_content",
+    "grep_directory",
+    "detect_file_changes",
+    "file_versioning",
+])
+
+_io_pool = ThreadPoolExecutor(max_workers=IO_POOL_SIZE, thread_name_prefix="file-handler-io")
+_bulk_pool = ThreadPoolExecutor(max_workers=BULK_POOL_SIZE, thread_name_prefix="file-handler-bulk")
+
+
+def async_tool(func: Callable[..., Any]) -> Callable[..., Awaitable[Any]]:
+    """Returns an async variant of a blocking tool function.
+
+    The variant has the same name, signature and docstring, so it is declared to the
+    model exactly like the original. Calls run on the bulk pool if the tool is in
+    BULK_TOOLS and on the interactive pool otherwise, with the caller's context variables.
+    """
+    pool = _bulk_pool if func.__name__ in BULK_TOOLS else _io_pool
+
+    @functools.wraps(func)
+    async def run_in_pool(*args, **kwargs):
+        context = contextvars.copy_context()
+        return await asyncio.get_running_loop().run_in_executor(
+            pool, functools.partial(context.run, func, *args, **kwargs))
+
+    return run_in_pool
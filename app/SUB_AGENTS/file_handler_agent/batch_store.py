@@ -0,0 +1,210 @@
+"""Persistent progress journal for batch_process_files.
+
+Every non-dry-run batch is recorded with its parameters and one row per matched
+file. Files are marked done as soon as they are processed, so a batch that was
+interrupted (e.g. by a worker restart) can be resumed by its batch ID, and its
+progress can be polled from any thread or process while it runs.
+
+The database is shared by all processes using the same state directory. A batch is
+processed by whoever holds its lease: an owner token and a heartbeat timestamp in
+the batch row, renewed while it runs. A batch whose heartbeat is older than the
+lease is no longer being processed and can be taken over.
+"""
+
+import json
+import os
+import sqlite3
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+# Values of the items.status column
+PENDING = 'pending'
+DONE = 'done'
+FAILED = 'failed'
+
+# Values of the batches.status column once a batch has finished
+FINISHED_STATUSES = ('completed', 'completed_with_errors')
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS batches (
+    batch_id TEXT PRIMARY KEY,
+    operation TEXT NOT NULL,
+    params TEXT NOT NULL,
+    status TEXT NOT NULL,
+    total INTEGER NOT NULL,
+    created_at TEXT NOT NULL,
+    updated_at TEXT NOT NULL,
+    owner TEXT,
+    heartbeat_at REAL
+);
+CREATE TABLE IF NOT EXISTS items (
+    batch_id TEXT NOT NULL,
+    idx INTEGER NOT NULL,
+    path TEXT NOT NULL,
+    status TEXT NOT NULL,
+    result TEXT,
+    signature TEXT,
+    PRIMARY KEY (batch_id, idx)
+) WITHOUT ROWID;
+"""
+
+# Columns added after the first version of the schema, created on open if missing
+_ADDED_COLUMNS = {
+    'batches': [('owner', 'TEXT'), ('heartbeat_at', 'REAL')],
+    'items': [('signature', 'TEXT')],
+}
+
+
+class BatchStore:
+    """SQLite-backed storage of batches and the per-file progress."""
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        self._conn = sqlite3.connect(db_path, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+        for table, columns in _ADDED_COLUMNS.items():
+            existing = {row[1] for row in self._conn.execute(f"PRAGMA table_info({table})")}
+            for name, column_type in columns:
+                if name not in existing:
+                    try:
+                        self._conn.execute(f"ALTER TABLE {table} ADD COLUMN {name} {column_type}")
+                    except sqlite3.OperationalError:
+                        # Added concurrently by another process
+                        pass
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def __enter__(self) -> "BatchStore":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def create(self, batch_id: str, operation: str, params: Dict[str, Any], paths: List[str],
+               owner: str, signatures: Optional[List[Any]] = None) -> None:
+        """Records a new batch with all of its files pending, leased to owner.
+
+        Args:
+            batch_id: ID of the batch.
+            operation: The batch operation.
+            params: Parameters needed to process the files, stored as JSON.
+            paths: Paths of the files, in processing order.
+            owner: Token of the caller, which holds the lease of the new batch.
+            signatures: Optional JSON-serializable value per path describing the file
+                before it is processed (see pending_items).
+        """
+        now = datetime.now().isoformat()
+        if signatures is None:
+            signatures = [None] * len(paths)
+        with self._conn:
+            self._conn.execute(
+                "INSERT INTO batches (batch_id, operation, params, status, total, created_at, updated_at, owner, heartbeat_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (batch_id, operation, json.dumps(params), 'running', len(paths), now, now, owner, time.time()))
+            self._conn.executemany(
+                "INSERT INTO items (batch_id, idx, path, status, signature) VALUES (?, ?, ?, ?, ?)",
+                ((batch_id, index, path, PENDING, None if signature is None else json.dumps(signature))
+                 for index, (path, signature) in enumerate(zip(paths, signatures))))
+
+    def acquire(self, batch_id: str, owner: str, lease_seconds: float) -> bool:
+        """Takes the lease of a batch unless another owner renewed it in the last lease_seconds.
+
+        Returns:
+            True if owner now holds the lease (the batch is then marked 'running').
+        """
+        now = time.time()
+        with self._conn:
+            cursor = self._conn.execute(
+                "UPDATE batches SET owner = ?, heartbeat_at = ?, status = 'running', updated_at = ? "
+                "WHERE batch_id = ? AND (owner IS NULL OR owner = ? OR heartbeat_at < ?)",
+                (owner, now, datetime.now().isoformat(), batch_id, owner, now - lease_seconds))
+        return cursor.rowcount == 1
+
+    def heartbeat(self, batch_id: str, owner: str) -> bool:
+        """Renews the lease of a batch. Returns False if owner no longer holds it."""
+        with self._conn:
+            cursor = self._conn.execute(
+                "UPDATE batches SET heartbeat_at = ? WHERE batch_id = ? AND owner = ?",
+                (time.time(), batch_id, owner))
+        return cursor.rowcount == 1
+
+    def release(self, batch_id: str, owner: str, status: Optional[str] = None) -> None:
+        """Gives up the lease of a batch, setting its status, if owner still holds it."""
+        with self._conn:
+            self._conn.execute(
+                "UPDATE batches SET owner = NULL, heartbeat_at = NULL, status = COALESCE(?, status), updated_at = ? "
+                "WHERE batch_id = ? AND owner = ?",
+                (status, datetime.now().isoformat(), batch_id, owner))
+
+    def prune(self, max_age_seconds: float) -> int:
+        """Deletes the batches that finished more than max_age_seconds ago. Returns how many."""
+        cutoff = (datetime.now() - timedelta(seconds=max_age_seconds)).isoformat()
+        placeholders = ", ".join("?" * len(FINISHED_STATUSES))
+        with self._conn:
+            batch_ids = [row[0] for row in self._conn.execute(
+                f"SELECT batch_id FROM batches WHERE status IN ({placeholders}) AND updated_at < ?",
+                (*FINISHED_STATUSES, cutoff))]
+            for batch_id in batch_ids:
+                self._conn.execute("DELETE FROM items WHERE batch_id = ?", (batch_id,))
+                self._conn.execute("DELETE FROM batches WHERE batch_id = ?", (batch_id,))
+        return len(batch_ids)
+
+    def load(self, batch_id: str) -> Optional[Dict[str, Any]]:
+        """Returns the batch record ('operation', 'params', 'status', 'total', 'owner', ...) or None."""
+        row = self._conn.execute(
+            "SELECT operation, params, status, total, created_at, updated_at, owner, heartbeat_at FROM batches WHERE batch_id = ?",
+            (batch_id,)).fetchone()
+        if row is None:
+            return None
+        return {
+            'batch_id': batch_id,
+            'operation': row[0],
+            'params': json.loads(row[1]),
+            'status': row[2],
+            'total': row[3],
+            'created_at': row[4],
+            'updated_at': row[5],
+            'owner': row[6],
+            'heartbeat_at': row[7]
+        }
+
+    def batch_ids(self) -> List[str]:
+        """Returns the IDs of all recorded batches, oldest first."""
+        return [row[0] for row in self._conn.execute("SELECT batch_id FROM batches ORDER BY created_at")]
+
+    def paths(self, batch_id: str) -> List[str]:
+        """Returns the paths of all files of a batch in index order."""
+        return [row[0] for row in self._conn.execute(
+            "SELECT path FROM items WHERE batch_id = ? ORDER BY idx", (batch_id,))]
+
+    def pending_items(self, batch_id: str) -> List[Tuple[int, str, Any]]:
+        """Returns the (index, path, signature) of every file not processed yet, in index order."""
+        rows = self._conn.execute(
+            "SELECT idx, path, signature FROM items WHERE batch_id = ? AND status = ? ORDER BY idx", (batch_id, PENDING))
+        return [(index, path, None if signature is None else json.loads(signature)) for index, path, signature in rows]
+
+    def record_results(self, batch_id: str, results: Iterable[Tuple[int, str, Dict[str, Any]]]) -> None:
+        """Stores (index, status, result) of processed files in one transaction."""
+        now = datetime.now().isoformat()
+        with self._conn:
+            self._conn.executemany(
+                "UPDATE items SET status = ?, result = ? WHERE batch_id = ? AND idx = ?",
+                ((status, json.dumps(result), batch_id, index) for index, status, result in results))
+            self._conn.execute("UPDATE batches SET updated_at = ? WHERE batch_id = ?", (now, batch_id))
+
+    def counts(self, batch_id: str) -> Dict[str, int]:
+        """Returns the number of pending, done and failed files."""
+        counts = {PENDING: 0, DONE: 0, FAILED: 0}
+        counts.update(self._conn.execute(
+            "SELECT status, COUNT(*) FROM items WHERE batch_id = ? GROUP BY status", (batch_id,)))
+        return counts
+
+    def results(self, batch_id: str, offset: int = 0, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Returns the results of processed files in index order."""
+        rows = self._conn.execute(
+            "SELECT result FROM items WHERE batch_id = ? AND status != ? ORDER BY idx LIMIT ? OFFSET ?",
+            (batch_id, PENDING, -1 if limit is None else limit, offset))
+        return [json.loads(row[0]) for row in rows]
@@ -0,0 +1,238 @@
+"""File copy engine used by copy_file and the batch copy and backup operations.
+
+The data of a file is copied with the cheapest mechanism the platform and file
+system support, in this order:
+
+1. 'reflink': the destination shares the source's blocks (FICLONE ioctl on btrfs,
+   XFS and other copy-on-write file systems), so copying is near-instant whatever
+   the file size.
+2. 'copy_file_range': the kernel copies the data without passing it through user
+   space (and may still share blocks, e.g. on NFS 4.2 or XFS).
+3. 'sendfile': an in-kernel copy, for kernels or file system pairs without
+   copy_file_range.
+4. 'buffered': plain reads and writes.
+
+A mechanism that fails as unsupported is skipped for the rest of the file (and
+remembered per pair of devices), and the next one continues from where it stopped.
+Metadata (permission bits, timestamps and extended attributes, like shutil.copy2)
+is applied through the open descriptors from the source's single fstat.
+"""
+
+import errno
+import os
+import shutil
+import stat
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, List, Optional, Tuple, Union
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None
+
+DEFAULT_MAX_WORKERS = 8
+
+COPY_METHODS = ['reflink', 'copy_file_range', 'sendfile', 'buffered']
+
+# ioctl request of the Linux FICLONE operation (_IOW(0x94, 9, int))
+_FICLONE = 0x40049409
+
+# Largest number of bytes requested from copy_file_range/sendfile at once
+_KERNEL_COPY_SIZE = 1024 * 1024 * 1024
+
+_BUFFER_SIZE = 1024 * 1024
+
+# Errors meaning that a copy mechanism is not available for a pair of files
+_UNSUPPORTED_ERRNOS = {
+    errno.ENOSYS, errno.EXDEV, errno.EINVAL, errno.EOPNOTSUPP, errno.ENOTTY,
+    errno.EBADF, errno.EPERM, getattr(errno, 'ENOTSUP', errno.EOPNOTSUPP)
+}
+
+# Mechanisms found to be unsupported, per (source device, destination device)
+_unsupported = {}
+_unsupported_lock = threading.Lock()
+
+
+def _is_unsupported(devices: Tuple[int, int], method: str) -> bool:
+    with _unsupported_lock:
+        return method in _unsupported.get(devices, ())
+
+
+def _mark_unsupported(devices: Tuple[int, int], method: str) -> None:
+    with _unsupported_lock:
+        _unsupported.setdefault(devices, set()).add(method)
+
+
+def _reflink(src_fd: int, dst_fd: int) -> None:
+    fcntl.ioctl(dst_fd, _FICLONE, src_fd)
+
+
+def _kernel_copy(copy_function, src_fd: int, dst_fd: int, offset: int, size: int) -> Tuple[int, Optional[OSError]]:
+    """Copies from offset until size (or the end of the source) with copy_file_range or sendfile.
+
+    Returns the offset reached, which is less than size only if the source shrank or
+    an error occurred, and the error.
+    """
+    try:
+        while offset < size:
+            if copy_function is os.sendfile:
+                os.lseek(dst_fd, offset, os.SEEK_SET)
+                copied = os.sendfile(dst_fd, src_fd, offset, min(size - offset, _KERNEL_COPY_SIZE))
+            else:
+                copied = os.copy_file_range(src_fd, dst_fd, min(size - offset, _KERNEL_COPY_SIZE), offset, offset)
+            if copied == 0:
+                break
+            offset += copied
+    except OSError as e:
+        return offset, e
+    return offset, None
+
+
+def _buffered_copy(src_fd: int, dst_fd: int, offset: int) -> int:
+    """Copies from offset to the end of the source with reads and writes. Returns the final offset."""
+    os.lseek(src_fd, offset, os.SEEK_SET)
+    os.lseek(dst_fd, offset, os.SEEK_SET)
+    buffer = bytearray(_BUFFER_SIZE)
+    view = memoryview(buffer)
+    with open(src_fd, 'rb', buffering=0, closefd=False) as source:
+        while True:
+            read = source.readinto(buffer)
+            if not read:
+                return offset
+            written = 0
+            while written < read:
+                written += os.write(dst_fd, view[written:read])
+            offset += read
+
+
+def _copy_xattrs(src_fd: int, dst_fd: int) -> None:
+    """Copies the extended attributes, ignoring those the destination does not support."""
+    try:
+        names = os.listxattr(src_fd)
+    except OSError as e:
+        if e.errno in (errno.ENOTSUP, errno.ENODATA, errno.EINVAL):
+            return
+        raise
+    for name in names:
+        try:
+            os.setxattr(dst_fd, name, os.getxattr(src_fd, name))
+        except OSError as e:
+            if e.errno not in (errno.EPERM, errno.ENOTSUP, errno.ENODATA, errno.EINVAL):
+                raise
+
+
+def fast_copy(src: str, dst: str, preserve_metadata: bool = True) -> str:
+    """Copies a file's content (and by default its metadata) to dst, like shutil.copy2.
+
+    If dst is a directory, the file is copied into it under its own name. An existing
+    destination file is overwritten.
+
+    Args:
+        src: Path of the file to copy. Symbolic links are followed.
+        dst: Destination path.
+        preserve_metadata: If True, copy permission bits, access and modification times
+            and extended attributes. If False, only the permission bits are copied.
+
+    Returns:
+        The name of the mechanism that copied the data (see COPY_METHODS). If several
+        were needed (e.g. a mechanism failed midway), the last one.
+
+    Raises:
+        shutil.SameFileError: If src and dst are the same file.
+        OSError: If the file cannot be copied.
+    """
+    if os.path.isdir(dst):
+        dst = os.path.join(dst, os.path.basename(src))
+
+    with open(src, 'rb', buffering=0) as source:
+        src_fd = source.fileno()
+        src_stat = os.fstat(src_fd)
+        if stat.S_ISFIFO(src_stat.st_mode):
+            raise shutil.SpecialFileError(f"`{src}` is a named pipe")
+        try:
+            dst_stat = os.stat(dst)
+            if (dst_stat.st_dev, dst_stat.st_ino) == (src_stat.st_dev, src_stat.st_ino):
+                raise shutil.SameFileError(f"{src!r} and {dst!r} are the same file")
+        except FileNotFoundError:
+            pass
+
+        with open(dst, 'wb', buffering=0) as destination:
+            dst_fd = destination.fileno()
+            devices = (src_stat.st_dev, os.fstat(dst_fd).st_dev)
+            method = _copy_data(src_fd, dst_fd, src_stat, devices)
+
+            if preserve_metadata:
+                if hasattr(os, 'listxattr'):
+                    _copy_xattrs(src_fd, dst_fd)
+                if os.utime in os.supports_fd:
+                    os.utime(dst_fd, ns=(src_stat.st_atime_ns, src_stat.st_mtime_ns))
+            if os.chmod in os.supports_fd:
+                os.chmod(dst_fd, stat.S_IMODE(src_stat.st_mode))
+            else:
+                os.chmod(dst, stat.S_IMODE(src_stat.st_mode))
+
+        if preserve_metadata and os.utime not in os.supports_fd:
+            os.utime(dst, ns=(src_stat.st_atime_ns, src_stat.st_mtime_ns))
+    return method
+
+
+def _copy_data(src_fd: int, dst_fd: int, src_stat: os.stat_result, devices: Tuple[int, int]) -> str:
+    """Copies the content of src_fd into the empty dst_fd. Returns the mechanism that did it."""
+    size = src_stat.st_size
+    if fcntl is not None and sys.platform.startswith('linux') and size > 0 and not _is_unsupported(devices, 'reflink'):
+        try:
+            _reflink(src_fd, dst_fd)
+            return 'reflink'
+        except OSError as e:
+            if e.errno not in _UNSUPPORTED_ERRNOS:
+                raise
+            _mark_unsupported(devices, 'reflink')
+
+    offset = 0
+    for method, copy_function in (('copy_file_range', getattr(os, 'copy_file_range', None)),
+                                  ('sendfile', getattr(os, 'sendfile', None))):
+        if copy_function is None or not sys.platform.startswith('linux') or _is_unsupported(devices, method):
+            continue
+        offset, error = _kernel_copy(copy_function, src_fd, dst_fd, offset, size)
+        if error is not None:
+            # ENOSPC, EIO, ... are real errors; anything else means "try the next mechanism"
+            if error.errno not in _UNSUPPORTED_ERRNOS:
+                raise error
+            _mark_unsupported(devices, method)
+            continue
+        # The source may have grown since it was stat'ed (or, like files in /proc, report
+        # a size of 0): copy the rest like cp does
+        if offset >= size and _buffered_copy(src_fd, dst_fd, offset) > offset and offset == 0:
+            return 'buffered'
+        return method
+
+    _buffered_copy(src_fd, dst_fd, offset)
+    return 'buffered'
+
+
+def fast_copy_files(pairs: Iterable[Tuple[str, str]], max_workers: Optional[int] = None,
+                    preserve_metadata: bool = True) -> List[Union[str, Exception]]:
+    """Copies many files in parallel with fast_copy.
+
+    Args:
+        pairs: (source, destination) paths.
+        max_workers: Number of files copied concurrently. Defaults to DEFAULT_MAX_WORKERS.
+        preserve_metadata: See fast_copy.
+
+    Returns:
+        One entry per pair, in the same order: the copy mechanism used, or the exception
+        raised while copying that file.
+    """
+    def copy(pair):
+        try:
+            return fast_copy(pair[0], pair[1], preserve_metadata)
+        except Exception as e:
+            return e
+
+    pairs = list(pairs)
+    if len(pairs) <= 1:
+        return [copy(pair) for pair in pairs]
+    with ThreadPoolExecutor(max_workers=min(max_workers or DEFAULT_MAX_WORKERS, len(pairs))) as executor:
+        return list(executor.map(copy, pairs))
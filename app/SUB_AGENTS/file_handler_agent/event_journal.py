@@ -0,0 +1,171 @@
+"""Bounded, optionally persistent journal of file system events used by watch_directory.
+
+Events are numbered with increasing sequence numbers, so that clients can poll for
+the events after the last one they have seen. Only the most recent events are
+kept in memory; an optional append-only JSON Lines file keeps all of them.
+Bursts of modify events for the same file are debounced into a single event.
+Access events (a file being opened or closed) are recorded as they arrive and
+don't end such a burst.
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Any, Dict, List, Optional
+
+DEFAULT_MAX_EVENTS = 10000
+DEFAULT_DEBOUNCE_SECONDS = 0.2
+
+# Event types that report access to a file rather than a change to it
+ACCESS_EVENT_TYPES = ('opened', 'closed', 'closed_no_write')
+
+
+class EventJournal:
+    """Thread-safe ring buffer of file system events."""
+
+    def __init__(self, max_events: int = DEFAULT_MAX_EVENTS, debounce_seconds: float = DEFAULT_DEBOUNCE_SECONDS,
+                 journal_path: Optional[str] = None):
+        """Creates an empty journal.
+
+        Args:
+            max_events: Maximum number of events kept in memory. Older events are
+                dropped (but remain in the journal file, if any).
+            debounce_seconds: Create and modify events for a file are held back until no
+                further event arrived for it for this long; the modify events of such a burst
+                are folded into the first event. 0 disables debouncing.
+            journal_path: Optional JSON Lines file all events are appended to.
+        """
+        self.max_events = max_events
+        self.debounce_seconds = debounce_seconds
+        self.journal_path = journal_path
+        self.last_seq = 0
+        self.coalesced_count = 0
+        self._events = deque(maxlen=max_events)
+        # Path -> (event, monotonic time of the last event for the path), oldest first
+        self._pending = OrderedDict()
+        self._lock = threading.Lock()
+        self._journal_file = None
+        if journal_path:
+            os.makedirs(os.path.dirname(journal_path), exist_ok=True)
+            # Continue the numbering of an existing journal
+            last_event = self._read_journal(0, None, None)[-1:]
+            if last_event:
+                self.last_seq = last_event[0]['seq']
+            self._journal_file = open(journal_path, 'a', encoding='utf-8')
+
+    def add(self, event_info: Dict[str, Any]) -> None:
+        """Records an event ('type', 'path', ... dictionary)."""
+        now = time.monotonic()
+        with self._lock:
+            self._flush_pending(now)
+            if event_info['type'] in ACCESS_EVENT_TYPES:
+                # Committed right away, leaving a pending modify event of the file waiting
+                self._commit(event_info)
+                return
+            path = event_info['path']
+            pending = self._pending.pop(path, None)
+            if self.debounce_seconds > 0 and event_info['type'] in ('created', 'modified'):
+                if pending is not None and event_info['type'] == 'modified':
+                    # Fold into the created/modified event already waiting for this file
+                    self.coalesced_count += 1
+                    event_info = pending[0]
+                elif pending is not None:
+                    self._commit(pending[0])
+                self._pending[path] = (event_info, now)
+                return
+            if pending is not None:
+                self._commit(pending[0])
+            self._commit(event_info)
+
+    def events_since(self, since_seq: int = 0, limit: Optional[int] = None) -> Dict[str, Any]:
+        """Returns the events with a sequence number greater than since_seq.
+
+        Events that were already dropped from memory are read back from the journal
+        file if there is one; otherwise 'missed_events' reports how many are lost.
+
+        Args:
+            since_seq: The last sequence number the caller has seen (0 for all events).
+            limit: Maximum number of events to return. None means no limit.
+
+        Returns:
+            A dictionary with 'events', 'last_seq' (sequence number of the last
+            returned event, or since_seq if there is none), 'latest_seq' and
+            'missed_events'.
+        """
+        with self._lock:
+            self._flush_pending(time.monotonic())
+            latest_seq = self.last_seq
+            oldest_seq = self._events[0]['seq'] if self._events else latest_seq + 1
+            events = []
+            if since_seq + 1 < oldest_seq and self._journal_file is not None:
+                self._journal_file.flush()
+                events = self._read_journal(since_seq, oldest_seq, limit)
+            events.extend(event for event in self._events if event['seq'] > since_seq)
+
+        missed = 0
+        if not events or events[0]['seq'] > since_seq + 1:
+            first_available = events[0]['seq'] if events else latest_seq + 1
+            missed = max(first_available - since_seq - 1, 0)
+        if limit is not None:
+            events = events[:limit]
+        return {
+            'events': events,
+            'last_seq': events[-1]['seq'] if events else since_seq,
+            'latest_seq': latest_seq,
+            'missed_events': missed
+        }
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._events) + len(self._pending)
+
+    def commit_pending(self) -> None:
+        """Commits the debounced events still held back, without waiting for the debounce delay."""
+        with self._lock:
+            while self._pending:
+                self._commit(self._pending.popitem(last=False)[1][0])
+
+    def close(self) -> None:
+        """Commits pending events and closes the journal file."""
+        self.commit_pending()
+        with self._lock:
+            if self._journal_file is not None:
+                self._journal_file.close()
+                self._journal_file = None
+
+    def _flush_pending(self, now: float) -> None:
+        while self._pending:
+            path, (event, last_seen) = next(iter(self._pending.items()))
+            if now - last_seen < self.debounce_seconds:
+                break
+            del self._pending[path]
+            self._commit(event)
+
+    def _commit(self, event_info: Dict[str, Any]) -> None:
+        self.last_seq += 1
+        event_info['seq'] = self.last_seq
+        self._events.append(event_info)
+        if self._journal_file is not None:
+            try:
+                self._journal_file.write(json.dumps(event_info) + "\n")
+            except OSError as e:
+                logging.warning(f"Could not write event journal {self.journal_path}: {e}")
+
+    def _read_journal(self, since_seq: int, before_seq: Optional[int], limit: Optional[int]) -> List[Dict[str, Any]]:
+        events = []
+        if not os.path.exists(self.journal_path):
+            return events
+        try:
+            with open(self.journal_path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    event = json.loads(line)
+                    if (before_seq is not None and event['seq'] >= before_seq) or (limit is not None and len(events) >= limit):
+                        break
+                    if event['seq'] > since_seq:
+                        events.append(event)
+        except (OSError, ValueError) as e:
+            logging.warning(f"Could not read event journal {self.journal_path}: {e}")
+        return events
@@ -0,0 +1,397 @@
+"""Streaming line diff and chunked binary comparison used by compare_files.
+
+Files are never loaded whole: every line is reduced to a 64-bit hash while the
+file is streamed, the diff runs on those integer IDs, and only the lines that
+end up in the emitted hunks are read back in a second pass. Lines are compared
+with their line endings, unless the caller asks to ignore them.
+
+The diff strips the common prefix and suffix, then uses patience diff (lines that
+occur exactly once on both sides anchor the alignment), falling back to Myers'
+O(ND) algorithm for regions without unique lines. Regions whose edit distance
+exceeds a limit are reported as a single replacement instead of searching further.
+"""
+
+import bisect
+from array import array
+from collections import Counter
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+# Number of leading bytes inspected to decide whether a file is binary
+BINARY_SNIFF_SIZE = 8192
+
+DEFAULT_CONTEXT_LINES = 3
+
+# Myers' algorithm gives up on regions needing more edits than this
+DEFAULT_MAX_EDIT_DISTANCE = 1000
+
+_COMPARE_CHUNK_SIZE = 1024 * 1024
+_READ_BUFFER_SIZE = 1024 * 1024
+
+# Emitted after a diff line that has no newline at the end of the file, as diff does
+NO_NEWLINE_MARKER = "\\ No newline at end of file"
+
+# (tag, i1, i2, j1, j2) with the same meaning as difflib's opcodes
+Opcode = Tuple[str, int, int, int, int]
+
+
+def is_binary_file(path: str) -> bool:
+    """Returns True if the file contains a NUL byte in its first BINARY_SNIFF_SIZE bytes."""
+    with open(path, 'rb') as f:
+        return b"\0" in f.read(BINARY_SNIFF_SIZE)
+
+
+def first_difference(path1: str, path2: str) -> Optional[int]:
+    """Compares two files in large chunks.
+
+    Returns:
+        The offset of the first differing byte, or None if the files are identical.
+        If one file is a prefix of the other, the offset is the shorter file's size.
+    """
+    offset = 0
+    with open(path1, 'rb') as f1, open(path2, 'rb') as f2:
+        while True:
+            chunk1 = f1.read(_COMPARE_CHUNK_SIZE)
+            chunk2 = f2.read(_COMPARE_CHUNK_SIZE)
+            if chunk1 != chunk2:
+                length = min(len(chunk1), len(chunk2))
+                if chunk1[:length] == chunk2[:length]:
+                    return offset + length
+                low, high = 0, length
+                # Binary search for the first differing byte within the chunk
+                while high - low > 1:
+                    middle = (low + high) // 2
+                    if chunk1[low:middle] == chunk2[low:middle]:
+                        low = middle
+                    else:
+                        high = middle
+                return offset + low
+            if not chunk1:
+                return None
+            offset += len(chunk1)
+
+
+def line_ids(path: str, ignore_line_endings: bool = False) -> array:
+    """Streams a file and returns the hash of every line, including its line ending
+    unless ignore_line_endings is True."""
+    ids = array('q')
+    with open(path, 'rb', buffering=_READ_BUFFER_SIZE) as f:
+        if ignore_line_endings:
+            for line in f:
+                ids.append(hash(line.rstrip(b"\r\n")))
+        else:
+            for line in f:
+                ids.append(hash(line))
+    return ids
+
+
+def _myers_matches(a, b, max_edit_distance: int) -> Optional[List[Tuple[int, int]]]:
+    """Returns the matched index pairs of a shortest edit script, or None if more
+    than max_edit_distance edits are needed."""
+    n, m = len(a), len(b)
+    v = {1: 0}
+    trace = []
+    for d in range(max_edit_distance + 1):
+        trace.append(dict(v))
+        for k in range(-d, d + 1, 2):
+            if k == -d or (k != d and v[k - 1] < v[k + 1]):
+                x = v[k + 1]
+            else:
+                x = v[k - 1] + 1
+            y = x - k
+            while x < n and y < m and a[x] == b[y]:
+                x += 1
+                y += 1
+            v[k] = x
+            if x >= n and y >= m:
+                return _myers_backtrack(trace, n, m)
+    return None
+
+
+def _myers_backtrack(trace: List[Dict[int, int]], n: int, m: int) -> List[Tuple[int, int]]:
+    matches = []
+    x, y = n, m
+    for d in range(len(trace) - 1, -1, -1):
+        v = trace[d]
+        k = x - y
+        if k == -d or (k != d and v[k - 1] < v[k + 1]):
+            prev_k = k + 1
+        else:
+            prev_k = k - 1
+        prev_x = v[prev_k]
+        prev_y = prev_x - prev_k
+        while x > prev_x and y > prev_y:
+            x -= 1
+            y -= 1
+            matches.append((x, y))
+        x, y = prev_x, prev_y
+    matches.reverse()
+    return matches
+
+
+def _unique_anchors(a, a_lo: int, a_hi: int, b, b_lo: int, b_hi: int) -> List[Tuple[int, int]]:
+    """Returns the longest increasing sequence of lines that occur exactly once in
+    both regions (the patience diff anchors)."""
+    counts_a = Counter(a[a_lo:a_hi])
+    counts_b = Counter(b[b_lo:b_hi])
+    position_b = {b[j]: j for j in range(b_lo, b_hi) if counts_b[b[j]] == 1}
+    candidates = [(i, position_b[a[i]]) for i in range(a_lo, a_hi)
+                  if counts_a[a[i]] == 1 and a[i] in position_b]
+    if not candidates:
+        return []
+
+    # Patience sorting on the b positions finds the longest increasing subsequence
+    pile_tops = []
+    pile_indices = []
+    predecessors = [-1] * len(candidates)
+    for index, (_, j) in enumerate(candidates):
+        pile = bisect.bisect_left(pile_tops, j)
+        if pile > 0:
+            predecessors[index] = pile_indices[pile - 1]
+        if pile == len(pile_tops):
+            pile_tops.append(j)
+            pile_indices.append(index)
+        else:
+            pile_tops[pile] = j
+            pile_indices[pile] = index
+
+    anchors = []
+    index = pile_indices[-1]
+    while index != -1:
+        anchors.append(candidates[index])
+        index = predecessors[index]
+    anchors.reverse()
+    return anchors
+
+
+def matching_blocks(a, b, algorithm: str = "patience",
+                    max_edit_distance: int = DEFAULT_MAX_EDIT_DISTANCE) -> List[Tuple[int, int, int]]:
+    """Computes the matching blocks (i, j, size) between two sequences, in order.
+
+    Args:
+        a: The first sequence (e.g. line IDs).
+        b: The second sequence.
+        algorithm: 'patience' (default) or 'myers'. Myers computes a minimal diff,
+            patience a more readable one that aligns on unique lines. Either falls
+            back to the other where it cannot be applied.
+        max_edit_distance: Regions needing more edits are treated as replaced.
+    """
+    blocks = []
+
+    def add_match(i, j, size=1):
+        if blocks and blocks[-1][0] + blocks[-1][2] == i and blocks[-1][1] + blocks[-1][2] == j:
+            blocks[-1] = (blocks[-1][0], blocks[-1][1], blocks[-1][2] + size)
+        elif size:
+            blocks.append((i, j, size))
+
+    # Regions to process, and matches to record, in reverse order
+    stack = [('region', 0, len(a), 0, len(b), algorithm)]
+    while stack:
+        item = stack.pop()
+        if item[0] == 'match':
+            add_match(*item[1:])
+            continue
+        _, a_lo, a_hi, b_lo, b_hi, region_algorithm = item
+
+        # Common prefix and suffix
+        prefix = 0
+        while a_lo + prefix < a_hi and b_lo + prefix < b_hi and a[a_lo + prefix] == b[b_lo + prefix]:
+            prefix += 1
+        suffix = 0
+        while a_hi - suffix > a_lo + prefix and b_hi - suffix > b_lo + prefix and a[a_hi - suffix - 1] == b[b_hi - suffix - 1]:
+            suffix += 1
+        add_match(a_lo, b_lo, prefix)
+        if suffix:
+            stack.append(('match', a_hi - suffix, b_hi - suffix, suffix))
+        a_lo += prefix
+        b_lo += prefix
+        a_hi -= suffix
+        b_hi -= suffix
+        if a_lo == a_hi or b_lo == b_hi:
+            continue
+
+        anchors = _unique_anchors(a, a_lo, a_hi, b, b_lo, b_hi) if region_algorithm == "patience" else []
+        if anchors:
+            # Recurse into the gaps between anchors
+            items = []
+            previous_i, previous_j = a_lo, b_lo
+            for i, j in anchors:
+                items.append(('region', previous_i, i, previous_j, j, region_algorithm))
+                items.append(('match', i, j, 1))
+                previous_i, previous_j = i + 1, j + 1
+            items.append(('region', previous_i, a_hi, previous_j, b_hi, region_algorithm))
+            stack.extend(reversed(items))
+            continue
+
+        matches = _myers_matches(a[a_lo:a_hi], b[b_lo:b_hi], max_edit_distance)
+        if matches is None and region_algorithm == "myers":
+            # Too many edits for Myers; try to split the region on unique lines instead
+            stack.append(('region', a_lo, a_hi, b_lo, b_hi, "patience"))
+            continue
+        for i, j in matches or []:
+            add_match(a_lo + i, b_lo + j)
+
+    return blocks
+
+
+def get_opcodes(blocks: List[Tuple[int, int, int]], a_length: int, b_length: int) -> List[Opcode]:
+    """Converts matching blocks into difflib-style opcodes."""
+    opcodes = []
+    i = j = 0
+    for block_i, block_j, size in blocks + [(a_length, b_length, 0)]:
+        if i < block_i and j < block_j:
+            opcodes.append(('replace', i, block_i, j, block_j))
+        elif i < block_i:
+            opcodes.append(('delete', i, block_i, j, j))
+        elif j < block_j:
+            opcodes.append(('insert', i, i, j, block_j))
+        if size:
+            opcodes.append(('equal', block_i, block_i + size, block_j, block_j + size))
+        i, j = block_i + size, block_j + size
+    return opcodes
+
+
+def group_opcodes(opcodes: List[Opcode], context: int = DEFAULT_CONTEXT_LINES) -> Iterator[List[Opcode]]:
+    """Groups opcodes into hunks with up to `context` lines of context (like
+    difflib.SequenceMatcher.get_grouped_opcodes)."""
+    codes = list(opcodes)
+    if not codes or (len(codes) == 1 and codes[0][0] == 'equal'):
+        return
+    # Trim leading and trailing context
+    if codes[0][0] == 'equal':
+        tag, i1, i2, j1, j2 = codes[0]
+        codes[0] = tag, max(i1, i2 - context), i2, max(j1, j2 - context), j2
+    if codes[-1][0] == 'equal':
+        tag, i1, i2, j1, j2 = codes[-1]
+        codes[-1] = tag, i1, min(i2, i1 + context), j1, min(j2, j1 + context)
+
+    group = []
+    for tag, i1, i2, j1, j2 in codes:
+        # A long equal run ends the current hunk and starts the next one
+        if tag == 'equal' and i2 - i1 > 2 * context:
+            group.append((tag, i1, min(i2, i1 + context), j1, min(j2, j1 + context)))
+            yield group
+            group = []
+            i1, j1 = max(i1, i2 - context), max(j1, j2 - context)
+        group.append((tag, i1, i2, j1, j2))
+    if group and not (len(group) == 1 and group[0][0] == 'equal'):
+        yield group
+
+
+def _read_lines(path: str, wanted: List[Tuple[int, int]]) -> Dict[int, str]:
+    """Reads the lines with the given index ranges (sorted, half-open) in one pass,
+    with their line endings."""
+    lines = {}
+    if not wanted:
+        return lines
+    range_index = 0
+    with open(path, 'rb', buffering=_READ_BUFFER_SIZE) as f:
+        for line_number, line in enumerate(f):
+            while range_index < len(wanted) and line_number >= wanted[range_index][1]:
+                range_index += 1
+            if range_index == len(wanted):
+                break
+            if line_number >= wanted[range_index][0]:
+                lines[line_number] = line.decode('utf-8', errors='replace')
+    return lines
+
+
+def _append_line(diff: List[str], prefix: str, line: str, ignore_line_endings: bool) -> None:
+    if ignore_line_endings:
+        diff.append(prefix + line.rstrip("\r\n"))
+    elif line.endswith("\n"):
+        # A '\r' of a CRLF ending stays visible, so that line ending changes show
+        diff.append(prefix + line[:-1])
+    else:
+        diff.append(prefix + line)
+        diff.append(NO_NEWLINE_MARKER)
+
+
+def _format_range(start: int, stop: int) -> str:
+    # Same convention as difflib.unified_diff
+    length = stop - start
+    beginning = start + 1
+    if length == 1:
+        return f"{beginning}"
+    if not length:
+        beginning -= 1
+    return f"{beginning},{length}"
+
+
+def unified_diff(path1: str, path2: str, label1: Optional[str] = None, label2: Optional[str] = None,
+                 context: int = DEFAULT_CONTEXT_LINES, max_lines: Optional[int] = None,
+                 algorithm: str = "patience", max_edit_distance: int = DEFAULT_MAX_EDIT_DISTANCE,
+                 ignore_line_endings: bool = False) -> Dict[str, Any]:
+    """Computes a unified diff of two text files in bounded memory.
+
+    Args:
+        path1: The original file.
+        path2: The changed file.
+        label1: Name of the original file in the diff header (defaults to path1).
+        label2: Name of the changed file in the diff header (defaults to path2).
+        context: Number of unchanged lines shown around each change.
+        max_lines: Maximum number of hunk lines to emit. Hunks beyond the limit are
+            counted but not emitted. None means no limit.
+        algorithm: 'patience' (default) or 'myers' (see matching_blocks).
+        max_edit_distance: Edit distance at which Myers gives up on a region.
+        ignore_line_endings: If True, lines that differ only in their line ending
+            ('\n', '\r\n' or none at the end of the file) are considered equal.
+
+    Returns:
+        A dictionary with 'diff' (list of unified diff lines without their '\n'; a
+        '\r' of a CRLF line ending is kept, and lines missing the final newline are
+        followed by NO_NEWLINE_MARKER),
+        'hunk_count', 'lines_added', 'lines_removed', 'file1_lines', 'file2_lines'
+        and 'truncated'.
+    """
+    a = line_ids(path1, ignore_line_endings)
+    b = line_ids(path2, ignore_line_endings)
+    opcodes = get_opcodes(matching_blocks(a, b, algorithm, max_edit_distance), len(a), len(b))
+
+    lines_added = sum(j2 - j1 for tag, i1, i2, j1, j2 in opcodes if tag in ('insert', 'replace'))
+    lines_removed = sum(i2 - i1 for tag, i1, i2, j1, j2 in opcodes if tag in ('delete', 'replace'))
+
+    # Select the hunks that fit into the output limit before reading any text
+    hunks = list(group_opcodes(opcodes, context))
+    emitted = []
+    emitted_lines = 0
+    for hunk in hunks:
+        hunk_lines = 1 + sum(
+            (i2 - i1) if tag == 'equal' else (i2 - i1) + (j2 - j1)
+            for tag, i1, i2, j1, j2 in hunk)
+        if max_lines is not None and emitted_lines + hunk_lines > max_lines and emitted:
+            break
+        emitted.append(hunk)
+        emitted_lines += hunk_lines
+        if max_lines is not None and emitted_lines >= max_lines:
+            break
+
+    lines1 = _read_lines(path1, [(hunk[0][1], hunk[-1][2]) for hunk in emitted])
+    lines2 = _read_lines(path2, [(hunk[0][3], hunk[-1][4]) for hunk in emitted])
+
+    diff = []
+    if emitted:
+        diff.append(f"--- {label1 or path1}")
+        diff.append(f"+++ {label2 or path2}")
+    for hunk in emitted:
+        diff.append(f"@@ -{_format_range(hunk[0][1], hunk[-1][2])} +{_format_range(hunk[0][3], hunk[-1][4])} @@")
+        for tag, i1, i2, j1, j2 in hunk:
+            if tag == 'equal':
+                for i in range(i1, i2):
+                    _append_line(diff, ' ', lines1[i], ignore_line_endings)
+                continue
+            for i in range(i1, i2):
+                _append_line(diff, '-', lines1[i], ignore_line_endings)
+            for j in range(j1, j2):
+                _append_line(diff, '+', lines2[j], ignore_line_endings)
+    if max_lines is not None and len(diff) > max_lines + 2:
+        diff = diff[:max_lines + 2]
+
+    return {
+        'diff': diff,
+        'hunk_count': len(hunks),
+        'lines_added': lines_added,
+        'lines_removed': lines_removed,
+        'file1_lines': len(a),
+        'file2_lines': len(b),
+        'truncated': len(emitted) < len(hunks) or (max_lines is not None and emitted_lines > max_lines)
+    }
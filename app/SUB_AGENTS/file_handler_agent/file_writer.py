@@ -0,0 +1,385 @@
+"""Write-behind append sessions and atomic writes used by append_to_file and write_to_file.
+
+Appends go through a session per file, which keeps the file open between calls
+(revalidated with one stat per call, so a file replaced or deleted meanwhile is
+reopened or reported) and honours one of DURABILITY_MODES:
+
+- 'buffered': the content is kept in memory and written together with later
+  appends, once APPEND_BUFFER_SIZE bytes are pending or APPEND_FLUSH_SECONDS after
+  the first pending append, whichever comes first (or on an explicit flush). Up to
+  that much data is lost if the process crashes.
+- 'flush': the content (and anything buffered before it) is written to the
+  operating system before returning. It survives a crash of the process, but not
+  of the machine.
+- 'fsync': additionally, the file is fsynced before returning. Appends to the same
+  file that wait for an fsync at the same time share a single one.
+
+Appends to a file are always written in call order, whatever their modes.
+"""
+
+import atexit
+import logging
+import os
+import tempfile
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+DURABILITY_MODES = ['buffered', 'flush', 'fsync']
+
+# Buffered appends are written once this many bytes are pending...
+APPEND_BUFFER_SIZE = int(os.getenv("FILE_HANDLER_APPEND_BUFFER_SIZE", str(256 * 1024)))
+# ...or this many seconds after the first of them
+APPEND_FLUSH_SECONDS = float(os.getenv("FILE_HANDLER_APPEND_FLUSH_SECONDS", "1.0"))
+
+# Files not appended to for this long are closed
+_IDLE_CLOSE_SECONDS = 30.0
+
+# At most this many files are kept open; the least recently used idle one is
+# closed to make room for another
+MAX_OPEN_SESSIONS = int(os.getenv("FILE_HANDLER_APPEND_MAX_OPEN_FILES", "128"))
+
+# Process umask, read once at import: os.umask can only be queried by changing
+# it, which is not thread-safe. Shared by every module that creates files.
+UMASK = os.umask(0)
+os.umask(UMASK)
+
+
+class _AppendSession:
+    """Open file, pending buffered content and fsync state of one appended file."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.lock = threading.Lock()
+        self.synced = threading.Condition(self.lock)
+        self.fd = None
+        self.file_id = None
+        self.pending = []
+        self.pending_size = 0
+        self.first_pending_time = None
+        self.last_used = time.monotonic()
+        # Bytes written through this session, and how many of them are known to be fsynced
+        self.written = 0
+        self.synced_upto = 0
+        self.syncing = False
+        # Callers that wrote their content and are about to wait for its fsync; the
+        # file must not be closed before they did
+        self.sync_waiters = 0
+        # Set once the session is removed from AppendSessions; it must not be used anymore
+        self.discarded = False
+
+    def _open(self) -> None:
+        """Makes sure fd refers to the file currently at path. Must hold the lock."""
+        file_stat = os.stat(self.path)
+        file_id = (file_stat.st_dev, file_stat.st_ino)
+        if self.fd is not None and self.file_id != file_id:
+            self._close()
+        if self.fd is None:
+            self.fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | getattr(os, 'O_CLOEXEC', 0))
+            opened_stat = os.fstat(self.fd)
+            self.file_id = (opened_stat.st_dev, opened_stat.st_ino)
+
+    def _close(self) -> None:
+        os.close(self.fd)
+        self.fd = None
+        self.file_id = None
+        # fsyncs of a previous file say nothing about the next one
+        self.synced_upto = self.written
+
+    def write_pending(self) -> int:
+        """Writes the pending content with a single write. Must hold the lock. Returns its size."""
+        if not self.pending:
+            return 0
+        data = b"".join(self.pending) if len(self.pending) > 1 else self.pending[0]
+        self.pending = []
+        self.pending_size = 0
+        self.first_pending_time = None
+        self._open()
+        view = memoryview(data)
+        while view:
+            view = view[os.write(self.fd, view):]
+        self.written += len(data)
+        return len(data)
+
+    def sync(self, upto: int) -> None:
+        """Returns once the first upto bytes written through this session are fsynced.
+
+        While one fsync runs, later callers wait for it and then share the next one.
+        """
+        with self.lock:
+            while self.synced_upto < upto and self.syncing:
+                self.synced.wait()
+            if self.synced_upto >= upto or self.fd is None:
+                return
+            self.syncing = True
+            target = self.written
+            fd = self.fd
+        try:
+            os.fsync(fd)
+        finally:
+            with self.lock:
+                self.syncing = False
+                if self.fd == fd:
+                    self.synced_upto = max(self.synced_upto, target)
+                self.synced.notify_all()
+
+    def sync_written(self) -> None:
+        """Fsyncs everything written so far. Must be registered in sync_waiters, without the lock."""
+        try:
+            with self.lock:
+                upto = self.written
+            self.sync(upto)
+        finally:
+            with self.lock:
+                self.sync_waiters -= 1
+                self.synced.notify_all()
+
+    def close_if_idle(self, now: float) -> bool:
+        """Closes the file if nothing is pending and it was not used recently. Must hold the lock."""
+        if self.pending or self.syncing or self.sync_waiters or now - self.last_used < _IDLE_CLOSE_SECONDS:
+            return False
+        if self.fd is not None:
+            self._close()
+        return True
+
+
+class AppendSessions:
+    """Append sessions of all files, with a background thread writing buffered content."""
+
+    def __init__(self, buffer_size: int = APPEND_BUFFER_SIZE, flush_seconds: float = APPEND_FLUSH_SECONDS):
+        self.buffer_size = buffer_size
+        self.flush_seconds = flush_seconds
+        self._sessions: Dict[str, _AppendSession] = {}
+        self._lock = threading.Lock()
+        self._flusher = None
+        atexit.register(self.flush)
+
+    def _session(self, path: str) -> _AppendSession:
+        path = os.path.abspath(path)
+        with self._lock:
+            session = self._sessions.get(path)
+            if session is None:
+                if len(self._sessions) >= MAX_OPEN_SESSIONS:
+                    self._close_least_recently_used()
+                session = self._sessions[path] = _AppendSession(path)
+            return session
+
+    def _close_least_recently_used(self) -> None:
+        """Closes the least recently used idle session. Must hold the dictionary lock."""
+        for path, session in sorted(self._sessions.items(), key=lambda item: item[1].last_used):
+            # Lock order: sessions dictionary, then session; busy sessions are skipped
+            if not session.lock.acquire(blocking=False):
+                continue
+            try:
+                if session.close_if_idle(float('inf')):
+                    session.discarded = True
+                    del self._sessions[path]
+                    return
+            finally:
+                session.lock.release()
+
+    def _sessions_below(self, path: str) -> List[Tuple[str, _AppendSession]]:
+        """The sessions of a file, or of all files below a directory."""
+        path = os.path.abspath(path)
+        prefix = os.path.join(path, '')
+        with self._lock:
+            return [(session_path, session) for session_path, session in self._sessions.items()
+                    if session_path == path or session_path.startswith(prefix)]
+
+    def append(self, path: str, data: bytes, durability: str = 'flush') -> None:
+        """Appends data to an existing file with one of DURABILITY_MODES.
+
+        Raises:
+            ValueError: If the durability mode is unknown.
+            OSError: If the file does not exist or cannot be written (for 'buffered', only
+                errors of the writes this call triggers).
+        """
+        if durability not in DURABILITY_MODES:
+            raise ValueError(f"Invalid durability mode: {durability}. Valid modes are: {', '.join(DURABILITY_MODES)}")
+        while True:
+            session = self._session(path)
+            session.lock.acquire()
+            if not session.discarded:
+                break
+            # Closed for being idle since it was looked up
+            session.lock.release()
+        try:
+            session.last_used = time.monotonic()
+            session.pending.append(data)
+            session.pending_size += len(data)
+            if durability == 'buffered':
+                if session.first_pending_time is None:
+                    session.first_pending_time = session.last_used
+                if session.pending_size >= self.buffer_size:
+                    session.write_pending()
+            else:
+                session.write_pending()
+                if durability == 'fsync':
+                    session.sync_waiters += 1
+        finally:
+            session.lock.release()
+
+        # The background thread also closes files once they are idle, whatever the mode
+        self._start_flusher()
+        if durability == 'fsync':
+            session.sync_written()
+
+    def flush(self, path: Optional[str] = None, fsync: bool = False) -> int:
+        """Writes the buffered content of one file (or of all files).
+
+        Args:
+            path: The file. If None, all files are flushed.
+            fsync: If True, also fsync the flushed files.
+
+        Returns:
+            The number of bytes written.
+
+        Raises:
+            OSError: If path is given and its content cannot be written. Errors while
+                flushing all files are logged, and the content that failed is dropped.
+        """
+        if path is not None:
+            with self._lock:
+                session = self._sessions.get(os.path.abspath(path))
+            return self._flush_session(session, fsync) if session is not None else 0
+
+        with self._lock:
+            sessions = list(self._sessions.values())
+        flushed = 0
+        for session in sessions:
+            try:
+                flushed += self._flush_session(session, fsync)
+            except OSError as e:
+                logging.error(f"Error writing buffered appends to {session.path}: {str(e)}")
+        return flushed
+
+    def flush_below(self, directory: str) -> int:
+        """Writes the buffered content of all files below a directory (or of one file).
+
+        Errors are logged, and the content that failed is dropped.
+
+        Returns:
+            The number of bytes written.
+        """
+        flushed = 0
+        for path, session in self._sessions_below(directory):
+            try:
+                flushed += self._flush_session(session, False)
+            except OSError as e:
+                logging.error(f"Error writing buffered appends to {path}: {str(e)}")
+        return flushed
+
+    def close(self, path: str) -> None:
+        """Writes the buffered content of a file (or of all files below a directory) and closes it.
+
+        Used before a file is deleted or renamed, so that its descriptor does not keep
+        a deleted file's space allocated or a renamed file open under its old name.
+
+        Raises:
+            OSError: If buffered content cannot be written. The file is closed anyway.
+        """
+        error = None
+        for session_path, session in self._sessions_below(path):
+            with self._lock:
+                if self._sessions.get(session_path) is session:
+                    del self._sessions[session_path]
+            with session.lock:
+                # The descriptor must stay valid until pending fsyncs are done
+                while session.syncing or session.sync_waiters:
+                    session.synced.wait()
+                try:
+                    session.write_pending()
+                except OSError as e:
+                    error = error or e
+                    session.pending = []
+                    session.pending_size = 0
+                    session.first_pending_time = None
+                if session.fd is not None:
+                    session._close()
+                session.discarded = True
+        if error is not None:
+            raise error
+
+    def _flush_session(self, session: _AppendSession, fsync: bool) -> int:
+        with session.lock:
+            flushed = session.write_pending()
+            if fsync:
+                session.sync_waiters += 1
+        if fsync:
+            session.sync_written()
+        return flushed
+
+    def pending_size(self, path: str) -> int:
+        """Returns the number of buffered bytes not yet written to a file."""
+        with self._lock:
+            session = self._sessions.get(os.path.abspath(path))
+        return session.pending_size if session is not None else 0
+
+    def _start_flusher(self) -> None:
+        if self._flusher is not None:
+            return
+        with self._lock:
+            if self._flusher is None:
+                self._flusher = threading.Thread(target=self._flush_periodically, name="file-handler-append-flusher", daemon=True)
+                self._flusher.start()
+
+    def _flush_periodically(self) -> None:
+        """Writes buffered content once it is old enough, and closes idle files."""
+        while True:
+            time.sleep(self.flush_seconds / 4)
+            now = time.monotonic()
+            with self._lock:
+                sessions = list(self._sessions.items())
+            for path, session in sessions:
+                with session.lock:
+                    try:
+                        if session.first_pending_time is not None and now - session.first_pending_time >= self.flush_seconds:
+                            session.write_pending()
+                    except OSError as e:
+                        logging.error(f"Error writing buffered appends to {path}: {str(e)}")
+                # Lock order: sessions dictionary, then session
+                with self._lock, session.lock:
+                    if self._sessions.get(path) is session and session.close_if_idle(now):
+                        session.discarded = True
+                        del self._sessions[path]
+
+
+def atomic_write(path: str, data: bytes, fsync: bool = True) -> None:
+    """Replaces the content of a file atomically: readers see either the old or the new content.
+
+    The data is written to a temporary file in the same directory, which then replaces
+    the file with os.replace. The permission bits of an existing file are kept.
+
+    Args:
+        path: The file to write.
+        data: Its new content.
+        fsync: If True, fsync the file before the rename and the directory after it, so
+            that after a crash the file has either its old or its complete new content.
+
+    Raises:
+        OSError: If the file cannot be written. The original file is then unchanged.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix=".write-")
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+            if fsync:
+                f.flush()
+                os.fsync(f.fileno())
+        if os.path.exists(path):
+            os.chmod(temp_path, os.stat(path).st_mode & 0o7777)
+        else:
+            os.chmod(temp_path, 0o666 & ~UMASK)
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+    if fsync and hasattr(os, 'O_DIRECTORY'):
+        directory_fd = os.open(directory, os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            os.fsync(directory_fd)
+        finally:
+            os.close(directory_fd)
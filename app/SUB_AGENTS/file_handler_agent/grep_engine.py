@@ -0,0 +1,178 @@
+"""Parallel multi-file grep engine used by the directory search tools.
+
+Files are split across a thread pool and scanned through memory maps. Matches are
+returned in the order of the given files, so a search stopped after N results
+always returns the same N, and all workers stop once the caller has seen enough.
+"""
+
+import itertools
+import logging
+import mmap
+import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterable, Iterator, Optional
+
+try:
+    # The `regex` module releases the GIL while matching (concurrent=True), which
+    # lets the worker threads scan files on all cores
+    import regex as _regex_module
+except ImportError:  # pragma: no cover - depends on the environment
+    _regex_module = None
+
+# Number of leading bytes inspected to decide whether a file is binary
+BINARY_SNIFF_SIZE = 8192
+
+DEFAULT_MAX_WORKERS = min(32, (os.cpu_count() or 1) + 4)
+
+# Regular expression constructs that can (or may) match a line break, or that
+# anchor at the start/end of the whole string: on a whole memory-mapped file they
+# would not behave as on a single line
+_LINE_UNSAFE_CONSTRUCTS = re.compile(r"\\[sWDRXpPnNvx0-7uUAZ]|\[\^|\(\?[a-zA-Z]*s|\n")
+
+
+class LineMatcher:
+    """Compiled search pattern that reports the matching lines of a file."""
+
+    def __init__(self, search_text: str, use_regex: bool = False, case_sensitive: bool = True):
+        """Compiles the search pattern.
+
+        Patterns are matched against the raw bytes of the whole file when that is
+        equivalent to matching each line separately. They are matched line by line
+        on decoded text if they contain non-ASCII characters (a byte pattern would
+        apply classes, quantifiers and case folding to single UTF-8 bytes) or a
+        construct that can match a line break or anchors at \\A/\\Z (e.g. \\s, \\W or [^x]).
+
+        Args:
+            search_text: The text or pattern to search for.
+            use_regex: If True, treat search_text as a regular expression.
+            case_sensitive: If False, perform a case-insensitive search.
+        """
+        pattern = search_text if use_regex else re.escape(search_text)
+        flags = re.MULTILINE | (0 if case_sensitive else re.IGNORECASE)
+        if use_regex:
+            self.text_mode = not search_text.isascii() or _LINE_UNSAFE_CONSTRUCTS.search(search_text) is not None
+        else:
+            # A literal needs no case folding or classes when matched case-sensitively
+            self.text_mode = (not case_sensitive and not search_text.isascii()) or "\n" in search_text
+
+        if self.text_mode:
+            self.pattern = re.compile(pattern, flags)
+            self._search = self.pattern.search
+        elif _regex_module is not None:
+            self.pattern = _regex_module.compile(pattern.encode("utf-8"), flags)
+            pattern_search = self.pattern.search
+            self._search = lambda data, pos=0: pattern_search(data, pos, concurrent=True)
+        else:
+            self.pattern = re.compile(pattern.encode("utf-8"), flags)
+            self._search = self.pattern.search
+
+    def iter_file(self, file_path: str, stop: Optional[threading.Event] = None) -> Iterator[Dict[str, Any]]:
+        """Yields one dictionary per matching line of a file.
+
+        Each dictionary contains 'file_path', 'line_number', 'line_content' and
+        'match_position' (character offsets of the first match within the line).
+        Binary files are skipped.
+        """
+        with open(file_path, 'rb') as f:
+            if b"\0" in f.read(BINARY_SNIFF_SIZE):
+                return
+            if self.text_mode:
+                yield from self._iter_text(file_path, stop)
+                return
+            if os.fstat(f.fileno()).st_size == 0:
+                return
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                yield from self._iter_mapped(file_path, data, stop)
+
+    def _iter_mapped(self, file_path: str, data: mmap.mmap, stop: Optional[threading.Event]) -> Iterator[Dict[str, Any]]:
+        size = len(data)
+        pos = 0
+        line_number = 1
+        counted_up_to = 0
+        while pos <= size:
+            if stop is not None and stop.is_set():
+                return
+            match = self._search(data, pos)
+            if match is None or (match.start() == size and data[size - 1:size] == b"\n"):
+                # No match, or only an empty match after the final newline
+                return
+            line_start = data.rfind(b"\n", 0, match.start()) + 1
+            line_end = data.find(b"\n", match.start())
+            if line_end == -1:
+                line_end = size
+            line_number += data[counted_up_to:line_start].count(b"\n")
+            counted_up_to = line_start
+
+            line = data[line_start:line_end]
+            if line.endswith(b"\r"):
+                line = line[:-1]
+            start = len(line[:match.start() - line_start].decode('utf-8', errors='replace'))
+            end = start + len(data[match.start():min(match.end(), line_end)].decode('utf-8', errors='replace'))
+            yield {
+                'file_path': file_path,
+                'line_number': line_number,
+                'line_content': line.decode('utf-8', errors='replace'),
+                'match_position': (start, end)
+            }
+            pos = line_end + 1
+
+    def _iter_text(self, file_path: str, stop: Optional[threading.Event]) -> Iterator[Dict[str, Any]]:
+        with open(file_path, 'r', encoding='utf-8', errors='replace') as f:
+            for line_number, line in enumerate(f, 1):
+                if stop is not None and stop.is_set():
+                    return
+                line = line.rstrip('\n')
+                match = self._search(line)
+                if match:
+                    yield {
+                        'file_path': file_path,
+                        'line_number': line_number,
+                        'line_content': line,
+                        'match_position': match.span()
+                    }
+
+
+def iter_matches(file_paths: Iterable[str], matcher: LineMatcher, max_workers: Optional[int] = None,
+                 max_matches_per_file: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+    """Scans files in parallel and yields their matching lines in file order.
+
+    Files are scanned up to 2 * max_workers ahead of the one being yielded, so the
+    output is the same as a sequential scan whatever the thread timing. Closing
+    the generator (e.g. breaking out of the loop once enough results were
+    collected) stops all workers.
+
+    Args:
+        file_paths: Full paths of the files to scan, in the order of the results.
+        matcher: The compiled search pattern.
+        max_workers: Number of worker threads. Defaults to DEFAULT_MAX_WORKERS.
+        max_matches_per_file: If set, at most this many matches are collected per
+            file (e.g. the caller's result limit), which bounds the memory held by
+            files scanned ahead.
+
+    Yields:
+        The match dictionaries produced by LineMatcher.iter_file.
+    """
+    stop = threading.Event()
+
+    def scan(file_path):
+        try:
+            return list(itertools.islice(matcher.iter_file(file_path, stop), max_matches_per_file))
+        except (OSError, ValueError) as e:
+            logging.warning(f"Could not search file {file_path}: {e}")
+            return []
+
+    max_workers = max_workers or DEFAULT_MAX_WORKERS
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+    try:
+        paths = iter(file_paths)
+        window = [executor.submit(scan, path) for path in itertools.islice(paths, 2 * max_workers)]
+        while window:
+            matches = window.pop(0).result()
+            for path in itertools.islice(paths, 1):
+                window.append(executor.submit(scan, path))
+            yield from matches
+    finally:
+        stop.set()
+        executor.shutdown(wait=True, cancel_futures=True)
@@ -0,0 +1,166 @@
+"""File hashing engine used by calculate_file_hash and the batch tools.
+
+Files are read with large buffers into a reused bytearray. hashlib releases the
+GIL while digesting large buffers, so hashing many files on a thread pool scales
+with the number of cores. Digests are memoized per (path, algorithm) and reused as
+long as the file's size, modification time and inode are unchanged.
+"""
+
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Iterable, List, Optional, Tuple, Union
+
+try:
+    import xxhash
+except ImportError:  # pragma: no cover - depends on the environment
+    xxhash = None
+
+HASHLIB_ALGORITHMS = ['md5', 'sha1', 'sha256', 'sha512', 'blake2b', 'blake2s']
+XXHASH_ALGORITHMS = ['xxh64', 'xxh3_64', 'xxh3_128']
+HASH_ALGORITHMS = HASHLIB_ALGORITHMS + XXHASH_ALGORITHMS
+
+DEFAULT_MAX_WORKERS = min(32, (os.cpu_count() or 1) + 4)
+
+_READ_BUFFER_SIZE = 1024 * 1024
+
+# Files modified less than this many seconds before they were hashed are not
+# memoized, since a further write within the same timestamp tick would go unnoticed
+_RACY_WRITE_SECONDS = 2
+
+_HASH_CACHE_SIZE = int(os.getenv("FILE_HASH_CACHE_SIZE", "100000"))
+_hash_cache = OrderedDict()
+_hash_cache_lock = threading.Lock()
+
+
+def new_hasher(algorithm: str):
+    """Returns a new hash object for an algorithm name from HASH_ALGORITHMS.
+
+    Raises:
+        ValueError: If the algorithm is unknown, or is an xxhash algorithm and the
+            xxhash package is not installed.
+    """
+    algorithm = algorithm.lower()
+    if algorithm in HASHLIB_ALGORITHMS:
+        return hashlib.new(algorithm)
+    if algorithm in XXHASH_ALGORITHMS:
+        if xxhash is None:
+            raise ValueError(f"Hash algorithm '{algorithm}' requires the 'xxhash' package")
+        return getattr(xxhash, algorithm)()
+    raise ValueError(f"Invalid hash algorithm: {algorithm}. Valid options are {', '.join(repr(a) for a in HASH_ALGORITHMS)}.")
+
+
+def hash_file(path: str, algorithm: str = "md5", use_cache: bool = True) -> Tuple[str, int, bool]:
+    """Hashes a file.
+
+    Args:
+        path: Path of the file.
+        algorithm: One of HASH_ALGORITHMS.
+        use_cache: If True, return the memoized digest when the file is unchanged.
+
+    Returns:
+        The hexadecimal digest, the number of bytes hashed and whether the digest
+        came from the cache.
+
+    Raises:
+        ValueError: If the algorithm is not supported.
+        OSError: If the file cannot be read.
+    """
+    algorithm = algorithm.lower()
+    hasher = new_hasher(algorithm)
+    with open(path, 'rb', buffering=0) as f:
+        file_stat = os.fstat(f.fileno())
+        key = (os.path.abspath(path), algorithm)
+        signature = (file_stat.st_size, file_stat.st_mtime_ns, file_stat.st_ino)
+        if use_cache:
+            with _hash_cache_lock:
+                cached = _hash_cache.get(key)
+                if cached is not None and cached[0] == signature:
+                    _hash_cache.move_to_end(key)
+                    return cached[1], file_stat.st_size, True
+
+        buffer = bytearray(min(_READ_BUFFER_SIZE, max(file_stat.st_size, 1)))
+        view = memoryview(buffer)
+        size = 0
+        while True:
+            read = f.readinto(buffer)
+            if not read:
+                break
+            hasher.update(view[:read])
+            size += read
+
+    digest = hasher.hexdigest()
+    if use_cache and size == file_stat.st_size and time.time() - file_stat.st_mtime > _RACY_WRITE_SECONDS:
+        with _hash_cache_lock:
+            _hash_cache[key] = (signature, digest)
+            _hash_cache.move_to_end(key)
+            while len(_hash_cache) > _HASH_CACHE_SIZE:
+                _hash_cache.popitem(last=False)
+    return digest, size, False
+
+
+def hash_file_edges(path: str, edge_size: int, algorithm: str = "md5") -> str:
+    """Hashes only the first and last edge_size bytes of a file (and its size).
+
+    Cheap pre-filter for duplicate detection: files with different edge hashes
+    cannot have the same content.
+
+    Raises:
+        ValueError: If the algorithm is not supported.
+        OSError: If the file cannot be read.
+    """
+    hasher = new_hasher(algorithm)
+    with open(path, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        hasher.update(str(size).encode('ascii'))
+        hasher.update(f.read(edge_size))
+        if size > edge_size:
+            f.seek(max(size - edge_size, edge_size))
+            hasher.update(f.read(edge_size))
+    return hasher.hexdigest()
+
+
+def _map_files(function, paths: Iterable[str], max_workers: Optional[int]) -> List[Any]:
+    """Applies function to every path on a thread pool, returning results or exceptions in order."""
+    def apply(path):
+        try:
+            return function(path)
+        except Exception as e:
+            return e
+
+    paths = list(paths)
+    if len(paths) <= 1:
+        return [apply(path) for path in paths]
+    with ThreadPoolExecutor(max_workers=min(max_workers or DEFAULT_MAX_WORKERS, len(paths))) as executor:
+        return list(executor.map(apply, paths))
+
+
+def hash_files(paths: Iterable[str], algorithm: str = "md5", max_workers: Optional[int] = None,
+               use_cache: bool = True) -> List[Union[Tuple[str, int, bool], Exception]]:
+    """Hashes many files in parallel.
+
+    Args:
+        paths: Paths of the files.
+        algorithm: One of HASH_ALGORITHMS.
+        max_workers: Number of worker threads. Defaults to DEFAULT_MAX_WORKERS.
+        use_cache: If True, unchanged files are not read again.
+
+    Returns:
+        One entry per path, in the same order: the result of hash_file, or the
+        exception raised while hashing that file.
+
+    Raises:
+        ValueError: If the algorithm is not supported.
+    """
+    new_hasher(algorithm)
+    return _map_files(lambda path: hash_file(path, algorithm, use_cache), paths, max_workers)
+
+
+def hash_files_edges(paths: Iterable[str], edge_size: int, algorithm: str = "md5",
+                     max_workers: Optional[int] = None) -> List[Union[str, Exception]]:
+    """Runs hash_file_edges on many files in parallel (see hash_files)."""
+    new_hasher(algorithm)
+    return _map_files(lambda path: hash_file_edges(path, edge_size, algorithm), paths, max_workers)
@@ -0,0 +1,296 @@
+"""Persistent trigram index used by the directory-wide search tools.
+
+The index maps every three-character sequence found in a file's (lower-cased) text
+to the files containing it. It is stored in one SQLite database per indexed
+directory and refreshed incrementally from size/mtime changes, so a search only
+has to open the files that can possibly contain the requested text.
+"""
+
+import hashlib
+import logging
+import os
+import sqlite3
+from typing import Dict, Iterable, List, Optional, Set
+
+from .walker import walk
+
+# Files larger than this are not tokenized; they are always treated as candidates
+MAX_INDEXED_FILE_SIZE = int(os.getenv("SEARCH_INDEX_MAX_FILE_SIZE", str(16 * 1024 * 1024)))
+
+# Number of leading bytes inspected to decide whether a file is binary
+BINARY_SNIFF_SIZE = 8192
+
+# Files are committed to the database in batches of this size while refreshing
+_COMMIT_BATCH_SIZE = 200
+
+# Values of the files.indexed column
+_INDEXED = 1
+_NOT_INDEXED = 0
+_BINARY = -1
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    id INTEGER PRIMARY KEY,
+    path TEXT UNIQUE NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    indexed INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS postings (
+    trigram TEXT NOT NULL,
+    file_id INTEGER NOT NULL,
+    PRIMARY KEY (trigram, file_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS postings_file_id ON postings (file_id);
+"""
+
+
+def index_path_for(directory: str, state_directory: str) -> str:
+    """Returns the location of the index database for a directory."""
+    digest = hashlib.sha1(os.path.realpath(directory).encode("utf-8")).hexdigest()[:16]
+    return os.path.join(state_directory, "search_index", f"{digest}.sqlite")
+
+
+def extract_trigrams(lines: Iterable[str]) -> Set[str]:
+    """Collects the lower-cased trigrams of each line (trigrams never span lines)."""
+    trigrams = set()
+    for line in lines:
+        line = line.rstrip("\n").lower()
+        trigrams.update(line[i:i + 3] for i in range(len(line) - 2))
+    return trigrams
+
+
+# Number of characters following the escapes that take a fixed-length argument
+_ESCAPE_ARGUMENT_LENGTHS = {"x": 2, "u": 4, "U": 8}
+
+
+def required_literals(pattern: str) -> List[str]:
+    """Extracts literal substrings that every match of a regular expression must contain.
+
+    The extraction is deliberately conservative: alternations disable pruning, and
+    anything inside groups, character classes or optional quantifiers is skipped.
+
+    Args:
+        pattern: The regular expression.
+
+    Returns:
+        A list of literal strings of at least three characters. An empty list means
+        the pattern cannot be used to prune candidate files.
+    """
+    literals = []
+    current = []
+
+    def flush():
+        if len(current) >= 3:
+            literals.append("".join(current))
+        current.clear()
+
+    i = 0
+    depth = 0
+    while i < len(pattern):
+        char = pattern[i]
+        if char == "\\":
+            escaped = pattern[i + 1] if i + 1 < len(pattern) else ""
+            i += 2
+            # Skip the arguments of escapes like \x41, \u00e9, \N{...} or \12, which
+            # are not literal text
+            if escaped in _ESCAPE_ARGUMENT_LENGTHS:
+                i += _ESCAPE_ARGUMENT_LENGTHS[escaped]
+            elif escaped == "N" and pattern[i:i + 1] == "{":
+                closing = pattern.find("}", i)
+                i = closing + 1 if closing != -1 else len(pattern)
+            elif escaped.isdigit():
+                while i < len(pattern) and pattern[i].isdigit():
+                    i += 1
+            if depth:
+                continue
+            if escaped and not escaped.isalnum():
+                current.append(escaped)
+            else:
+                flush()
+            continue
+        if char == "[":
+            # Skip the whole character class
+            i += 1
+            if i < len(pattern) and pattern[i] == "^":
+                i += 1
+            if i < len(pattern) and pattern[i] == "]":
+                i += 1
+            while i < len(pattern) and pattern[i] != "]":
+                i += 2 if pattern[i] == "\\" else 1
+            i += 1
+            if not depth:
+                flush()
+            continue
+        if char == "|":
+            return []
+        if char == "(":
+            depth += 1
+            flush()
+        elif char == ")":
+            depth = max(depth - 1, 0)
+        elif depth:
+            pass
+        elif char in "*?{":
+            # The preceding character is optional (or repeated a variable number of times)
+            if current:
+                current.pop()
+            flush()
+            if char == "{":
+                while i < len(pattern) and pattern[i] != "}":
+                    i += 1
+        elif char in ".^$+":
+            flush()
+        else:
+            current.append(char)
+        i += 1
+    flush()
+    return literals
+
+
+class TrigramIndex:
+    """On-disk trigram index for all files below a directory."""
+
+    def __init__(self, directory: str, index_path: str, exclude_dirs: Optional[Iterable[str]] = None):
+        """Opens (or creates) the index for a directory.
+
+        Args:
+            directory: The directory whose files are indexed.
+            index_path: Path of the SQLite database holding the index.
+            exclude_dirs: Directories that are never indexed (e.g. the index's own
+                state directory when it lives below the indexed directory).
+        """
+        self.directory = directory
+        self.index_path = index_path
+        self.exclude_dirs = list(exclude_dirs or [])
+        os.makedirs(os.path.dirname(index_path), exist_ok=True)
+        self._conn = sqlite3.connect(index_path, timeout=30)
+        self._conn.executescript(_SCHEMA)
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def __enter__(self) -> "TrigramIndex":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def _scan(self) -> Dict[str, os.stat_result]:
+        """Returns the current stat information of every file below the directory."""
+        found = {}
+        for entry in walk(self.directory, exclude_dirs=self.exclude_dirs):
+            try:
+                found[entry.relpath] = entry.stat()
+            except OSError as e:
+                logging.warning(f"Could not stat {entry.path} while indexing: {e}")
+        return found
+
+    def _index_file(self, file_id: int, full_path: str, size: int) -> int:
+        """Stores the postings of one file and returns its indexed state."""
+        self._conn.execute("DELETE FROM postings WHERE file_id = ?", (file_id,))
+        if size > MAX_INDEXED_FILE_SIZE:
+            return _NOT_INDEXED
+        with open(full_path, "rb") as f:
+            if b"\0" in f.read(BINARY_SNIFF_SIZE):
+                return _BINARY
+        with open(full_path, "r", encoding="utf-8", errors="replace") as f:
+            trigrams = extract_trigrams(f)
+        self._conn.executemany(
+            "INSERT OR IGNORE INTO postings (trigram, file_id) VALUES (?, ?)",
+            ((trigram, file_id) for trigram in trigrams),
+        )
+        return _INDEXED
+
+    def refresh(self) -> Dict[str, int]:
+        """Brings the index up to date with the files currently on disk.
+
+        Only files whose size or modification time changed since the last refresh
+        are read again.
+
+        Returns:
+            A dictionary with the number of 'added', 'updated', 'removed' and
+            'unchanged' files.
+        """
+        stats = {"added": 0, "updated": 0, "removed": 0, "unchanged": 0}
+        current = self._scan()
+        known = {
+            path: (file_id, size, mtime_ns)
+            for file_id, path, size, mtime_ns in self._conn.execute("SELECT id, path, size, mtime_ns FROM files")
+        }
+
+        removed = [known[path][0] for path in known if path not in current]
+        with self._conn:
+            for file_id in removed:
+                self._conn.execute("DELETE FROM postings WHERE file_id = ?", (file_id,))
+                self._conn.execute("DELETE FROM files WHERE id = ?", (file_id,))
+        stats["removed"] = len(removed)
+
+        pending = 0
+        try:
+            for path, stat_info in current.items():
+                previous = known.get(path)
+                if previous and previous[1] == stat_info.st_size and previous[2] == stat_info.st_mtime_ns:
+                    stats["unchanged"] += 1
+                    continue
+                if previous:
+                    file_id = previous[0]
+                    stats["updated"] += 1
+                else:
+                    file_id = self._conn.execute(
+                        "INSERT INTO files (path, size, mtime_ns, indexed) VALUES (?, ?, ?, ?)",
+                        (path, stat_info.st_size, stat_info.st_mtime_ns, _NOT_INDEXED),
+                    ).lastrowid
+                    stats["added"] += 1
+                try:
+                    indexed = self._index_file(file_id, os.path.join(self.directory, path), stat_info.st_size)
+                except OSError as e:
+                    logging.warning(f"Could not index {path}: {e}")
+                    indexed = _NOT_INDEXED
+                self._conn.execute(
+                    "UPDATE files SET size = ?, mtime_ns = ?, indexed = ? WHERE id = ?",
+                    (stat_info.st_size, stat_info.st_mtime_ns, indexed, file_id),
+                )
+                pending += 1
+                if pending >= _COMMIT_BATCH_SIZE:
+                    self._conn.commit()
+                    pending = 0
+            self._conn.commit()
+        except BaseException:
+            self._conn.rollback()
+            raise
+        return stats
+
+    def file_count(self) -> int:
+        """Returns the number of files known to the index."""
+        return self._conn.execute("SELECT COUNT(*) FROM files").fetchone()[0]
+
+    def candidates(self, literals: List[str]) -> List[str]:
+        """Returns the files that may contain all of the given literal strings.
+
+        Args:
+            literals: Literal substrings that a matching line must contain. Strings
+                shorter than three characters do not prune anything.
+
+        Returns:
+            Full paths of the candidate files, sorted. Binary files are never
+            candidates and files too large to index always are.
+        """
+        trigrams = set()
+        for literal in literals:
+            trigrams.update(extract_trigrams([literal]))
+
+        if trigrams:
+            file_ids = None
+            for trigram in trigrams:
+                ids = {row[0] for row in self._conn.execute("SELECT file_id FROM postings WHERE trigram = ?", (trigram,))}
+                file_ids = ids if file_ids is None else file_ids & ids
+                if not file_ids:
+                    break
+            rows = self._conn.execute("SELECT id, path, indexed FROM files WHERE indexed != ?", (_BINARY,))
+            paths = [path for file_id, path, indexed in rows if indexed == _NOT_INDEXED or file_id in file_ids]
+        else:
+            rows = self._conn.execute("SELECT path FROM files WHERE indexed != ?", (_BINARY,))
+            paths = [row[0] for row in rows]
+
+        return sorted(os.path.join(self.directory, path) for path in paths)
@@ -0,0 +1,233 @@
+"""Persistent directory snapshots used by detect_file_changes.
+
+A snapshot records (size, mtime_ns, inode) and an optional content hash for every
+tracked file, plus the modification time of every visited directory. Snapshots
+live in a SQLite database, so they survive restarts and are shared between worker
+processes. When a directory's mtime is unchanged its listing cannot have changed,
+so re-scans reuse the stored listing instead of reading the directory again.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+from collections import defaultdict
+from datetime import datetime
+from typing import Callable, Dict, Optional, Tuple
+
+# (size, mtime_ns, inode, content_hash or None)
+FileState = Tuple[int, int, int, Optional[str]]
+
+_HASH_CHUNK_SIZE = 1024 * 1024
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS snapshots (
+    root TEXT PRIMARY KEY,
+    settings TEXT NOT NULL,
+    updated_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS files (
+    root TEXT NOT NULL,
+    path TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    inode INTEGER NOT NULL,
+    content_hash TEXT,
+    PRIMARY KEY (root, path)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS dirs (
+    root TEXT NOT NULL,
+    path TEXT NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    PRIMARY KEY (root, path)
+) WITHOUT ROWID;
+"""
+
+
+class Snapshot:
+    """The tracked state of one directory tree.
+
+    Attributes:
+        settings: Serialized scan settings (pattern, depth, ...). Stored listings are
+            only reused by scans with identical settings.
+        files: Relative file path -> FileState.
+        dirs: Relative directory path ("" for the root) -> directory mtime_ns.
+    """
+
+    def __init__(self, settings: str, files: Dict[str, FileState], dirs: Dict[str, int]):
+        self.settings = settings
+        self.files = files
+        self.dirs = dirs
+
+
+def scan_settings(pattern: str, use_regex: bool, recursive: bool, max_depth: Optional[int]) -> str:
+    """Serializes the parameters that determine which files a scan tracks."""
+    return json.dumps({'pattern': pattern, 'use_regex': use_regex, 'recursive': recursive, 'max_depth': max_depth}, sort_keys=True)
+
+
+def file_digest(path: str) -> str:
+    """Returns the BLAKE2b content hash of a file, read in large chunks."""
+    digest = hashlib.blake2b()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(_HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def scan_tree(root: str, settings: str, name_filter: Callable[[str], bool], max_depth: Optional[int] = None,
+              previous: Optional[Snapshot] = None, trust_directory_mtime: bool = False) -> Tuple[Snapshot, Dict[str, int]]:
+    """Takes a snapshot of a directory tree, reusing unchanged parts of a previous one.
+
+    Directories whose mtime equals the one in the previous snapshot (taken with the
+    same settings) are not listed again; the stored listing is reused. Their files
+    are still stat'ed, unless trust_directory_mtime is True, in which case their
+    stored state is reused as well. That makes re-scans of static trees cost one
+    stat per directory, but in-place modifications of files in otherwise unchanged
+    directories go unnoticed.
+
+    Args:
+        root: The directory to scan.
+        settings: Serialized scan settings (see scan_settings).
+        name_filter: Predicate that file names must satisfy.
+        max_depth: Maximum depth of tracked files (0 = files directly in root).
+        previous: The previous snapshot of the same tree, if any.
+        trust_directory_mtime: Reuse file states of directories with unchanged mtimes.
+
+    Returns:
+        The new snapshot and a dictionary of scan statistics ('dirs_listed',
+        'dirs_reused', 'files_checked').
+    """
+    stats = {'dirs_listed': 0, 'dirs_reused': 0, 'files_checked': 0}
+    files: Dict[str, FileState] = {}
+    dirs: Dict[str, int] = {}
+
+    reusable = previous is not None and previous.settings == settings
+    previous_files = defaultdict(list)
+    previous_subdirs = defaultdict(list)
+    if reusable:
+        for path, state in previous.files.items():
+            previous_files[os.path.dirname(path)].append((path, state))
+        for path in previous.dirs:
+            if path:
+                previous_subdirs[os.path.dirname(path)].append(path)
+
+    # Directories still to visit, with the depth of the entries they contain. This is
+    # not walker.walk(): whether a directory is listed at all depends on its mtime,
+    # and reused directories are descended into from the previous snapshot
+    # without being listed.
+    stack = [("", 0)]
+    while stack:
+        relpath, depth = stack.pop()
+        full_path = os.path.join(root, relpath) if relpath else root
+        try:
+            dir_mtime = os.stat(full_path).st_mtime_ns
+        except OSError as e:
+            if not relpath:
+                raise
+            logging.warning(f"Could not stat directory {full_path}: {e}")
+            continue
+        dirs[relpath] = dir_mtime
+
+        if reusable and previous.dirs.get(relpath) == dir_mtime:
+            stats['dirs_reused'] += 1
+            subdirs = previous_subdirs[relpath]
+            for path, state in previous_files[relpath]:
+                if trust_directory_mtime:
+                    files[path] = state
+                    continue
+                try:
+                    file_stat = os.stat(os.path.join(root, path))
+                except OSError:
+                    continue
+                stats['files_checked'] += 1
+                files[path] = (file_stat.st_size, file_stat.st_mtime_ns, file_stat.st_ino, None)
+        else:
+            stats['dirs_listed'] += 1
+            subdirs = []
+            try:
+                with os.scandir(full_path) as entries:
+                    for entry in entries:
+                        path = os.path.join(relpath, entry.name) if relpath else entry.name
+                        try:
+                            if entry.is_dir():
+                                if not entry.is_symlink():
+                                    subdirs.append(path)
+                            elif name_filter(entry.name):
+                                file_stat = entry.stat()
+                                stats['files_checked'] += 1
+                                files[path] = (file_stat.st_size, file_stat.st_mtime_ns, file_stat.st_ino, None)
+                        except OSError as e:
+                            logging.warning(f"Could not stat {entry.path}: {e}")
+            except OSError as e:
+                if not relpath:
+                    raise
+                logging.warning(f"Could not list directory {full_path}: {e}")
+
+        if max_depth is None or depth < max_depth:
+            stack.extend((subdir, depth + 1) for subdir in subdirs)
+
+    return Snapshot(settings, files, dirs), stats
+
+
+class SnapshotStore:
+    """SQLite-backed storage of directory snapshots, keyed by root directory."""
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        self._conn = sqlite3.connect(db_path, timeout=30)
+        self._conn.executescript(_SCHEMA)
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def __enter__(self) -> "SnapshotStore":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def load(self, root: str) -> Optional[Snapshot]:
+        """Returns the stored snapshot of a directory, or None if it is not tracked."""
+        row = self._conn.execute("SELECT settings FROM snapshots WHERE root = ?", (root,)).fetchone()
+        if row is None:
+            return None
+        files = {
+            path: (size, mtime_ns, inode, content_hash)
+            for path, size, mtime_ns, inode, content_hash in self._conn.execute(
+                "SELECT path, size, mtime_ns, inode, content_hash FROM files WHERE root = ?", (root,))
+        }
+        dirs = dict(self._conn.execute("SELECT path, mtime_ns FROM dirs WHERE root = ?", (root,)))
+        return Snapshot(row[0], files, dirs)
+
+    def save(self, root: str, snapshot: Snapshot, previous: Optional[Snapshot] = None) -> None:
+        """Stores a snapshot, writing only the rows that differ from the previous one."""
+        if previous is None:
+            previous = Snapshot(snapshot.settings, {}, {})
+            self.delete(root)
+
+        with self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO snapshots (root, settings, updated_at) VALUES (?, ?, ?)",
+                (root, snapshot.settings, datetime.now().isoformat()))
+            self._conn.executemany(
+                "DELETE FROM files WHERE root = ? AND path = ?",
+                ((root, path) for path in previous.files if path not in snapshot.files))
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO files (root, path, size, mtime_ns, inode, content_hash) VALUES (?, ?, ?, ?, ?, ?)",
+                ((root, path, *state) for path, state in snapshot.files.items() if previous.files.get(path) != state))
+            self._conn.executemany(
+                "DELETE FROM dirs WHERE root = ? AND path = ?",
+                ((root, path) for path in previous.dirs if path not in snapshot.dirs))
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO dirs (root, path, mtime_ns) VALUES (?, ?, ?)",
+                ((root, path, mtime_ns) for path, mtime_ns in snapshot.dirs.items() if previous.dirs.get(path) != mtime_ns))
+
+    def delete(self, root: str) -> bool:
+        """Removes the snapshot of a directory. Returns True if one existed."""
+        with self._conn:
+            existed = self._conn.execute("DELETE FROM snapshots WHERE root = ?", (root,)).rowcount > 0
+            self._conn.execute("DELETE FROM files WHERE root = ?", (root,))
+            self._conn.execute("DELETE FROM dirs WHERE root = ?", (root,))
+        return existed
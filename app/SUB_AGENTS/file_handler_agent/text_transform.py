@@ -0,0 +1,236 @@
+"""Streaming text transforms used by the 'transform' operation of batch_process_files.
+
+Files are read and rewritten in fixed-size chunks, so memory use does not depend on
+the file size. The output goes to a temporary file in the same directory that
+replaces the original with os.replace only once it is complete: an interrupted
+transform leaves the original file untouched, never a truncated one.
+
+Replacements are found across chunk boundaries: the tail of each chunk that could
+still be the start of a match is carried over and searched again together with the
+next chunk.
+"""
+
+import os
+import re
+import tempfile
+from typing import Any, Callable, Dict, Optional, Tuple
+
+TRANSFORM_FUNCTIONS = ['uppercase', 'lowercase', 'replace']
+
+# Number of characters read per chunk
+CHUNK_SIZE = 1024 * 1024
+
+# Longest regular expression match (including lookarounds) that is guaranteed to be
+# found when it spans a chunk boundary. Literal search texts have no such limit.
+DEFAULT_MAX_MATCH_LENGTH = 64 * 1024
+
+# Trailing word of a chunk, looked for in its last _WORD_CARRY_SIZE characters
+_TRAILING_WORD = re.compile(r'\S+\Z')
+_WORD_CARRY_SIZE = 256
+
+# First of the private use characters standing for the groups while compiling a replacement template
+_PLACEHOLDER_BASE = 0xF0000
+
+
+def compile_replacement(search_text: str, replace_text: str,
+                        use_regex: bool = False) -> Tuple["re.Pattern", Callable[["re.Match"], str]]:
+    """Compiles the search text and replacement of a 'replace' transform.
+
+    Returns:
+        The search pattern, and a function returning the replacement for one of its matches.
+
+    Raises:
+        re.error: If use_regex is True and search_text is not a valid regular expression,
+            or replace_text refers to a group it does not have.
+    """
+    if not use_regex:
+        return re.compile(re.escape(search_text)), lambda match: replace_text
+    pattern = re.compile(search_text)
+    return pattern, _compile_template(pattern, replace_text)
+
+
+def _compile_template(pattern: "re.Pattern", replacement: str) -> Callable[["re.Match"], str]:
+    """Returns a function computing match.expand(replacement) without parsing the template per match.
+
+    The template is expanded once against a match whose groups hold unique placeholder
+    characters, which splits it into literal text and group references.
+
+    Raises:
+        re.error: If the template is invalid (e.g. refers to an unknown group).
+    """
+    placeholders = [chr(_PLACEHOLDER_BASE + group) for group in range(pattern.groups + 1)]
+    if any(placeholder in replacement for placeholder in placeholders):
+        return lambda match: match.expand(replacement)
+
+    # Group 0 matches the first placeholder only, groups 1..n the following ones (in a lookahead)
+    names = {index: name for name, index in pattern.groupindex.items()}
+    groups_pattern = "".join(
+        f"(?P<{names[group]}>{placeholders[group]})" if group in names else f"({placeholders[group]})"
+        for group in range(1, pattern.groups + 1))
+    placeholder_match = re.match(f"{placeholders[0]}(?={groups_pattern})", "".join(placeholders))
+    segments = re.split(f"([{placeholders[0]}-{placeholders[-1]}])", placeholder_match.expand(replacement))
+
+    literals = segments[0::2]
+    groups = [ord(placeholder) - _PLACEHOLDER_BASE for placeholder in segments[1::2]]
+    if not groups:
+        return lambda match: literals[0]
+
+    def expand(match: "re.Match") -> str:
+        values = match.group(*groups) if len(groups) > 1 else (match.group(groups[0]),)
+        parts = [literals[0]]
+        for value, literal in zip(values, literals[1:]):
+            if value is not None:
+                parts.append(value)
+            parts.append(literal)
+        return "".join(parts)
+
+    return expand
+
+
+class _Replacer:
+    """Incremental equivalent of pattern.sub() over text arriving in chunks."""
+
+    def __init__(self, search_text: str, replace_text: str, use_regex: bool, max_match_length: int):
+        self.pattern, self.expand = compile_replacement(search_text, replace_text, use_regex)
+        # A literal cannot match more characters than it has, so it needs no more lookahead
+        self.lookahead = max_match_length if use_regex else max(len(search_text), 1)
+        self.keep_context = use_regex
+        self.replacements = 0
+        # Already emitted text kept before the pending text, so that lookbehinds, \b and ^
+        # see the same context as they would on the whole file
+        self._context = ""
+        self._pending = ""
+        # Set when the last match emitted was empty and ended where the pending text starts,
+        # so that it is not found a second time
+        self._skip_empty_match = False
+
+    def feed(self, text: str, final: bool = False) -> str:
+        """Adds text and returns the transformed output that can no longer change."""
+        buffer = self._context + self._pending + text
+        start = len(self._context)
+        # Matches must end before limit: beyond it, more input could still change them
+        limit = len(buffer) if final else len(buffer) - self.lookahead
+        output = []
+        position = start
+        next_match_start = None
+
+        for match in self.pattern.finditer(buffer, start):
+            if self._skip_empty_match and match.start() == match.end() == start:
+                continue
+            if match.end() > limit or (match.end() == len(buffer) and not final):
+                next_match_start = match.start()
+                break
+            output.append(buffer[position:match.start()])
+            output.append(self.expand(match))
+            position = match.end()
+            self.replacements += 1
+            self._skip_empty_match = match.start() == match.end()
+
+        # Text before the first deferred match and before the limit cannot be part of a
+        # later match, since every match attempt there already saw enough lookahead
+        safe_end = limit if next_match_start is None else min(limit, next_match_start)
+        if safe_end > position:
+            output.append(buffer[position:safe_end])
+            position = safe_end
+            self._skip_empty_match = False
+
+        self._pending = buffer[position:]
+        self._context = buffer[max(0, position - self.lookahead):position] if self.keep_context else ""
+        return "".join(output)
+
+
+def _convert_case(text: str, transform_function: str) -> str:
+    return text.upper() if transform_function == 'uppercase' else text.lower()
+
+
+def transform_file(path: str, transform_function: str, search_text: Optional[str] = None,
+                   replace_text: Optional[str] = None, use_regex: bool = False,
+                   max_match_length: int = DEFAULT_MAX_MATCH_LENGTH,
+                   chunk_size: int = CHUNK_SIZE) -> Dict[str, Any]:
+    """Transforms a UTF-8 text file in place, chunk by chunk and atomically.
+
+    Undecodable bytes are replaced with U+FFFD. Line endings are preserved. If the
+    transform does not change the content, the file is left untouched.
+
+    Args:
+        path: Path of the file.
+        transform_function: One of TRANSFORM_FUNCTIONS.
+        search_text: For 'replace', the text (or regular expression) to replace.
+        replace_text: For 'replace', the replacement. With use_regex it may contain
+            group references such as \\1 or \\g<name>.
+        use_regex: If True, search_text is a regular expression.
+        max_match_length: See DEFAULT_MAX_MATCH_LENGTH.
+        chunk_size: Number of characters read at a time.
+
+    Returns:
+        'chars_read', 'chars_written', 'replacements' (for 'replace') and whether the
+        file was 'modified'.
+
+    Raises:
+        ValueError: If the transform function is unknown.
+        re.error: If the regular expression is invalid.
+        OSError: If the file cannot be read or replaced.
+    """
+    if transform_function not in TRANSFORM_FUNCTIONS:
+        raise ValueError(f"Invalid transform function: {transform_function}")
+    replacer = None
+    if transform_function == 'replace':
+        replacer = _Replacer(search_text, replace_text, use_regex, max_match_length)
+
+    directory = os.path.dirname(os.path.abspath(path))
+    chars_read = chars_written = 0
+    modified = False
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix=".transform-")
+    try:
+        with open(path, 'r', encoding='utf-8', errors='replace', newline='') as source, \
+                os.fdopen(fd, 'w', encoding='utf-8', newline='') as target:
+            carry = ""
+            while True:
+                chunk = source.read(chunk_size)
+                final = not chunk
+                chars_read += len(chunk)
+
+                if replacer is not None:
+                    output = replacer.feed(chunk, final)
+                    modified = modified or replacer.replacements > 0
+                else:
+                    # Case conversions can depend on the following characters (e.g. a final
+                    # sigma), so words cut at the chunk boundary are converted with the next chunk
+                    text = carry + chunk
+                    cut = len(text)
+                    if not final:
+                        search_start = max(0, len(text) - _WORD_CARRY_SIZE)
+                        trailing_word = _TRAILING_WORD.search(text, search_start)
+                        if trailing_word is not None and (trailing_word.start() > search_start or search_start == 0):
+                            cut = trailing_word.start()
+                    text, carry = text[:cut], text[cut:]
+                    output = _convert_case(text, transform_function)
+                    modified = modified or output != text
+
+                target.write(output)
+                chars_written += len(output)
+                if final:
+                    break
+
+            if modified:
+                target.flush()
+                os.fsync(target.fileno())
+
+        if modified:
+            os.chmod(temp_path, os.stat(path).st_mode & 0o7777)
+            os.replace(temp_path, path)
+        else:
+            os.remove(temp_path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+    result = {
+        'chars_read': chars_read,
+        'chars_written': chars_written,
+        'modified': modified
+    }
+    if replacer is not None:
+        result['replacements'] = replacer.replacements
+    return result
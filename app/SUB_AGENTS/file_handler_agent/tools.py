@@ -7,9 +7,14 @@ import re
 import time
 import hashlib
 import zipfile
-import filecmp
 import stat
 import platform
+import base64
+import itertools
+import threading
+import uuid
+from collections import OrderedDict
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from io import BytesIO
 from datetime import datetime
 
@@ -27,15 +32,143 @@ from pathlib import Path
 from watchdog.observers import Observer
 from watchdog.events import FileSystemEventHandler, FileSystemEvent
 
+from .archives import (check_archive_format, compile_member_filter, detect_archive_format, extract_zip_members,
+                       read_tar, write_tar, write_zip)
+from .batch_store import DONE, FAILED, PENDING, BatchStore
+from .copy_engine import fast_copy, fast_copy_files
+from .event_journal import DEFAULT_DEBOUNCE_SECONDS, DEFAULT_MAX_EVENTS, EventJournal
+from .file_diff import first_difference, is_binary_file, unified_diff
+from .file_metadata import file_metadata, files_metadata
+from .file_writer import DURABILITY_MODES, AppendSessions, atomic_write
+from .grep_engine import LineMatcher, iter_matches
+from .hashing import DEFAULT_MAX_WORKERS as HASH_MAX_WORKERS, HASH_ALGORITHMS, hash_file, hash_files, hash_files_edges
+from .search_index import TrigramIndex, index_path_for, required_literals
+from .snapshot_store import SnapshotStore, file_digest, scan_settings, scan_tree
+from .text_transform import DEFAULT_MAX_MATCH_LENGTH, TRANSFORM_FUNCTIONS, compile_replacement, transform_file
+from .version_store import VersionStore
+from .walker import compile_name_filter, walk
+
 # Load environment variables
 load_dotenv()
 
 # Get the project data directory from environment variable
 PROJECT_DATA_DIRECTORY = os.getenv("PROJECT_DATA_DIRECTORY", "/")
 
-def read_file(file_path: str, use_data_dir: bool = True) -> str:
+# Directory where the file handler keeps its persistent state (search indexes, etc.)
+FILE_HANDLER_STATE_DIRECTORY = os.getenv(
+    "FILE_HANDLER_STATE_DIRECTORY",
+    os.path.join(os.path.expanduser("~"), ".file_handler_agent")
+)
+
+# Append sessions of append_to_file: open files and content buffered by 'buffered' appends
+_append_sessions = AppendSessions()
+
+def _flush_appends(full_path: str) -> None:
+    """Writes content still buffered for a file, before another tool reads or replaces it."""
+    _append_sessions.flush(full_path)
+
+def _flush_appends_below(full_path: str) -> None:
+    """Writes content still buffered for a file or for any file below a directory; errors are logged."""
+    _append_sessions.flush_below(full_path)
+
+# Sparse per-file line index used by ranged reads: byte offset of every
+# LINE_INDEX_STRIDE-th line, keyed by full path and validated by (size, mtime_ns)
+LINE_INDEX_STRIDE = 1000
+_LINE_INDEX_CACHE_SIZE = 64
+_line_index_cache = OrderedDict()
+_line_index_cache_lock = threading.Lock()
+
+# Default page size (in bytes) when paging through a file with read_file
+DEFAULT_READ_PAGE_SIZE = 64 * 1024
+
+_READ_CHUNK_SIZE = 1024 * 1024
+
+
+def _get_line_index(full_path: str) -> Dict[str, Any]:
+    """Returns the (cached) sparse line index of a file, building it in one streaming pass."""
+    file_stat = os.stat(full_path)
+    signature = (file_stat.st_size, file_stat.st_mtime_ns)
+    with _line_index_cache_lock:
+        cached = _line_index_cache.get(full_path)
+        if cached is not None and cached['signature'] == signature:
+            _line_index_cache.move_to_end(full_path)
+            return cached
+    
+    checkpoints = [0]  # checkpoints[i] is the byte offset of line i * LINE_INDEX_STRIDE + 1
+    line_count = 0
+    position = 0
+    ends_with_newline = True
+    with open(full_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(_READ_CHUNK_SIZE), b""):
+            newline = chunk.find(b"\n")
+            while newline != -1:
+                line_count += 1
+                if line_count % LINE_INDEX_STRIDE == 0:
+                    checkpoints.append(position + newline + 1)
+                newline = chunk.find(b"\n", newline + 1)
+            position += len(chunk)
+            ends_with_newline = chunk.endswith(b"\n")
+    if not ends_with_newline:
+        # Count a final line without a trailing newline
+        line_count += 1
+    
+    line_index = {'signature': signature, 'checkpoints': checkpoints, 'total_lines': line_count}
+    with _line_index_cache_lock:
+        _line_index_cache[full_path] = line_index
+        _line_index_cache.move_to_end(full_path)
+        if len(_line_index_cache) > _LINE_INDEX_CACHE_SIZE:
+            _line_index_cache.popitem(last=False)
+    return line_index
+
+
+def iter_file_pages(full_path: str, offset: int = 0, page_size: int = DEFAULT_READ_PAGE_SIZE):
+    """Lazily yields a file as consecutive pages of roughly page_size bytes.
+    
+    Pages end on a line boundary whenever the page contains a newline, so lines are
+    only split when a single line is longer than page_size. Memory use is bounded by
+    page_size regardless of the file size.
+    
+    Args:
+        full_path: Full path of the file.
+        offset: Byte offset to start at.
+        page_size: Maximum number of bytes per page.
+    
+    Yields:
+        Tuples of (page_bytes, start_offset, next_offset).
+    """
+    with open(full_path, 'rb') as f:
+        f.seek(offset)
+        carry = b""
+        while True:
+            data = carry + f.read(page_size - len(carry))
+            if not data:
+                return
+            at_eof = len(data) < page_size
+            cut = len(data) if at_eof else data.rfind(b"\n") + 1 or len(data)
+            page, carry = data[:cut], data[cut:]
+            yield page, offset, offset + len(page)
+            offset += len(page)
+
+
+def _encode_continuation_token(offset: int, file_stat: os.stat_result) -> str:
+    payload = json.dumps({'offset': offset, 'mtime_ns': file_stat.st_mtime_ns})
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii')
+
+
+def _decode_continuation_token(token: str) -> Dict[str, int]:
+    return json.loads(base64.urlsafe_b64decode(token.encode('ascii')).decode('utf-8'))
+
+
+def read_file(file_path: str, use_data_dir: bool = True, offset: Optional[int] = None, length: Optional[int] = None, start_line: Optional[int] = None, end_line: Optional[int] = None, page_size: Optional[int] = None, continuation_token: Optional[str] = None) -> Union[str, Dict[str, Any]]:
     """Reads the content of a file from either the project data directory or a full path.
     
+    Without any range arguments the whole file is returned. For large files, read only
+    part of it with one of the following modes:
+    - Byte range: 'offset' and/or 'length'.
+    - Line range: 'start_line' and/or 'end_line' (uses a line index cached per file).
+    - Paging: 'page_size' and/or 'continuation_token'. Pass the 'continuation_token' of
+      each result to the next call to walk through the file page by page.
+    
     Args:
         file_path: Path to the file to read. If use_data_dir is True, this should be a 
             relative path within the project data directory (e.g., "prompts/system.txt").
@@ -43,10 +176,26 @@ def read_file(file_path: str, use_data_dir: bool = True) -> str:
             the current working directory.
         use_data_dir: If True (default), prepend the project data directory to the file_path.
             If False, use the file_path as provided.
+        offset: Byte offset to start reading at (byte range mode, default 0).
+        length: Maximum number of bytes to read (byte range mode, default: to the end).
+        start_line: First line to read, 1-based (line range mode, default 1). An error is
+            returned if it is past the last line.
+        end_line: Last line to read, inclusive (line range mode, default: the last line).
+            Must not be before start_line; values past the last line read to the end.
+        page_size: Maximum number of bytes per page (paging mode, default 65536).
+        continuation_token: Token returned by the previous page (paging mode).
     
     Returns:
-        The content of the file as a string. For JSON files, this will be the 
-        JSON string representation.
+        Without range arguments, the content of the file as a string. For JSON files, 
+        this will be the JSON string representation.
+        With range arguments, a dictionary containing:
+        - 'file_path': Full path to the file
+        - 'content': The requested part of the file
+        - 'file_size': Size of the file in bytes
+        - 'offset'/'next_offset': Byte range that was read (byte range and paging modes)
+        - 'start_line'/'end_line'/'total_lines': Lines that were read (line range mode)
+        - 'continuation_token': Token for the next page, None at the end (paging mode)
+        - 'eof': True if the end of the file was reached
     
     returns:
         FileNotFoundError: If the specified file cannot be found.
@@ -62,6 +211,88 @@ def read_file(file_path: str, use_data_dir: bool = True) -> str:
     if not os.path.isfile(full_path):
         logging.warning(f"File not found: {full_path}")
         return "file not found"    
+    
+    _flush_appends(full_path)
+    
+    paging = page_size is not None or continuation_token is not None
+    line_range = start_line is not None or end_line is not None
+    byte_range = offset is not None or length is not None
+    if paging or line_range or byte_range:
+        try:
+            if paging + line_range + byte_range > 1:
+                return {"error": "Use only one of byte range (offset/length), line range (start_line/end_line) or paging (page_size/continuation_token)"}
+            file_stat = os.stat(full_path)
+            
+            if paging:
+                page_size = page_size or DEFAULT_READ_PAGE_SIZE
+                if page_size <= 0:
+                    return {"error": f"Invalid page_size: {page_size}"}
+                page_offset = 0
+                file_changed = False
+                if continuation_token:
+                    token = _decode_continuation_token(continuation_token)
+                    page_offset = token['offset']
+                    file_changed = token['mtime_ns'] != file_stat.st_mtime_ns
+                page, start, next_offset = next(iter_file_pages(full_path, page_offset, page_size), (b"", page_offset, page_offset))
+                eof = next_offset >= file_stat.st_size
+                return {
+                    'file_path': full_path,
+                    'content': page.decode('utf-8', errors='replace'),
+                    'offset': start,
+                    'next_offset': next_offset,
+                    'file_size': file_stat.st_size,
+                    'file_changed': file_changed,
+                    'continuation_token': None if eof else _encode_continuation_token(next_offset, file_stat),
+                    'eof': eof
+                }
+            
+            if line_range:
+                start_line = 1 if start_line is None else start_line
+                if start_line < 1 or (end_line is not None and end_line < start_line):
+                    return {"error": f"Invalid line range: start_line={start_line}, end_line={end_line} (lines are 1-based and end_line must not be before start_line)"}
+                line_index = _get_line_index(full_path)
+                total_lines = line_index['total_lines']
+                if start_line > total_lines:
+                    return {"error": f"Line range out of range: start_line {start_line} is past the end of the file ({total_lines} lines)", "total_lines": total_lines}
+                last_line = total_lines if end_line is None else min(end_line, total_lines)
+                lines = []
+                checkpoint = (start_line - 1) // LINE_INDEX_STRIDE
+                with open(full_path, 'rb') as f:
+                    f.seek(line_index['checkpoints'][checkpoint])
+                    line_number = checkpoint * LINE_INDEX_STRIDE
+                    for line in f:
+                        line_number += 1
+                        if line_number > last_line:
+                            break
+                        if line_number >= start_line:
+                            lines.append(line)
+                return {
+                    'file_path': full_path,
+                    'content': b"".join(lines).decode('utf-8', errors='replace'),
+                    'start_line': start_line,
+                    'end_line': start_line + len(lines) - 1,
+                    'total_lines': line_index['total_lines'],
+                    'file_size': file_stat.st_size,
+                    'eof': start_line + len(lines) - 1 >= line_index['total_lines']
+                }
+            
+            offset = max(offset or 0, 0)
+            with open(full_path, 'rb') as f:
+                f.seek(offset)
+                data = f.read(length) if length is not None else f.read()
+            return {
+                'file_path': full_path,
+                'content': data.decode('utf-8', errors='replace'),
+                'offset': offset,
+                'next_offset': offset + len(data),
+                'file_size': file_stat.st_size,
+                'eof': offset + len(data) >= file_stat.st_size
+            }
+        except Exception as e:
+            error_msg = f"Error reading file {file_path}: {str(e)}"
+            logging.error(error_msg)
+            return {"error": error_msg}
+    
     # Determine file type by extension
     _, file_extension = os.path.splitext(file_path)
     
@@ -76,7 +307,7 @@ def read_file(file_path: str, use_data_dir: bool = True) -> str:
         with open(full_path, 'r', encoding='utf-8') as file:
             return file.read()
 
-def write_to_file(file_path: str, content: str, use_data_dir: bool = True) -> str:
+def write_to_file(file_path: str, content: str, use_data_dir: bool = True, atomic: bool = False) -> str:
     """Writes content to a file, creating it if it doesn't exist.
     
     Args:
@@ -87,6 +318,9 @@ def write_to_file(file_path: str, content: str, use_data_dir: bool = True) -> st
         content: The string content to write to the file.
         use_data_dir: If True (default), prepend the project data directory to the file_path.
             If False, use the file_path as provided.
+        atomic: If True, write to a temporary file that then replaces the file, with fsyncs,
+            so that readers and a crash can only ever see the old or the complete new content.
+            Default is False (the file is truncated and rewritten in place).
     
     Returns:
         A success message with the path of the written file.
@@ -105,9 +339,15 @@ def write_to_file(file_path: str, content: str, use_data_dir: bool = True) -> st
         # Create directory if it doesn't exist
         os.makedirs(os.path.dirname(full_path), exist_ok=True)
         
+        # Appends still buffered for the file must not land after the new content
+        _flush_appends(full_path)
+        
         # Write the content to the file
-        with open(full_path, 'w', encoding='utf-8') as file:
-            file.write(content)
+        if atomic:
+            atomic_write(full_path, content.encode('utf-8'))
+        else:
+            with open(full_path, 'w', encoding='utf-8') as file:
+                file.write(content)
         
         return f"Successfully wrote to file: {full_path}"
     
@@ -247,7 +487,8 @@ def delete_file(file_path: str, use_data_dir: bool = True) -> str:
             logging.warning(error_msg)
             return FileNotFoundError(error_msg)
         
-        # Delete the file
+        # Delete the file, closing it first if it is open for appends
+        _append_sessions.close(full_path)
         os.remove(full_path)
         
         return f"Successfully deleted file: {full_path}"
@@ -296,7 +537,8 @@ def delete_folder(folder_path: str, use_data_dir: bool = True) -> str:
             logging.warning(error_msg)
             return FileNotFoundError(error_msg)
         
-        # Delete the folder and all its contents
+        # Delete the folder and all its contents, closing the files open for appends
+        _append_sessions.close(full_path)
         shutil.rmtree(full_path)
         
         return f"Successfully deleted folder: {full_path}"
@@ -345,11 +587,12 @@ def list_files_with_metadata(directory_path: str, use_data_dir: bool = True) ->
             return FileNotFoundError(error_msg)
         
         items_with_metadata = []
-        for item_name in os.listdir(full_path):
-            item_full_path = os.path.join(full_path, item_name)
+        for entry in walk(full_path, recursive=False, include_dirs=True):
+            item_name = entry.name
+            item_full_path = entry.path
             try:
-                stat_info = os.stat(item_full_path)
-                item_type = "file" if os.path.isfile(item_full_path) else "directory"
+                stat_info = entry.stat()
+                item_type = "file" if entry.is_file() else "directory"
                 items_with_metadata.append({
                     "name": item_name,
                     "type": item_type,
@@ -401,9 +644,15 @@ def check_file_exists(file_path: str, use_data_dir: bool = True) -> bool:
     return os.path.isfile(full_path)
 
 
-def append_to_file(file_path: str, content: str, use_data_dir: bool = True) -> str:
+def append_to_file(file_path: str, content: str, use_data_dir: bool = True, durability: str = "flush") -> str:
     """Appends content to an existing file.
     
+    Appending many pieces to the same file (e.g. building a report line by line) is
+    cheapest with durability 'buffered': the pieces are collected in memory and written
+    together. The tools of this agent that read, hash, search, compare, archive, copy,
+    move, rewrite or delete the file write its buffered content first;
+    flush_file_buffers writes it explicitly, e.g. before another program reads the file.
+    
     Args:
         file_path: Path to the file to append to. If use_data_dir is True, this should be a 
             relative path within the project data directory (e.g., "prompts/system.txt").
@@ -412,6 +661,12 @@ def append_to_file(file_path: str, content: str, use_data_dir: bool = True) -> s
         content: The string content to append to the file.
         use_data_dir: If True (default), prepend the project data directory to the file_path.
             If False, use the file_path as provided.
+        durability: When the content reaches the file:
+            - 'buffered': Kept in memory and written with later appends, at the latest
+              about a second later. Lost if the process crashes before that.
+            - 'flush' (default): Written to the file before returning.
+            - 'fsync': Written and flushed to disk before returning (survives power loss).
+              Concurrent appends to the same file share their fsyncs.
     
     Returns:
         A success message with the path of the updated file.
@@ -434,10 +689,16 @@ def append_to_file(file_path: str, content: str, use_data_dir: bool = True) -> s
             logging.warning(error_msg)
             return FileNotFoundError(error_msg)
         
-        # Append the content to the file
-        with open(full_path, 'a', encoding='utf-8') as file:
-            file.write(content)
+        if durability not in DURABILITY_MODES:
+            error_msg = f"Invalid durability: {durability}. Valid options are: {', '.join(DURABILITY_MODES)}"
+            logging.warning(error_msg)
+            return ValueError(error_msg)
         
+        # Append the content to the file through its append session
+        _append_sessions.append(full_path, content.encode('utf-8'), durability)
+        
+        if durability == 'buffered':
+            return f"Successfully buffered append to file: {full_path}"
         return f"Successfully appended to file: {full_path}"
     
     except FileNotFoundError as e:
@@ -452,6 +713,38 @@ def append_to_file(file_path: str, content: str, use_data_dir: bool = True) -> s
         return Exception(error_msg)
 
 
+def flush_file_buffers(file_path: Optional[str] = None, fsync: bool = False, use_data_dir: bool = True) -> Dict[str, Any]:
+    """Writes the content buffered by append_to_file with durability 'buffered'.
+    
+    Args:
+        file_path: Path to the file to flush. If None (default), all files are flushed.
+            If use_data_dir is True, this should be a relative path within the project data directory.
+        fsync: If True, also flush the files to disk. Default is False.
+        use_data_dir: If True (default), prepend the project data directory to the file_path.
+            If False, use the file_path as provided.
+    
+    Returns:
+        A dictionary containing:
+        - 'file': The flushed file, or None if all files were flushed
+        - 'flushed_bytes': Number of buffered bytes written
+    """
+    try:
+        full_path = None
+        if file_path is not None:
+            full_path = os.path.join(PROJECT_DATA_DIRECTORY, file_path) if use_data_dir else file_path
+        
+        flushed_bytes = _append_sessions.flush(full_path, fsync=fsync)
+        return {
+            'file': full_path,
+            'flushed_bytes': flushed_bytes
+        }
+    
+    except Exception as e:
+        error_msg = f"Error flushing file buffers: {str(e)}"
+        logging.error(error_msg)
+        return {"error": error_msg}
+
+
 def rename_file(old_path: str, new_path: str, use_data_dir: bool = True) -> str:
     """Renames or moves a file.
     
@@ -496,7 +789,8 @@ def rename_file(old_path: str, new_path: str, use_data_dir: bool = True) -> str:
         # Create directory for the new path if it doesn't exist
         os.makedirs(os.path.dirname(full_new_path), exist_ok=True)
         
-        # Rename/move the file
+        # Rename/move the file, closing it first if it is open for appends
+        _append_sessions.close(full_old_path)
         os.rename(full_old_path, full_new_path)
         
         return f"Successfully renamed/moved file from {full_old_path} to {full_new_path}"
@@ -554,7 +848,8 @@ def copy_file(source_path: str, destination_path: str, use_data_dir: bool = True
         
         os.makedirs(os.path.dirname(full_destination_path), exist_ok=True)
         
-        shutil.copy2(full_source_path, full_destination_path)
+        _flush_appends(full_source_path)
+        fast_copy(full_source_path, full_destination_path)
         
         return f"Successfully copied file from {full_source_path} to {full_destination_path}"
 
@@ -621,9 +916,46 @@ def get_current_working_directory() -> str:
     """
     return os.getcwd()
 
-def list_folder_tree(directory_path: str, use_data_dir: bool = True) -> List[Dict[str, Any]]:
+# Fields list_folder_tree can report for each entry
+TREE_ENTRY_FIELDS = ["path", "type", "size", "creation_time", "modification_time"]
+
+
+def _summarize_folder_tree(full_start_path: str, max_depth: Optional[int] = None) -> List[Dict[str, Any]]:
+    """Computes per-directory totals (files, subdirectories and bytes, including subtrees) in one walk."""
+    summaries = {".": {"path": ".", "depth": -1, "file_count": 0, "dir_count": 0, "total_size": 0}}
+    for entry in walk(full_start_path, include_dirs=True):
+        parent = os.path.dirname(entry.relpath) or "."
+        if entry.is_dir():
+            summaries[parent]["dir_count"] += 1
+            summaries[entry.relpath] = {"path": entry.relpath, "depth": entry.depth, "file_count": 0, "dir_count": 0, "total_size": 0}
+            continue
+        summaries[parent]["file_count"] += 1
+        try:
+            summaries[parent]["total_size"] += entry.stat().st_size
+        except OSError as e:
+            logging.warning(f"Could not retrieve size of file {entry.path}: {e}")
+    
+    # Roll the totals of every directory up into its parent, deepest directories first
+    for summary in sorted(summaries.values(), key=lambda item: item["depth"], reverse=True):
+        if summary["path"] != ".":
+            parent = summaries[os.path.dirname(summary["path"]) or "."]
+            for key in ("file_count", "dir_count", "total_size"):
+                parent[key] += summary[key]
+    
+    return [
+        {key: value for key, value in summary.items() if key != "depth"}
+        for summary in sorted(summaries.values(), key=lambda item: item["path"])
+        if max_depth is None or summary["depth"] <= max_depth
+    ]
+
+
+def list_folder_tree(directory_path: str, use_data_dir: bool = True, page_size: Optional[int] = None, cursor: Optional[str] = None, fields: Optional[List[str]] = None, max_depth: Optional[int] = None, summary_only: bool = False) -> Union[List[Dict[str, Any]], Dict[str, Any]]:
     """Lists the contents of a directory recursively, similar to a file tree.
     
+    For large trees, use page_size to receive the tree page by page (pass the returned
+    'next_cursor' as cursor to get the next page), fields to limit what is reported for
+    each entry, or summary_only to get per-directory totals instead of every entry.
+    
     Args:
         directory_path: The path to the directory to list. If use_data_dir is True, this should be a 
             relative path within the project data directory.
@@ -631,11 +963,25 @@ def list_folder_tree(directory_path: str, use_data_dir: bool = True) -> List[Dic
             the current working directory.
         use_data_dir: If True (default), prepend the project data directory to the directory_path.
             If False, use the directory_path as provided.
+        page_size: Maximum number of entries to return. None (default) returns the whole tree.
+        cursor: The 'next_cursor' of the previous page, to continue a paginated listing.
+        fields: Fields to report for each entry, any of 'path', 'type', 'size', 'creation_time'
+            and 'modification_time'. None (default) reports all of them. Timestamps are only
+            computed when requested.
+        max_depth: Maximum depth to list (0 = only the entries directly in the directory).
+            None (default) means no limit.
+        summary_only: If True, return one summary per directory ('path', 'file_count',
+            'dir_count', 'total_size', all including subdirectories) instead of every entry.
             
     Returns:
-        A list of dictionaries, each representing an item (file or directory) in the tree.
-        Each dictionary contains 'path' (relative to the starting directory), 'type' ('file' or 'directory'),
-        and optionally 'size', 'creation_time', and 'modification_time' for files.
+        Without page_size, cursor or summary_only, a list of dictionaries, each representing an
+        item (file or directory) in the tree. Each dictionary contains 'path' (relative to the
+        starting directory), 'type' ('file' or 'directory'), and optionally 'size',
+        'creation_time', and 'modification_time'.
+        Otherwise a dictionary containing:
+        - 'directory': The listed directory
+        - 'entries' (or 'summaries' if summary_only is True): The items of this page
+        - 'next_cursor': Cursor for the next page, None on the last page
     
     returns:
         FileNotFoundError: If the specified directory does not exist.
@@ -653,55 +999,68 @@ def list_folder_tree(directory_path: str, use_data_dir: bool = True) -> List[Dic
             logging.warning(error_msg)
             return FileNotFoundError(error_msg)
         
-        tree_structure = []
-        for root, dirs, files in os.walk(full_start_path):
-            relative_root = os.path.relpath(root, full_start_path)
-            if relative_root == '.':
-                relative_root = ''
-
-            # Add directories
-            for d in dirs:
-                full_item_path = os.path.join(root, d)
-                relative_item_path = os.path.join(relative_root, d)
-                try:
-                    stat_info = os.stat(full_item_path)
-                    tree_structure.append({
-                        "path": relative_item_path,
-                        "type": "directory",
-                        "size": stat_info.st_size,
-                        "creation_time": datetime.datetime.fromtimestamp(stat_info.st_ctime).isoformat(),
-                        "modification_time": datetime.datetime.fromtimestamp(stat_info.st_mtime).isoformat()
-                    })
-                except Exception as e:
-                    logging.warning(f"Could not retrieve metadata for directory {full_item_path}: {e}")
-                    tree_structure.append({
-                        "path": relative_item_path,
-                        "type": "directory",
-                        "error": str(e)
-                    })
-
-            # Add files
-            for f in files:
-                full_item_path = os.path.join(root, f)
-                relative_item_path = os.path.join(relative_root, f)
+        if fields is None:
+            fields = TREE_ENTRY_FIELDS
+        invalid_fields = [f for f in fields if f not in TREE_ENTRY_FIELDS]
+        if invalid_fields:
+            error_msg = f"Invalid fields: {invalid_fields}. Valid fields are: {', '.join(TREE_ENTRY_FIELDS)}"
+            logging.warning(error_msg)
+            return ValueError(error_msg)
+        
+        paginated = page_size is not None or cursor is not None
+        if page_size is not None and page_size <= 0:
+            error_msg = f"Invalid page_size: {page_size}"
+            logging.warning(error_msg)
+            return ValueError(error_msg)
+        
+        if summary_only:
+            summaries = _summarize_folder_tree(full_start_path, max_depth)
+            if cursor:
+                summaries = [summary for summary in summaries if summary["path"] > cursor]
+            has_more = page_size is not None and len(summaries) > page_size
+            summaries = summaries[:page_size]
+            return {
+                'directory': full_start_path,
+                'summaries': summaries,
+                'next_cursor': summaries[-1]["path"] if has_more else None
+            }
+        
+        needs_stat = any(f in fields for f in ("size", "creation_time", "modification_time"))
+        
+        def describe(entry):
+            item_type = "directory" if entry.is_dir() else "file"
+            item = {}
+            if "path" in fields:
+                item["path"] = entry.relpath
+            if "type" in fields:
+                item["type"] = item_type
+            if needs_stat:
                 try:
-                    stat_info = os.stat(full_item_path)
-                    tree_structure.append({
-                        "path": relative_item_path,
-                        "type": "file",
-                        "size": stat_info.st_size,
-                        "creation_time": datetime.datetime.fromtimestamp(stat_info.st_ctime).isoformat(),
-                        "modification_time": datetime.datetime.fromtimestamp(stat_info.st_mtime).isoformat()
-                    })
+                    stat_info = entry.stat()
+                    if "size" in fields:
+                        item["size"] = stat_info.st_size
+                    if "creation_time" in fields:
+                        item["creation_time"] = datetime.fromtimestamp(stat_info.st_ctime).isoformat()
+                    if "modification_time" in fields:
+                        item["modification_time"] = datetime.fromtimestamp(stat_info.st_mtime).isoformat()
                 except Exception as e:
-                    logging.warning(f"Could not retrieve metadata for file {full_item_path}: {e}")
-                    tree_structure.append({
-                        "path": relative_item_path,
-                        "type": "file",
-                        "error": str(e)
-                    })
-        
-        return tree_structure
+                    logging.warning(f"Could not retrieve metadata for {item_type} {entry.path}: {e}")
+                    item["error"] = str(e)
+            return item
+        
+        # Paginated listings walk in sorted order so that a cursor can resume the walk
+        entries = walk(full_start_path, include_dirs=True, max_depth=max_depth, sort=paginated, start_after=cursor)
+        if not paginated:
+            return [describe(entry) for entry in entries]
+        
+        page = list(itertools.islice(entries, page_size + 1 if page_size is not None else None))
+        has_more = page_size is not None and len(page) > page_size
+        page = page[:page_size]
+        return {
+            'directory': full_start_path,
+            'entries': [describe(entry) for entry in page],
+            'next_cursor': page[-1].relpath if has_more else None
+        }
 
     except FileNotFoundError as e:
         return e
@@ -845,62 +1204,42 @@ def filter_file_content(file_path: str, filter_pattern: str, use_regex: bool = F
             logging.warning(error_msg)
             return {"error": error_msg}
         
-        # Prepare regex pattern if using regex
-        if use_regex:
-            regex_pattern = re.compile(pattern)
-        
-        # Function to check if a file matches the pattern
-        def file_matches(filepath):
-            filename = os.path.basename(filepath)
-            if use_regex:
-                return bool(regex_pattern.search(filename))
-            else:
-                # Use glob-style matching
-                import fnmatch
-                return fnmatch.fnmatch(filename, pattern)
-        
         # Walk through the directory recursively
         matched_files = []
         results = {}
-        current_depth = 0
+        backups = []
         
-        for root, dirs, files in os.walk(full_path):
-            # Check depth limit
-            relative_root = os.path.relpath(root, full_path)
-            current_depth = 0 if relative_root == '.' else relative_root.count(os.sep) + 1
+        for entry in walk(full_path, pattern=pattern, use_regex=use_regex, max_depth=max_depth):
+            file_path = entry.path
+            matched_files.append(file_path)
             
-            if max_depth is not None and current_depth > max_depth:
-                dirs[:] = []  # Stop descending into subdirectories
-                continue
+            # Perform the operation
+            if operation == 'delete':
+                if not dry_run:
+                    try:
+                        _append_sessions.close(file_path)
+                        os.remove(file_path)
+                        results[file_path] = "Deleted"
+                    except Exception as e:
+                        results[file_path] = f"Error: {str(e)}"
+                else:
+                    results[file_path] = "Would be deleted (dry run)"
             
-            # Process files in this directory
-            for file in files:
-                file_path = os.path.join(root, file)
-                
-                if file_matches(file_path):
-                    matched_files.append(file_path)
-                    
-                    # Perform the operation
-                    if operation == 'delete':
-                        if not dry_run:
-                            try:
-                                os.remove(file_path)
-                                results[file_path] = "Deleted"
-                            except Exception as e:
-                                results[file_path] = f"Error: {str(e)}"
-                        else:
-                            results[file_path] = "Would be deleted (dry run)"
-                    
-                    elif operation == 'backup':
-                        backup_path = f"{file_path}.bak"
-                        if not dry_run:
-                            try:
-                                shutil.copy2(file_path, backup_path)
-                                results[file_path] = f"Backed up to {backup_path}"
-                            except Exception as e:
-                                results[file_path] = f"Error: {str(e)}"
-                        else:
-                            results[file_path] = f"Would be backed up to {backup_path} (dry run)"
+            elif operation == 'backup':
+                backup_path = f"{file_path}.bak"
+                if not dry_run:
+                    backups.append((file_path, backup_path))
+                else:
+                    results[file_path] = f"Would be backed up to {backup_path} (dry run)"
+        
+        # Copy the backups in parallel once all files are known
+        for file_path, backup_path in backups:
+            _flush_appends_below(file_path)
+        for (file_path, backup_path), copy_result in zip(backups, fast_copy_files(backups)):
+            if isinstance(copy_result, Exception):
+                results[file_path] = f"Error: {str(copy_result)}"
+            else:
+                results[file_path] = f"Backed up to {backup_path}"
         
         # Summarize the operation
         summary = {
@@ -986,13 +1325,13 @@ def get_disk_usage(path: Optional[str] = None, use_data_dir: bool = True) -> Dic
         logging.error(error_msg)
         return {"error": error_msg}
 
-# File versioning system - storage dictionary for versions
-_file_versions = {}
-
-def file_versioning(file_path: str, action: str = "save", version_name: Optional[str] = None, restore_version: Optional[str] = None, list_all: bool = False, use_data_dir: bool = True) -> Dict[str, Any]:
+def file_versioning(file_path: str, action: str = "save", version_name: Optional[str] = None, restore_version: Optional[str] = None, list_all: bool = False, from_version: Optional[str] = None, to_version: Optional[str] = None, use_data_dir: bool = True) -> Dict[str, Any]:
     """
     Tracks changes and maintains file history through a versioning system.
     
+    Versions are stored on disk in a deduplicated, compressed content store, so history
+    survives restarts and saving an unchanged file takes no additional space.
+    
     Args:
         file_path: Path to the file to version. If use_data_dir is True, this should be a 
             relative path within the project data directory.
@@ -1000,6 +1339,8 @@ def file_versioning(file_path: str, action: str = "save", version_name: Optional
         version_name: Optional name for the version being saved. If None, a timestamp will be used.
         restore_version: Version to restore (required when action is 'restore').
         list_all: If True and action is 'list', includes file content in the listing.
+        from_version: Older version to compare (for 'compare'). Defaults to the second most recent version.
+        to_version: Newer version to compare (for 'compare'). Defaults to the most recent version.
         use_data_dir: If True (default), prepend the project data directory to the file_path.
             If False, use the file_path as provided.
     
@@ -1010,8 +1351,6 @@ def file_versioning(file_path: str, action: str = "save", version_name: Optional
         - 'result': Result of the action (version saved, restored, list of versions, etc.)
     """
     try:
-        global _file_versions
-        
         # Get the full path based on use_data_dir setting
         if use_data_dir:
             full_path = os.path.join(PROJECT_DATA_DIRECTORY, file_path)
@@ -1024,131 +1363,123 @@ def file_versioning(file_path: str, action: str = "save", version_name: Optional
             logging.warning(error_msg)
             return {"error": error_msg}
         
-        # Initialize versioning for this file if not already done
-        if full_path not in _file_versions:
-            _file_versions[full_path] = {}
-        
-        # Perform the requested action
-        if action == "save":
-            # Read the current file content
-            with open(full_path, 'r', encoding='utf-8', errors='replace') as f:
-                content = f.read()
-            
-            # Generate version name if not provided
-            if not version_name:
-                version_name = datetime.now().strftime("%Y%m%d_%H%M%S")
-            
-            # Save the version
-            _file_versions[full_path][version_name] = {
-                'timestamp': datetime.now().isoformat(),
-                'content': content
-            }
-            
-            return {
-                'file_path': full_path,
-                'action': 'save',
-                'result': f"Version '{version_name}' saved successfully",
-                'version_name': version_name,
-                'timestamp': _file_versions[full_path][version_name]['timestamp']
-            }
-        
-        elif action == "restore":
-            # Check if the version exists
-            if not restore_version or restore_version not in _file_versions[full_path]:
-                available_versions = list(_file_versions[full_path].keys())
-                error_msg = f"Version '{restore_version}' not found. Available versions: {available_versions}"
-                logging.warning(error_msg)
-                return {"error": error_msg}
-            
-            # Restore the file from the specified version
-            content = _file_versions[full_path][restore_version]['content']
-            
-            # Create directory if it doesn't exist
-            os.makedirs(os.path.dirname(full_path), exist_ok=True)
-            
-            # Write the content back to the file
-            with open(full_path, 'w', encoding='utf-8') as f:
-                f.write(content)
+        version_key = os.path.abspath(full_path)
+        with VersionStore(os.path.join(FILE_HANDLER_STATE_DIRECTORY, "versions")) as store:
+            # Perform the requested action
+            if action == "save":
+                # Generate version name if not provided
+                if not version_name:
+                    version_name = datetime.now().strftime("%Y%m%d_%H%M%S")
+                
+                # Save the version, streaming the file into the content store
+                version = store.save(version_key, full_path, version_name)
+                
+                return {
+                    'file_path': full_path,
+                    'action': 'save',
+                    'result': f"Version '{version_name}' saved successfully",
+                    'version_name': version_name,
+                    'timestamp': version['timestamp'],
+                    'size': version['size'],
+                    'new_chunks': version['new_chunks'],
+                    'reused_chunks': version['reused_chunks']
+                }
             
-            return {
-                'file_path': full_path,
-                'action': 'restore',
-                'result': f"Version '{restore_version}' restored successfully",
-                'version_name': restore_version,
-                'timestamp': _file_versions[full_path][restore_version]['timestamp']
-            }
-        
-        elif action == "list":
-            # List all versions for this file
-            versions = []
-            for ver_name, ver_info in _file_versions[full_path].items():
-                version_data = {
-                    'name': ver_name,
-                    'timestamp': ver_info['timestamp']
+            elif action == "restore":
+                # Check if the version exists
+                version = store.get_version(version_key, restore_version) if restore_version else None
+                if version is None:
+                    available_versions = [v['name'] for v in store.list_versions(version_key)]
+                    error_msg = f"Version '{restore_version}' not found. Available versions: {available_versions}"
+                    logging.warning(error_msg)
+                    return {"error": error_msg}
+                
+                # Restore the file from the specified version
+                store.restore(version_key, restore_version, full_path)
+                
+                return {
+                    'file_path': full_path,
+                    'action': 'restore',
+                    'result': f"Version '{restore_version}' restored successfully",
+                    'version_name': restore_version,
+                    'timestamp': version['timestamp']
                 }
+            
+            elif action == "list":
+                # List all versions for this file (sorted newest first)
+                versions = store.list_versions(version_key)
                 if list_all:
-                    version_data['content'] = ver_info['content']
-                versions.append(version_data)
+                    for version_data in versions:
+                        version_data['content'] = store.read_text(version_key, version_data['name'])
+                
+                return {
+                    'file_path': full_path,
+                    'action': 'list',
+                    'result': f"{len(versions)} versions found",
+                    'versions': versions
+                }
             
-            versions.sort(key=lambda x: x['timestamp'], reverse=True)  # Sort by timestamp (newest first)
+            elif action == "compare":
+                versions = store.list_versions(version_key)
+                if not from_version or not to_version:
+                    # Need to have at least two versions to compare
+                    if len(versions) < 2:
+                        error_msg = f"Need at least two versions to compare. Only {len(versions)} versions available."
+                        logging.warning(error_msg)
+                        return {"error": error_msg}
+                    # Default to the two most recent versions
+                    to_version = to_version or versions[0]['name']
+                    from_version = from_version or next(v['name'] for v in versions if v['name'] != to_version)
+                
+                available_versions = [v['name'] for v in versions]
+                for name in (from_version, to_version):
+                    if name not in available_versions:
+                        error_msg = f"Version '{name}' not found. Available versions: {available_versions}"
+                        logging.warning(error_msg)
+                        return {"error": error_msg}
+                
+                from_record = store.get_version(version_key, from_version)
+                to_record = store.get_version(version_key, to_version)
+                if from_record['sha256'] == to_record['sha256']:
+                    diff = []
+                else:
+                    # Compare the contents
+                    import difflib
+                    diff = list(difflib.unified_diff(
+                        store.read_text(version_key, from_version).splitlines(),
+                        store.read_text(version_key, to_version).splitlines(),
+                        fromfile=f"Version: {from_version}",
+                        tofile=f"Version: {to_version}",
+                        lineterm=''
+                    ))
+                
+                return {
+                    'file_path': full_path,
+                    'action': 'compare',
+                    'result': f"Compared versions '{from_version}' and '{to_version}'",
+                    'diff': diff,
+                    'from_version': from_version,
+                    'to_version': to_version
+                }
             
-            return {
-                'file_path': full_path,
-                'action': 'list',
-                'result': f"{len(versions)} versions found",
-                'versions': versions
-            }
-        
-        elif action == "compare":
-            # Need to have at least two versions to compare
-            if len(_file_versions[full_path]) < 2:
-                error_msg = f"Need at least two versions to compare. Only {len(_file_versions[full_path])} versions available."
+            else:
+                error_msg = f"Invalid action: {action}. Must be one of: 'save', 'restore', 'list', 'compare'"
                 logging.warning(error_msg)
                 return {"error": error_msg}
-            
-            # Get the two most recent versions
-            versions = sorted(_file_versions[full_path].items(), 
-                             key=lambda x: x[1]['timestamp'], reverse=True)
-            
-            latest_version = versions[0]
-            previous_version = versions[1]
-            
-            # Compare the contents
-            import difflib
-            diff = list(difflib.unified_diff(
-                previous_version[1]['content'].splitlines(),
-                latest_version[1]['content'].splitlines(),
-                fromfile=f"Version: {previous_version[0]}",
-                tofile=f"Version: {latest_version[0]}",
-                lineterm=''
-            ))
-            
-            return {
-                'file_path': full_path,
-                'action': 'compare',
-                'result': f"Compared versions '{previous_version[0]}' and '{latest_version[0]}'",
-                'diff': diff,
-                'from_version': previous_version[0],
-                'to_version': latest_version[0]
-            }
-        
-        else:
-            error_msg = f"Invalid action: {action}. Must be one of: 'save', 'restore', 'list', 'compare'"
-            logging.warning(error_msg)
-            return {"error": error_msg}
         
     except Exception as e:
         error_msg = f"Error in file versioning: {str(e)}"
         logging.error(error_msg)
         return {"error": error_msg}
 
-# File change detection - tracking files and their last modification times
-_tracked_files = {}
-
-def detect_file_changes(directory_path: str, action: str = "scan", pattern: str = "*", use_regex: bool = False, recursive: bool = True, max_depth: Optional[int] = None, use_data_dir: bool = True) -> Dict[str, Any]:
+def detect_file_changes(directory_path: str, action: str = "scan", pattern: str = "*", use_regex: bool = False, recursive: bool = True, max_depth: Optional[int] = None, verify_content: bool = False, trust_directory_mtime: bool = False, use_data_dir: bool = True) -> Dict[str, Any]:
     """
     Identifies files that have changed since a previous scan.
     
+    Snapshots are persisted on disk, so they survive restarts and are shared between
+    workers. Directories whose modification time did not change since the previous
+    scan are not listed again.
+    
     Args:
         directory_path: Path to the directory to monitor. If use_data_dir is True, this should be a 
             relative path within the project data directory.
@@ -1157,6 +1488,12 @@ def detect_file_changes(directory_path: str, action: str = "scan", pattern: str
         use_regex: If True, treat pattern as a regular expression. If False (default), treat as a glob pattern.
         recursive: If True (default), scan subdirectories recursively.
         max_depth: Maximum recursion depth for recursive scans. None (default) means no limit.
+        verify_content: If True, content hashes are recorded, and files whose modification time
+            changed but whose content is identical are reported as 'touched_files' instead of
+            'changed_files'.
+        trust_directory_mtime: If True, 'check' also skips stat'ing the files of directories whose
+            modification time is unchanged. This makes re-checks of static trees almost free, but
+            only detects added, deleted and renamed files in such directories, not in-place edits.
         use_data_dir: If True (default), prepend the project data directory to the directory_path.
             If False, use the directory_path as provided.
     
@@ -1168,78 +1505,42 @@ def detect_file_changes(directory_path: str, action: str = "scan", pattern: str
         - 'changed_files': List of files that have changed since the last scan (for 'check' action)
         - 'new_files': List of new files found (for 'check' action)
         - 'deleted_files': List of files that have been deleted (for 'check' action)
+        - 'touched_files': Files with a new modification time but unchanged content (for 'check'
+          action with verify_content)
+        - 'scan_stats': Number of directories listed/reused and files checked
     """
     try:
-        global _tracked_files
-        
         # Get the full path based on use_data_dir setting
         if use_data_dir:
             full_path = os.path.join(PROJECT_DATA_DIRECTORY, directory_path)
         else:
             full_path = directory_path
         
+        valid_actions = ['scan', 'check', 'reset']
+        if action not in valid_actions:
+            error_msg = f"Invalid action: {action}. Must be one of: 'scan', 'check', 'reset'"
+            logging.warning(error_msg)
+            return {"error": error_msg}
+        
         # Check if the directory exists
         if not os.path.isdir(full_path):
             error_msg = f"Directory not found: {full_path}"
             logging.warning(error_msg)
             return {"error": error_msg}
         
-        # Function to collect files and their modification times
-        def collect_files():
-            collected_files = {}
-            
-            # Prepare regex pattern if using regex
-            if use_regex:
-                regex_pattern = re.compile(pattern)
-            
-            # Function to check if a file matches the pattern
-            def file_matches(filepath):
-                filename = os.path.basename(filepath)
-                if use_regex:
-                    return bool(regex_pattern.search(filename))
-                else:
-                    # Use glob-style matching
-                    import fnmatch
-                    return fnmatch.fnmatch(filename, pattern)
-            
-            # Walk through the directory
-            if recursive:
-                for root, _, files in os.walk(full_path):
-                    # Check depth limit
-                    if max_depth is not None:
-                        relative_root = os.path.relpath(root, full_path)
-                        current_depth = 0 if relative_root == '.' else relative_root.count(os.sep) + 1
-                        if current_depth > max_depth:
-                            continue
-                    
-                    for file in files:
-                        file_path = os.path.join(root, file)
-                        if file_matches(file_path):
-                            collected_files[file_path] = os.path.getmtime(file_path)
-            else:
-                # Non-recursive, just check the current directory
-                for item in os.listdir(full_path):
-                    item_path = os.path.join(full_path, item)
-                    if os.path.isfile(item_path) and file_matches(item_path):
-                        collected_files[item_path] = os.path.getmtime(item_path)
-            
-            return collected_files
-        
-        # Perform the requested action
-        if action == "scan":
-            # Scan and record the current state
-            _tracked_files[full_path] = collect_files()
+        snapshot_key = os.path.abspath(full_path)
+        with SnapshotStore(os.path.join(FILE_HANDLER_STATE_DIRECTORY, "snapshots.sqlite")) as store:
+            if action == "reset":
+                # Reset tracking for this directory
+                store.delete(snapshot_key)
+                return {
+                    'directory': full_path,
+                    'action': 'reset',
+                    'result': f"Tracking reset for directory: {full_path}"
+                }
             
-            return {
-                'directory': full_path,
-                'action': 'scan',
-                'files_tracked': len(_tracked_files[full_path]),
-                'tracked_files': list(_tracked_files[full_path].keys())
-            }
-        
-        elif action == "check":
-            # First check if we have a previous scan
-            if full_path not in _tracked_files:
+            previous = store.load(snapshot_key)
+            if action == "check" and previous is None:
                 return {
                     'directory': full_path,
                     'action': 'check',
@@ -1247,50 +1548,74 @@ def detect_file_changes(directory_path: str, action: str = "scan", pattern: str
                     'files_tracked': 0
                 }
             
-            # Get current files
-            current_files = collect_files()
+            settings = scan_settings(pattern, use_regex, recursive, max_depth)
+            current, scan_stats = scan_tree(
+                full_path,
+                settings,
+                compile_name_filter(pattern, use_regex),
+                max_depth=0 if not recursive else max_depth,
+                previous=previous,
+                trust_directory_mtime=trust_directory_mtime and action == "check"
+            )
+            previous_files = previous.files if previous is not None else {}
             
-            # Find changed files
             changed_files = []
-            for file_path, mod_time in current_files.items():
-                if file_path in _tracked_files[full_path]:
-                    if mod_time > _tracked_files[full_path][file_path]:
+            new_files = []
+            touched_files = []
+            for path, state in list(current.files.items()):
+                file_path = os.path.join(full_path, path)
+                previous_state = previous_files.get(path)
+                unchanged = previous_state is not None and state[:3] == previous_state[:3]
+                # Unchanged files keep their known content hash
+                content_hash = previous_state[3] if unchanged else None
+                if verify_content and content_hash is None:
+                    try:
+                        content_hash = file_digest(file_path)
+                    except FileNotFoundError:
+                        # Deleted since the scan stat'ed it
+                        del current.files[path]
+                        continue
+                    except OSError as e:
+                        logging.warning(f"Could not hash file {file_path}: {e}")
+                
+                if previous_state is None:
+                    if action == "check":
+                        new_files.append(file_path)
+                elif not unchanged:
+                    if content_hash is not None and content_hash == previous_state[3]:
+                        touched_files.append(file_path)
+                    else:
                         changed_files.append(file_path)
+                current.files[path] = state[:3] + (content_hash,)
             
-            # Find new files
-            new_files = [f for f in current_files if f not in _tracked_files[full_path]]
-            
-            # Find deleted files
-            deleted_files = [f for f in _tracked_files[full_path] if f not in current_files]
-            
-            # Update the tracked files
-            _tracked_files[full_path] = current_files
-            
-            return {
-                'directory': full_path,
-                'action': 'check',
-                'files_tracked': len(current_files),
-                'changed_files': changed_files,
-                'new_files': new_files,
-                'deleted_files': deleted_files,
-                'total_changes': len(changed_files) + len(new_files) + len(deleted_files)
-            }
+            # A scan with different settings replaces the snapshot; otherwise only differences are written
+            store.save(snapshot_key, current, previous if previous is not None and previous.settings == settings else None)
         
-        elif action == "reset":
-            # Reset tracking for this directory
-            if full_path in _tracked_files:
-                del _tracked_files[full_path]
-            
+        if action == "scan":
             return {
                 'directory': full_path,
-                'action': 'reset',
-                'result': f"Tracking reset for directory: {full_path}"
+                'action': 'scan',
+                'files_tracked': len(current.files),
+                'tracked_files': [os.path.join(full_path, path) for path in current.files],
+                'scan_stats': scan_stats
             }
         
-        else:
-            error_msg = f"Invalid action: {action}. Must be one of: 'scan', 'check', 'reset'"
-            logging.warning(error_msg)
-            return {"error": error_msg}
+        # Find deleted files
+        deleted_files = [os.path.join(full_path, path) for path in previous_files if path not in current.files]
+        
+        result = {
+            'directory': full_path,
+            'action': 'check',
+            'files_tracked': len(current.files),
+            'changed_files': changed_files,
+            'new_files': new_files,
+            'deleted_files': deleted_files,
+            'total_changes': len(changed_files) + len(new_files) + len(deleted_files),
+            'scan_stats': scan_stats
+        }
+        if verify_content:
+            result['touched_files'] = touched_files
+        return result
         
     except Exception as e:
         error_msg = f"Error detecting file changes: {str(e)}"
@@ -1302,9 +1627,9 @@ _active_observers = {}
 
 # Custom file system event handler class
 class CustomFileSystemEventHandler(FileSystemEventHandler):
-    def __init__(self, callback_fn):
+    def __init__(self, callback_fn, journal: Optional[EventJournal] = None):
         self.callback_fn = callback_fn
-        self.events = []
+        self.journal = journal if journal is not None else EventJournal()
         
     def on_any_event(self, event):
         if event.is_directory:
@@ -1321,20 +1646,31 @@ class CustomFileSystemEventHandler(FileSystemEventHandler):
         if hasattr(event, 'dest_path'):
             event_info['dest_path'] = event.dest_path
         
-        self.events.append(event_info)
+        self.journal.add(event_info)
         if self.callback_fn:
             self.callback_fn(event_info)
 
-def watch_directory(directory_path: str, action: str = "start", observer_id: Optional[str] = None, use_data_dir: bool = True) -> Dict[str, Any]:
+def watch_directory(directory_path: str, action: str = "start", observer_id: Optional[str] = None, since_seq: int = 0, max_events: Optional[int] = None, debounce_seconds: float = DEFAULT_DEBOUNCE_SECONDS, persist_journal: bool = False, use_data_dir: bool = True) -> Dict[str, Any]:
     """
     Monitors a directory for changes and file system events.
     
+    Events are numbered with increasing sequence numbers ('seq'). Pass the 'last_seq' of a
+    previous 'events' response as since_seq to receive only the events that happened since.
+    
     Args:
         directory_path: Path to the directory to monitor. If use_data_dir is True, this should be a 
             relative path within the project data directory.
         action: Action to perform. Must be one of: 'start' (default), 'stop', 'events', 'list'.
         observer_id: ID for the observer. Required for 'stop' and 'events' actions.
             If not provided for 'start', a unique ID will be generated.
+        since_seq: For 'events' and 'stop', only return events with a greater sequence number.
+            Default is 0 (all retained events).
+        max_events: For 'start', the number of events kept in memory (default: 10000). Older events
+            are dropped. For 'events' and 'stop', the maximum number of events to return.
+        debounce_seconds: For 'start', repeated create/modify events for the same file within this
+            many seconds are collapsed into one event (default: 0.2). 0 disables debouncing.
+        persist_journal: For 'start', if True, all events are also appended to an on-disk journal,
+            from which events dropped from memory can still be fetched.
         use_data_dir: If True (default), prepend the project data directory to the directory_path.
             If False, use the directory_path as provided.
     
@@ -1343,7 +1679,9 @@ def watch_directory(directory_path: str, action: str = "start", observer_id: Opt
         - 'directory': The directory being monitored
         - 'action': The action performed
         - 'observer_id': The ID of the observer (for 'start' action)
-        - 'events': List of file system events detected (for 'events' action)
+        - 'events': List of file system events detected (for 'events' and 'stop' actions)
+        - 'last_seq': Sequence number to pass as since_seq in the next 'events' call
+        - 'missed_events': Number of requested events that were dropped from memory
         - 'observers': List of active observers (for 'list' action)
     """
     try:
@@ -1359,11 +1697,14 @@ def watch_directory(directory_path: str, action: str = "start", observer_id: Opt
         if action == "list":
             observers = []
             for obs_id, obs_info in _active_observers.items():
+                journal = obs_info['handler'].journal
                 observers.append({
                     'id': obs_id,
                     'directory': obs_info['directory'],
                     'started_at': obs_info['started_at'],
-                    'event_count': len(obs_info['handler'].events)
+                    'event_count': journal.last_seq,
+                    'latest_seq': journal.last_seq,
+                    'journal_path': journal.journal_path
                 })
             
             return {
@@ -1390,8 +1731,17 @@ def watch_directory(directory_path: str, action: str = "start", observer_id: Opt
                 logging.warning(error_msg)
                 return {"error": error_msg}
             
+            journal_path = None
+            if persist_journal:
+                journal_path = os.path.join(FILE_HANDLER_STATE_DIRECTORY, "watch_journals", f"{observer_id}.jsonl")
+            journal = EventJournal(
+                max_events=max_events or DEFAULT_MAX_EVENTS,
+                debounce_seconds=debounce_seconds,
+                journal_path=journal_path
+            )
+            
             # Create and start the observer
-            event_handler = CustomFileSystemEventHandler(None)  # No callback for now
+            event_handler = CustomFileSystemEventHandler(None, journal)  # No callback for now
             observer = Observer()
             observer.schedule(event_handler, full_path, recursive=True)
             observer.start()
@@ -1404,12 +1754,15 @@ def watch_directory(directory_path: str, action: str = "start", observer_id: Opt
                 'started_at': datetime.now().isoformat()
             }
             
-            return {
+            result = {
                 'directory': full_path,
                 'action': 'start',
                 'observer_id': observer_id,
                 'result': f"Observer started for directory: {full_path}"
             }
+            if journal_path:
+                result['journal_path'] = journal_path
+            return result
         
         elif action == "stop":
             # Check if the observer exists
@@ -1423,8 +1776,11 @@ def watch_directory(directory_path: str, action: str = "start", observer_id: Opt
             observer_info['observer'].stop()
             observer_info['observer'].join()  # Wait for the thread to finish
             
-            # Collect the events
-            events = observer_info['handler'].events
+            # Commit debounced events and collect everything after since_seq
+            journal = observer_info['handler'].journal
+            journal.commit_pending()
+            delta = journal.events_since(since_seq, max_events)
+            journal.close()
             
             # Remove the observer
             del _active_observers[observer_id]
@@ -1434,8 +1790,10 @@ def watch_directory(directory_path: str, action: str = "start", observer_id: Opt
                 'action': 'stop',
                 'observer_id': observer_id,
                 'result': f"Observer stopped for directory: {observer_info['directory']}",
-                'events': events,
-                'event_count': len(events)
+                'events': delta['events'],
+                'event_count': len(delta['events']),
+                'last_seq': delta['last_seq'],
+                'missed_events': delta['missed_events']
             }
         
         elif action == "events":
@@ -1445,15 +1803,18 @@ def watch_directory(directory_path: str, action: str = "start", observer_id: Opt
                 logging.warning(error_msg)
                 return {"error": error_msg}
             
-            # Get the events without stopping the observer
-            events = _active_observers[observer_id]['handler'].events
+            # Get the new events without stopping the observer
+            delta = _active_observers[observer_id]['handler'].journal.events_since(since_seq, max_events)
             
             return {
                 'directory': _active_observers[observer_id]['directory'],
                 'action': 'events',
                 'observer_id': observer_id,
-                'events': events,
-                'event_count': len(events)
+                'events': delta['events'],
+                'event_count': len(delta['events']),
+                'last_seq': delta['last_seq'],
+                'latest_seq': delta['latest_seq'],
+                'missed_events': delta['missed_events']
             }
         
         else:
@@ -1510,6 +1871,7 @@ def search_file_content(file_path: str, search_text: str, use_regex: bool = Fals
         pattern = re.compile(search_text, flags)
         
         # Search the file content
+        _flush_appends(full_path)
         matched_lines = []
         matches_found = 0
         
@@ -1536,42 +1898,205 @@ def search_file_content(file_path: str, search_text: str, use_regex: bool = Fals
         logging.error(error_msg)
         return {"error": error_msg}
 
-def set_working_directory(new_directory: str) -> Dict[str, Any]:
+def search_directory_content(directory_path: str, search_text: str, use_regex: bool = False, case_sensitive: bool = True, file_pattern: str = "*", max_results: int = 1000, use_data_dir: bool = True) -> Dict[str, Any]:
     """
-    Sets the working directory for file operations. This changes the base directory used when use_data_dir=True.
+    Searches the content of all files below a directory for specific text or patterns.
+    
+    A persistent trigram index of the directory is built on first use and updated
+    from file size/modification time changes afterwards, so only files that can
+    contain the searched text are opened and checked line by line.
     
     Args:
-        new_directory: The new directory path to use as the working directory. This should be an absolute path.
-            If the path doesn't exist, it will be created.
+        directory_path: Path to the directory to search. If use_data_dir is True, this should be a 
+            relative path within the project data directory.
+        search_text: The text or pattern to search for in the files.
+        use_regex: If True, treat search_text as a regular expression. If False (default),
+            treat it as a plain text pattern.
+        case_sensitive: If True (default), perform case-sensitive search. If False, 
+            perform case-insensitive search.
+        file_pattern: Glob pattern that file names must match (default: "*").
+        max_results: Maximum number of matching lines to return (default: 1000).
+        use_data_dir: If True (default), prepend the project data directory to the directory_path.
+            If False, use the directory_path as provided.
     
     Returns:
-        A dictionary with the status and the updated working directory path.
+        A dictionary containing:
+        - 'directory': The full path to the searched directory
+        - 'files_indexed': Number of files known to the index
+        - 'files_searched': Number of candidate files that were checked line by line
+        - 'matches_found': Number of matching lines returned
+        - 'matched_lines': A list of dictionaries, each containing 'file_path', 'line_number',
+          'line_content' and 'match_position'
+        - 'truncated': True if the search stopped at max_results
     """
     try:
-        global PROJECT_DATA_DIRECTORY
-        
-        # Create the directory if it doesn't exist
-        if not os.path.exists(new_directory):
-            os.makedirs(new_directory, exist_ok=True)
-            status_message = f"Created new working directory: {new_directory}"
+        # Get the full path based on use_data_dir setting
+        if use_data_dir:
+            full_path = os.path.join(PROJECT_DATA_DIRECTORY, directory_path)
         else:
-            # Verify it's a directory
-            if not os.path.isdir(new_directory):
-                return {
-                    "status": "error",
-                    "message": f"The path {new_directory} exists but is not a directory"
-                }
-            status_message = f"Using existing directory: {new_directory}"
+            full_path = directory_path
         
-        # Update the project data directory
-        old_directory = PROJECT_DATA_DIRECTORY
-        PROJECT_DATA_DIRECTORY = new_directory
+        # Check if the directory exists
+        if not os.path.isdir(full_path):
+            error_msg = f"Directory not found: {full_path}"
+            logging.warning(error_msg)
+            return {"error": error_msg}
         
-        return {
-            "status": "success",
-            "message": status_message,
-            "old_working_directory": old_directory,
-            "new_working_directory": PROJECT_DATA_DIRECTORY
+        # Literal substrings every match must contain, used to prune candidate files
+        literals = required_literals(search_text) if use_regex else [search_text]
+        
+        # Compile the pattern up front so that invalid regexes fail before indexing
+        matcher = LineMatcher(search_text, use_regex=use_regex, case_sensitive=case_sensitive)
+        
+        # Bring the index up to date and collect the candidate files
+        _flush_appends_below(full_path)
+        index_path = index_path_for(full_path, FILE_HANDLER_STATE_DIRECTORY)
+        with TrigramIndex(full_path, index_path, exclude_dirs=[FILE_HANDLER_STATE_DIRECTORY]) as index:
+            index_stats = index.refresh()
+            files_indexed = index.file_count()
+            candidates = index.candidates(literals)
+        
+        name_matches = compile_name_filter(file_pattern)
+        candidates = sorted(f for f in candidates if name_matches(os.path.basename(f)))
+        
+        # Verify the candidates line by line on the parallel grep engine; matches come
+        # in (file path, line number) order, so a truncated result is always the same
+        matched_lines = []
+        truncated = False
+        for match in iter_matches(candidates, matcher, max_matches_per_file=max_results):
+            matched_lines.append(match)
+            if len(matched_lines) >= max_results:
+                truncated = True
+                break
+        
+        return {
+            'directory': full_path,
+            'search_text': search_text,
+            'files_indexed': files_indexed,
+            'files_searched': len(candidates),
+            'index_updates': index_stats,
+            'matches_found': len(matched_lines),
+            'matched_lines': matched_lines,
+            'truncated': truncated
+        }
+        
+    except Exception as e:
+        error_msg = f"Error searching directory {directory_path}: {str(e)}"
+        logging.error(error_msg)
+        return {"error": error_msg}
+
+def grep_directory(directory_path: str, search_text: str, use_regex: bool = False, case_sensitive: bool = True, file_pattern: str = "*", recursive: bool = True, max_results: int = 1000, max_workers: Optional[int] = None, use_data_dir: bool = True) -> Dict[str, Any]:
+    """
+    Searches all files in a directory for specific text or patterns using a pool of workers.
+    
+    Files are scanned in parallel through memory maps and the search stops as soon as
+    the first max_results matching lines (in file path order) were found. Unlike
+    search_directory_content, no index is built, which makes this the better choice
+    for one-off searches or directories whose content changes constantly.
+    
+    Args:
+        directory_path: Path to the directory to search. If use_data_dir is True, this should be a 
+            relative path within the project data directory.
+        search_text: The text or pattern to search for in the files.
+        use_regex: If True, treat search_text as a regular expression. If False (default),
+            treat it as a plain text pattern.
+        case_sensitive: If True (default), perform case-sensitive search. If False, 
+            perform case-insensitive search.
+        file_pattern: Glob pattern that file names must match (default: "*").
+        recursive: If True (default), search files in subdirectories as well.
+        max_results: Maximum number of matching lines to return (default: 1000).
+        max_workers: Number of worker threads. None (default) picks a value based on the CPU count.
+        use_data_dir: If True (default), prepend the project data directory to the directory_path.
+            If False, use the directory_path as provided.
+    
+    Returns:
+        A dictionary containing:
+        - 'directory': The full path to the searched directory
+        - 'files_searched': Number of files matching file_pattern
+        - 'matches_found': Number of matching lines returned
+        - 'matched_lines': A list of dictionaries, each containing 'file_path', 'line_number',
+          'line_content' and 'match_position'
+        - 'truncated': True if the search stopped early at max_results
+    """
+    try:
+        # Get the full path based on use_data_dir setting
+        if use_data_dir:
+            full_path = os.path.join(PROJECT_DATA_DIRECTORY, directory_path)
+        else:
+            full_path = directory_path
+        
+        # Check if the directory exists
+        if not os.path.isdir(full_path):
+            error_msg = f"Directory not found: {full_path}"
+            logging.warning(error_msg)
+            return {"error": error_msg}
+        
+        matcher = LineMatcher(search_text, use_regex=use_regex, case_sensitive=case_sensitive)
+        
+        # Collect the files to search
+        _flush_appends_below(full_path)
+        files_to_search = sorted(entry.path for entry in walk(full_path, pattern=file_pattern, recursive=recursive))
+        
+        # Stream matches from the worker pool until enough were found; they come in
+        # (file path, line number) order, so a truncated result is always the same
+        matched_lines = []
+        truncated = False
+        for match in iter_matches(files_to_search, matcher, max_workers=max_workers, max_matches_per_file=max_results):
+            matched_lines.append(match)
+            if len(matched_lines) >= max_results:
+                truncated = True
+                break
+        
+        return {
+            'directory': full_path,
+            'search_text': search_text,
+            'files_searched': len(files_to_search),
+            'matches_found': len(matched_lines),
+            'matched_lines': matched_lines,
+            'truncated': truncated
+        }
+        
+    except Exception as e:
+        error_msg = f"Error searching directory {directory_path}: {str(e)}"
+        logging.error(error_msg)
+        return {"error": error_msg}
+
+def set_working_directory(new_directory: str) -> Dict[str, Any]:
+    """
+    Sets the working directory for file operations. This changes the base directory used when use_data_dir=True.
+    
+    Args:
+        new_directory: The new directory path to use as the working directory. This should be an absolute path.
+            If the path doesn't exist, it will be created.
+    
+    Returns:
+        A dictionary with the status and the updated working directory path.
+    """
+    try:
+        global PROJECT_DATA_DIRECTORY
+        
+        # Create the directory if it doesn't exist
+        if not os.path.exists(new_directory):
+            os.makedirs(new_directory, exist_ok=True)
+            status_message = f"Created new working directory: {new_directory}"
+        else:
+            # Verify it's a directory
+            if not os.path.isdir(new_directory):
+                return {
+                    "status": "error",
+                    "message": f"The path {new_directory} exists but is not a directory"
+                }
+            status_message = f"Using existing directory: {new_directory}"
+        
+        # Update the project data directory
+        old_directory = PROJECT_DATA_DIRECTORY
+        PROJECT_DATA_DIRECTORY = new_directory
+        
+        return {
+            "status": "success",
+            "message": status_message,
+            "old_working_directory": old_directory,
+            "new_working_directory": PROJECT_DATA_DIRECTORY
         }
     except Exception as e:
         error_msg = f"Error setting working directory to {new_directory}: {str(e)}"
@@ -1581,16 +2106,41 @@ def set_working_directory(new_directory: str) -> Dict[str, Any]:
             "message": error_msg
         }
 
-def zip_files(source_paths: List[str], output_zip_path: str, compression_level: int = 9, use_data_dir: bool = True) -> Dict[str, Any]:
+def _collect_archive_members(sources: List[str], include_dirs: bool = False) -> List[Tuple[str, str]]:
+    """Returns (path, name in the archive) pairs for the given files and directories.
+    
+    Files are stored under their base name, directory contents relative to the
+    directory's parent (so 'data/reports' is archived as 'reports/...').
+    """
+    members = []
+    for source in sources:
+        if os.path.isfile(source):
+            members.append((source, os.path.basename(source)))
+        elif os.path.isdir(source):
+            base_path = os.path.dirname(source)
+            if include_dirs:
+                members.append((source, os.path.relpath(source, base_path)))
+            for entry in walk(source, include_dirs=include_dirs):
+                # Calculate relative path within the archive
+                arcname = os.path.relpath(entry.path, base_path)
+                members.append((entry.path, arcname))
+    return members
+
+def zip_files(source_paths: List[str], output_zip_path: str, compression_level: int = 9, max_workers: Optional[int] = None, use_data_dir: bool = True) -> Dict[str, Any]:
     """
     Compresses files or directories into a ZIP archive.
     
+    Members are compressed in parallel and written in order. Files that are already
+    compressed (images, archives, media, ...) are stored without recompressing them.
+    
     Args:
         source_paths: List of paths to files/directories to include in the ZIP archive.
             If use_data_dir is True, these should be relative paths within the project data directory.
         output_zip_path: Path for the output ZIP file. If use_data_dir is True, this should be a
             relative path within the project data directory.
         compression_level: Compression level (0-9, where 9 is highest compression). Default is 9.
+        max_workers: Number of files compressed in parallel. None uses one worker per CPU core;
+            1 compresses serially.
         use_data_dir: If True (default), prepend the project data directory to all paths.
             If False, use the paths as provided.
     
@@ -1601,6 +2151,10 @@ def zip_files(source_paths: List[str], output_zip_path: str, compression_level:
         - 'total_files': Number of files added
         - 'total_size': Size of the ZIP file in bytes
         - 'compressed_size': Size of the compressed data in bytes
+        - 'uncompressed_size': Total size of the added files in bytes
+        - 'stored_files': Number of already-compressed files stored without recompression
+        - 'elapsed_seconds': Time taken to write the archive
+        - 'throughput_mb_per_s': Uncompressed megabytes archived per second
     """
     try:
         # Get the full paths based on use_data_dir setting
@@ -1629,39 +2183,25 @@ def zip_files(source_paths: List[str], output_zip_path: str, compression_level:
             return {"error": error_msg}
         
         # Collect all files to add to the ZIP
-        files_to_add = []
-        for source in valid_sources:
-            if os.path.isfile(source):
-                files_to_add.append((source, os.path.basename(source)))
-            elif os.path.isdir(source):
-                base_path = os.path.dirname(source)
-                for root, _, files in os.walk(source):
-                    for file in files:
-                        file_path = os.path.join(root, file)
-                        # Calculate relative path within the ZIP file
-                        arcname = os.path.relpath(file_path, base_path)
-                        files_to_add.append((file_path, arcname))
-        
-        # Create the ZIP file
-        with zipfile.ZipFile(full_output_path, 'w', zipfile.ZIP_DEFLATED, compresslevel=compression_level) as zipf:
-            for file_path, arcname in files_to_add:
-                zipf.write(file_path, arcname)
-        
-        # Get stats about the created ZIP file
-        zip_size = os.path.getsize(full_output_path)
-        
-        # Get compressed size
-        compressed_size = 0
-        with zipfile.ZipFile(full_output_path, 'r') as zipf:
-            for info in zipf.infolist():
-                compressed_size += info.compress_size
+        for path in valid_sources:
+            _flush_appends_below(path)
+        files_to_add = _collect_archive_members(valid_sources)
+        
+        # Create the ZIP file, collecting the statistics while writing
+        start_time = time.perf_counter()
+        zip_stats = write_zip(full_output_path, files_to_add, compression_level, max_workers)
+        elapsed = time.perf_counter() - start_time
         
         return {
             'zip_path': full_output_path,
             'files_added': [f[1] for f in files_to_add],  # List of arcnames
             'total_files': len(files_to_add),
-            'total_size': zip_size,
-            'compressed_size': compressed_size,
+            'total_size': os.path.getsize(full_output_path),
+            'compressed_size': zip_stats['compressed_size'],
+            'uncompressed_size': zip_stats['uncompressed_size'],
+            'stored_files': zip_stats['stored_files'],
+            'elapsed_seconds': round(elapsed, 3),
+            'throughput_mb_per_s': round(zip_stats['uncompressed_size'] / (1024 * 1024) / elapsed, 2) if elapsed > 0 else None,
             'invalid_sources': invalid_sources if invalid_sources else None
         }
         
@@ -1670,16 +2210,23 @@ def zip_files(source_paths: List[str], output_zip_path: str, compression_level:
         logging.error(error_msg)
         return {"error": error_msg}
 
-def extract_zip(zip_path: str, output_dir: Optional[str] = None, specific_files: Optional[List[str]] = None, use_data_dir: bool = True) -> Dict[str, Any]:
+def extract_zip(zip_path: str, output_dir: Optional[str] = None, specific_files: Optional[List[str]] = None, patterns: Optional[List[str]] = None, dry_run: bool = False, max_workers: Optional[int] = None, use_data_dir: bool = True) -> Dict[str, Any]:
     """
     Extracts files from a ZIP archive.
     
+    Members are streamed to disk and extracted in parallel.
+    
     Args:
         zip_path: Path to the ZIP file to extract. If use_data_dir is True, this should be a 
             relative path within the project data directory.
         output_dir: Directory to extract files to. If None, extracts to the same directory as the ZIP file.
             If use_data_dir is True, this should be a relative path within the project data directory.
         specific_files: List of specific files to extract. If None, extracts all files.
+        patterns: Glob patterns selecting the members to extract, e.g. ['*.csv', 'images/*'].
+            Patterns without '/' match the file name in any directory. Combined with
+            specific_files, members matching either are extracted.
+        dry_run: If True, only report which members would be extracted and their sizes.
+        max_workers: Number of files extracted in parallel. None uses one worker per CPU core.
         use_data_dir: If True (default), prepend the project data directory to the paths.
             If False, use the paths as provided.
     
@@ -1687,8 +2234,11 @@ def extract_zip(zip_path: str, output_dir: Optional[str] = None, specific_files:
         A dictionary containing:
         - 'zip_path': Full path to the ZIP file
         - 'output_dir': Full path to the output directory
-        - 'files_extracted': List of files extracted
+        - 'files_extracted': List of files extracted (for dry runs, the files that would be extracted)
         - 'total_files': Number of files extracted
+        - 'total_size': Uncompressed size of the extracted files in bytes
+        - 'compressed_size': Compressed size of the extracted files in bytes (dry runs only)
+        - 'files': Name and size of every selected member (dry runs only)
     """
     try:
         # Get the full paths based on use_data_dir setting
@@ -1705,35 +2255,62 @@ def extract_zip(zip_path: str, output_dir: Optional[str] = None, specific_files:
             logging.warning(error_msg)
             return {"error": error_msg}
         
-        # Create output directory if it doesn't exist
-        os.makedirs(full_output_dir, exist_ok=True)
-        
-        # Extract files
-        files_extracted = []
         with zipfile.ZipFile(full_zip_path, 'r') as zipf:
-            # Get list of files to extract
-            all_files = zipf.namelist()
-            to_extract = specific_files if specific_files else all_files
+            # Index the members by name for constant-time lookups
+            members_by_name = {info.filename: info for info in zipf.infolist()}
             
-            # Validate files to extract
-            invalid_files = [f for f in to_extract if f not in all_files] if specific_files else []
-            valid_files = [f for f in to_extract if f in all_files] if specific_files else all_files
+            # Select the members to extract
+            invalid_files = []
+            if specific_files or patterns:
+                selected = set()
+                for name in specific_files or []:
+                    if name in members_by_name:
+                        selected.add(name)
+                    else:
+                        invalid_files.append(name)
+                if patterns:
+                    matches_pattern = compile_member_filter(patterns)
+                    selected.update(name for name in members_by_name if matches_pattern(name))
+                members = [info for name, info in members_by_name.items() if name in selected]
+            else:
+                members = list(members_by_name.values())
             
-            if not valid_files:
+            if not members:
                 error_msg = f"No valid files to extract. Invalid files: {invalid_files}"
                 logging.warning(error_msg)
                 return {"error": error_msg}
             
+            files_extracted = [info.filename for info in members]
+            total_size = sum(info.file_size for info in members)
+            
+            if dry_run:
+                return {
+                    'zip_path': full_zip_path,
+                    'output_dir': full_output_dir,
+                    'dry_run': True,
+                    'files_extracted': files_extracted,
+                    'files': [{'name': info.filename, 'size': info.file_size, 'compressed_size': info.compress_size} for info in members],
+                    'total_files': len(members),
+                    'total_size': total_size,
+                    'compressed_size': sum(info.compress_size for info in members),
+                    'invalid_files': invalid_files if invalid_files else None
+                }
+            
+            # Create output directory if it doesn't exist
+            os.makedirs(full_output_dir, exist_ok=True)
+            
             # Extract files
-            for file in valid_files:
-                zipf.extract(file, full_output_dir)
-                files_extracted.append(file)
+            start_time = time.perf_counter()
+            extract_zip_members(zipf, members, full_output_dir, max_workers)
+            elapsed = time.perf_counter() - start_time
         
         return {
             'zip_path': full_zip_path,
             'output_dir': full_output_dir,
             'files_extracted': files_extracted,
             'total_files': len(files_extracted),
+            'total_size': total_size,
+            'elapsed_seconds': round(elapsed, 3),
             'invalid_files': invalid_files if invalid_files else None
         }
         
@@ -1742,10 +2319,428 @@ def extract_zip(zip_path: str, output_dir: Optional[str] = None, specific_files:
         logging.error(error_msg)
         return {"error": error_msg}
 
-def batch_process_files(directory_path: str, operation: str, pattern: str = "*", recursive: bool = True, use_regex: bool = False, max_files: Optional[int] = None, dry_run: bool = True, operation_args: Optional[Dict[str, Any]] = None, use_data_dir: bool = True) -> Dict[str, Any]:
+def archive_create(source_paths: List[str], output_path: str, archive_format: Optional[str] = None, compression_level: Optional[int] = None, max_workers: Optional[int] = None, use_data_dir: bool = True) -> Dict[str, Any]:
+    """
+    Creates a tar (optionally gzip, xz or zstd compressed) or ZIP archive from files or directories.
+    
+    Tar archives are written as a stream without holding any file in memory, and compression
+    runs on multiple threads. Prefer 'tar.zst' (fast) or 'tar.xz' (small) for large exports.
+    
+    Args:
+        source_paths: List of paths to files/directories to include in the archive.
+            If use_data_dir is True, these should be relative paths within the project data directory.
+        output_path: Path for the output archive. If use_data_dir is True, this should be a
+            relative path within the project data directory.
+        archive_format: One of 'tar', 'tar.gz', 'tar.xz', 'tar.zst' (requires the zstandard package)
+            or 'zip'. If None, it is derived from the output file name, defaulting to 'tar.gz'.
+        compression_level: Codec compression level. Defaults to 6 for gzip and xz, 3 for zstd and 9 for zip.
+        max_workers: Number of compression threads. None uses one per CPU core.
+        use_data_dir: If True (default), prepend the project data directory to all paths.
+            If False, use the paths as provided.
+    
+    Returns:
+        A dictionary containing:
+        - 'archive_path': Full path to the created archive
+        - 'format': The archive format
+        - 'files_added': List of entries added to the archive
+        - 'total_files': Number of entries added
+        - 'total_size': Size of the archive in bytes
+        - 'uncompressed_size': Total size of the added files in bytes
+        - 'elapsed_seconds': Time taken to write the archive
+        - 'throughput_mb_per_s': Uncompressed megabytes archived per second
+    """
+    try:
+        # Get the full paths based on use_data_dir setting
+        if use_data_dir:
+            full_source_paths = [os.path.join(PROJECT_DATA_DIRECTORY, path) for path in source_paths]
+            full_output_path = os.path.join(PROJECT_DATA_DIRECTORY, output_path)
+        else:
+            full_source_paths = source_paths
+            full_output_path = output_path
+        
+        # Validate the archive format
+        archive_format = archive_format or detect_archive_format(full_output_path) or 'tar.gz'
+        try:
+            check_archive_format(archive_format)
+        except ValueError as e:
+            logging.warning(str(e))
+            return {"error": str(e)}
+        
+        # Validate source paths
+        valid_sources = [path for path in full_source_paths if os.path.exists(path)]
+        invalid_sources = [path for path in full_source_paths if not os.path.exists(path)]
+        
+        if not valid_sources:
+            error_msg = f"No valid source paths found. Invalid paths: {invalid_sources}"
+            logging.warning(error_msg)
+            return {"error": error_msg}
+        
+        # Create parent directories for the output archive if they don't exist
+        os.makedirs(os.path.dirname(full_output_path), exist_ok=True)
+        
+        # Collect the entries and write the archive
+        for path in valid_sources:
+            _flush_appends_below(path)
+        start_time = time.perf_counter()
+        if archive_format == 'zip':
+            members = _collect_archive_members(valid_sources)
+            archive_stats = write_zip(full_output_path, members, 9 if compression_level is None else compression_level, max_workers)
+        else:
+            members = _collect_archive_members(valid_sources, include_dirs=True)
+            archive_stats = write_tar(full_output_path, members, archive_format, compression_level, max_workers)
+        elapsed = time.perf_counter() - start_time
+        
+        return {
+            'archive_path': full_output_path,
+            'format': archive_format,
+            'files_added': [m[1] for m in members],
+            'total_files': len(members),
+            'total_size': os.path.getsize(full_output_path),
+            'uncompressed_size': archive_stats['uncompressed_size'],
+            'elapsed_seconds': round(elapsed, 3),
+            'throughput_mb_per_s': round(archive_stats['uncompressed_size'] / (1024 * 1024) / elapsed, 2) if elapsed > 0 else None,
+            'invalid_sources': invalid_sources if invalid_sources else None
+        }
+        
+    except Exception as e:
+        error_msg = f"Error creating archive: {str(e)}"
+        logging.error(error_msg)
+        return {"error": error_msg}
+
+def archive_extract(archive_path: str, output_dir: Optional[str] = None, patterns: Optional[List[str]] = None, archive_format: Optional[str] = None, dry_run: bool = False, max_workers: Optional[int] = None, use_data_dir: bool = True) -> Dict[str, Any]:
+    """
+    Extracts a tar (optionally gzip, xz or zstd compressed) or ZIP archive.
+    
+    Tar archives are extracted as a stream in a single pass. Members with absolute paths,
+    '..' components or links pointing outside the output directory are rejected.
+    
+    Args:
+        archive_path: Path to the archive. If use_data_dir is True, this should be a 
+            relative path within the project data directory.
+        output_dir: Directory to extract files to. If None, extracts to the same directory as the archive.
+            If use_data_dir is True, this should be a relative path within the project data directory.
+        patterns: Glob patterns selecting the members to extract, e.g. ['*.csv', 'exports/*'].
+            Patterns without '/' match the file name in any directory. None extracts everything.
+        archive_format: One of 'tar', 'tar.gz', 'tar.xz', 'tar.zst' or 'zip'. If None, it is
+            derived from the archive file name.
+        dry_run: If True, only report which members would be extracted and their sizes.
+        max_workers: Number of files extracted in parallel (ZIP archives only).
+        use_data_dir: If True (default), prepend the project data directory to the paths.
+            If False, use the paths as provided.
+    
+    Returns:
+        A dictionary containing:
+        - 'archive_path': Full path to the archive
+        - 'format': The archive format
+        - 'output_dir': Full path to the output directory
+        - 'files_extracted': List of entries extracted (for dry runs, the entries that would be extracted)
+        - 'total_files': Number of entries extracted
+        - 'total_size': Uncompressed size of the extracted files in bytes
+    """
+    try:
+        # Get the full paths based on use_data_dir setting
+        if use_data_dir:
+            full_archive_path = os.path.join(PROJECT_DATA_DIRECTORY, archive_path)
+            full_output_dir = os.path.join(PROJECT_DATA_DIRECTORY, output_dir) if output_dir else os.path.dirname(full_archive_path)
+        else:
+            full_archive_path = archive_path
+            full_output_dir = output_dir if output_dir else os.path.dirname(full_archive_path)
+        
+        # Check if the archive exists
+        if not os.path.isfile(full_archive_path):
+            error_msg = f"Archive not found: {full_archive_path}"
+            logging.warning(error_msg)
+            return {"error": error_msg}
+        
+        # Validate the archive format
+        archive_format = archive_format or detect_archive_format(full_archive_path)
+        if archive_format is None:
+            error_msg = f"Cannot determine the format of {full_archive_path}. Specify archive_format."
+            logging.warning(error_msg)
+            return {"error": error_msg}
+        try:
+            check_archive_format(archive_format)
+        except ValueError as e:
+            logging.warning(str(e))
+            return {"error": str(e)}
+        
+        # ZIP archives share the extract_zip implementation
+        if archive_format == 'zip':
+            result = extract_zip(full_archive_path, full_output_dir, patterns=patterns, dry_run=dry_run, max_workers=max_workers, use_data_dir=False)
+            if 'error' in result:
+                return result
+            result['archive_path'] = result.pop('zip_path')
+            result['format'] = archive_format
+            return result
+        
+        if not dry_run:
+            os.makedirs(full_output_dir, exist_ok=True)
+        
+        start_time = time.perf_counter()
+        members = read_tar(
+            full_archive_path,
+            None if dry_run else full_output_dir,
+            archive_format,
+            compile_member_filter(patterns) if patterns else None
+        )
+        elapsed = time.perf_counter() - start_time
+        
+        if not members:
+            error_msg = f"No matching files to extract in {full_archive_path}"
+            logging.warning(error_msg)
+            return {"error": error_msg}
+        
+        result = {
+            'archive_path': full_archive_path,
+            'format': archive_format,
+            'output_dir': full_output_dir,
+            'files_extracted': [m['name'] for m in members],
+            'total_files': len(members),
+            'total_size': sum(m['size'] for m in members if m['type'] == 'file')
+        }
+        if dry_run:
+            result['dry_run'] = True
+            result['files'] = members
+        else:
+            result['elapsed_seconds'] = round(elapsed, 3)
+        return result
+        
+    except Exception as e:
+        error_msg = f"Error extracting archive: {str(e)}"
+        logging.error(error_msg)
+        return {"error": error_msg}
+
+# Default number of files processed concurrently per batch operation. Metadata-only
+# operations are cheap for the file system to overlap, copies and transforms move
+# data and saturate the disk sooner, hashing is bound by the CPU. Renames run one at
+# a time by default, since with {index} placeholders one file's new name can be
+# another file's old name.
+BATCH_IO_BUDGETS = {
+    'copy': 8,
+    'move': 16,
+    'delete': 32,
+    'rename': 1,
+    'hash': HASH_MAX_WORKERS,
+    'transform': 8
+}
+
+# Processed files are written to the batch store at least this often
+_BATCH_FLUSH_SECONDS = 0.5
+_BATCH_FLUSH_SIZE = 500
+
+# A batch is processed by the process holding its lease in the batch store (shared by
+# all processes using FILE_HANDLER_STATE_DIRECTORY), renewed every
+# _BATCH_HEARTBEAT_SECONDS. A batch whose lease was not renewed for
+# BATCH_LEASE_SECONDS is reported as interrupted and can be resumed.
+BATCH_LEASE_SECONDS = float(os.getenv("FILE_HANDLER_BATCH_LEASE_SECONDS", "60"))
+_BATCH_HEARTBEAT_SECONDS = BATCH_LEASE_SECONDS / 4
+
+# Finished batches are deleted from the batch store this long after they finished
+BATCH_RETENTION_SECONDS = float(os.getenv("FILE_HANDLER_BATCH_RETENTION_SECONDS", str(7 * 24 * 60 * 60)))
+
+def _batch_store_path() -> str:
+    return os.path.join(FILE_HANDLER_STATE_DIRECTORY, "batches.sqlite")
+
+def _batch_file_signature(file_path: str) -> Optional[List[int]]:
+    """Identifies the current content of a file by its inode, size and modification time."""
+    try:
+        file_stat = os.stat(file_path)
+    except OSError:
+        return None
+    return [file_stat.st_ino, file_stat.st_size, file_stat.st_mtime_ns]
+
+def _batch_rename_target(file_path: str, index: int, rename_pattern: str) -> Tuple[str, str]:
+    """Returns the new name and path of the index-th file of a rename batch."""
+    file_name = os.path.basename(file_path)
+    name, ext = os.path.splitext(file_name)
+    new_name = rename_pattern.format(
+        index=index+1,
+        name=name,
+        ext=ext[1:] if ext else ''  # Remove leading dot from extension
+    )
+    
+    # Ensure the new name has an extension if the original did
+    if ext and not os.path.splitext(new_name)[1]:
+        new_name += ext
+    return new_name, os.path.join(os.path.dirname(file_path), new_name)
+
+def _process_batch_file(operation: str, file_path: str, index: int, operation_args: Dict[str, Any], full_dest_path: Optional[str], resumed: bool = False, signature: Optional[List[int]] = None) -> Dict[str, Any]:
+    """Applies a batch operation to one file. Errors are reported in the result, never raised.
+    
+    When resumed is True the file may already have been processed before the batch was
+    interrupted; a move, delete or rename whose source is gone but whose outcome is in
+    place is then reported as done instead of failed. A transform is skipped if the file
+    no longer matches its signature from when the batch was created, since replacing
+    it with the transformed content changed it (transforms such as a replace are not
+    idempotent and must not run twice).
+    """
+    file_name = os.path.basename(file_path)
+    result = {
+        'original_path': file_path,
+        'file_name': file_name,
+        'operation': operation
+    }
+    
+    try:
+        # Content still buffered by append_to_file goes first; a file that is moved,
+        # deleted or replaced is also closed
+        if operation in ('copy', 'hash'):
+            _flush_appends(file_path)
+        else:
+            _append_sessions.close(file_path)
+        
+        if operation == 'copy':
+            dest_file = os.path.join(full_dest_path, file_name)
+            result['copy_method'] = fast_copy(file_path, dest_file)
+            result['destination'] = dest_file
+            
+        elif operation == 'move':
+            dest_file = os.path.join(full_dest_path, file_name)
+            if resumed and not os.path.lexists(file_path) and os.path.lexists(dest_file):
+                result['status'] = 'already_moved'
+            else:
+                # Renamed when on the same file system, copied and deleted otherwise
+                shutil.move(file_path, dest_file, copy_function=fast_copy)
+            result['destination'] = dest_file
+            
+        elif operation == 'delete':
+            if resumed and not os.path.lexists(file_path):
+                result['status'] = 'already_deleted'
+            else:
+                os.remove(file_path)
+                result['status'] = 'deleted'
+            
+        elif operation == 'rename':
+            new_name, new_path = _batch_rename_target(file_path, index, operation_args['rename_pattern'])
+            if resumed and not os.path.lexists(file_path) and os.path.lexists(new_path):
+                result['status'] = 'already_renamed'
+            else:
+                os.rename(file_path, new_path)
+            result['new_path'] = new_path
+            result['new_name'] = new_name
+            
+        elif operation == 'hash':
+            algorithm = operation_args.get('algorithm', 'md5')
+            result['hash'] = hash_file(file_path, algorithm, operation_args.get('use_cache', True))[0]
+            result['algorithm'] = algorithm
+            
+        elif operation == 'transform':
+            transform_func = operation_args['transform_function']
+            result['transform'] = transform_func
+            if resumed and signature is not None and _batch_file_signature(file_path) not in (signature, None):
+                result['status'] = 'already_transformed'
+                return result
+            
+            # Streamed through a temporary file that atomically replaces the original
+            transform_stats = transform_file(
+                file_path,
+                transform_func,
+                search_text=operation_args.get('search_text'),
+                replace_text=operation_args.get('replace_text'),
+                use_regex=operation_args.get('use_regex', False),
+                max_match_length=operation_args.get('max_match_length', DEFAULT_MAX_MATCH_LENGTH)
+            )
+                
+            result['chars_changed'] = transform_stats['chars_read'] - transform_stats['chars_written']
+            result['modified'] = transform_stats['modified']
+            if 'replacements' in transform_stats:
+                result['replacements'] = transform_stats['replacements']
+            
+    except Exception as e:
+        result['status'] = 'error'
+        result['error'] = str(e)
+        logging.error(f"Error processing file {file_path}: {str(e)}")
+    
+    return result
+
+def _run_batch(batch_id: str, owner: str, max_workers: int, resumed: bool) -> None:
+    """Processes the pending files of a stored batch on a thread pool, recording progress as it goes.
+    
+    The caller must hold the lease of the batch as owner; it is renewed while the batch
+    runs and released when it ends.
+    """
+    try:
+        with BatchStore(_batch_store_path()) as store:
+            batch = store.load(batch_id)
+            params = batch['params']
+            items = store.pending_items(batch_id)
+            processed = []
+            completed = False
+            try:
+                pending = iter(items)
+                in_flight = {}
+                last_flush = last_heartbeat = time.monotonic()
+                
+                with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(items) or 1))) as executor:
+                    def submit(count):
+                        for index, file_path, signature in itertools.islice(pending, count):
+                            future = executor.submit(_process_batch_file, batch['operation'], file_path, index,
+                                                     params['operation_args'], params['destination'], resumed, signature)
+                            in_flight[future] = index
+                    
+                    # Keep a bounded window of files in flight, so huge batches are not queued all at once
+                    submit(max_workers * 4)
+                    while in_flight:
+                        done, _ = wait(in_flight, timeout=_BATCH_HEARTBEAT_SECONDS, return_when=FIRST_COMPLETED)
+                        for future in done:
+                            result = future.result()
+                            processed.append((in_flight.pop(future), FAILED if result.get('status') == 'error' else DONE, result))
+                        
+                        if time.monotonic() - last_heartbeat >= _BATCH_HEARTBEAT_SECONDS:
+                            last_heartbeat = time.monotonic()
+                            if not store.heartbeat(batch_id, owner):
+                                # Stalled for longer than the lease, and resumed by another process
+                                logging.error(f"Batch {batch_id} was taken over by another process; stopping")
+                                pending = iter(())
+                        submit(len(done))
+                        
+                        if len(processed) >= _BATCH_FLUSH_SIZE or time.monotonic() - last_flush >= _BATCH_FLUSH_SECONDS:
+                            store.record_results(batch_id, processed)
+                            processed = []
+                            last_flush = time.monotonic()
+                completed = True
+            finally:
+                if processed:
+                    store.record_results(batch_id, processed)
+                status = None
+                if completed:
+                    status = 'completed_with_errors' if store.counts(batch_id)[FAILED] else 'completed'
+                # Unless completed, the batch stays 'running' without an owner: interrupted
+                store.release(batch_id, owner, status)
+    except Exception as e:
+        # The files processed so far are recorded; the rest stay pending and can be resumed
+        logging.error(f"Error in batch {batch_id}: {str(e)}")
+
+def _batch_progress(store: BatchStore, batch: Dict[str, Any]) -> Dict[str, Any]:
+    """Summarizes the progress of a stored batch."""
+    counts = store.counts(batch['batch_id'])
+    status = batch['status']
+    if status == 'running' and (batch['owner'] is None or time.time() - batch['heartbeat_at'] > BATCH_LEASE_SECONDS):
+        # The process running it was stopped before the batch finished
+        status = 'interrupted'
+    processed = counts[DONE] + counts[FAILED]
+    return {
+        'batch_id': batch['batch_id'],
+        'operation': batch['operation'],
+        'status': status,
+        'total': batch['total'],
+        'processed': processed,
+        'failed': counts[FAILED],
+        'pending': counts[PENDING],
+        'percent_complete': round(100.0 * processed / batch['total'], 1) if batch['total'] else 100.0,
+        'created_at': batch['created_at'],
+        'updated_at': batch['updated_at']
+    }
+
+def batch_process_files(directory_path: str, operation: str, pattern: str = "*", recursive: bool = True, use_regex: bool = False, max_files: Optional[int] = None, dry_run: bool = True, operation_args: Optional[Dict[str, Any]] = None, max_workers: Optional[int] = None, batch_id: Optional[str] = None, background: bool = False, use_data_dir: bool = True) -> Dict[str, Any]:
     """
     Processes multiple files based on patterns or rules in a single operation.
     
+    Files are processed concurrently on a thread pool. Every batch that is not a dry run is
+    recorded under a batch ID in the file handler state directory, with the outcome of each
+    file as soon as it is processed: poll its progress with get_batch_status, and resume an
+    interrupted batch by calling this function again with its batch_id.
+    
     Args:
         directory_path: Path to the directory containing files to process. If use_data_dir is True, 
             this should be a relative path within the project data directory.
@@ -1759,10 +2754,27 @@ def batch_process_files(directory_path: str, operation: str, pattern: str = "*",
         max_files: Maximum number of files to process. None means no limit.
         dry_run: If True (default), only simulate the operation without making changes.
         operation_args: Additional arguments for the specific operation:
-            - 'copy'/'move': Requires 'destination' (target directory)
+            - 'copy'/'move': Requires 'destination' (target directory). Files are cloned (reflink)
+              or copied in the kernel where the file system allows it; the 'copy_method' of
+              each copied file is reported
             - 'rename': Requires 'rename_pattern' (can include {index}, {name}, {ext} placeholders)
             - 'transform': Requires 'transform_function' (e.g., 'uppercase', 'lowercase', 'replace')
-              and possibly 'search_text'/'replace_text' for 'replace' transform
+              and possibly 'search_text'/'replace_text' for 'replace' transform. With 'use_regex'
+              (default False), 'search_text' is a regular expression and 'replace_text' may refer
+              to its groups (\\1, \\g<name>); 'max_match_length' (default 65536 characters)
+              bounds how long a regex match spanning two chunks of the file can be. Files
+              are rewritten chunk by chunk into a temporary file that replaces the original
+              once complete.
+            - 'hash': Optional 'algorithm' (default 'md5', see calculate_file_hash) and
+              'use_cache' (default True)
+        max_workers: Number of files processed concurrently. None (default) uses the I/O budget
+            of the operation from BATCH_IO_BUDGETS.
+        batch_id: ID of the batch. If a batch with this ID exists, its remaining files are processed
+            with the parameters it was started with (the other arguments except max_workers and
+            background are ignored). Otherwise a new batch is started under this ID; if None, an ID
+            is generated.
+        background: If True, return immediately after starting the batch and process it in a
+            background thread. Use get_batch_status to follow it.
         use_data_dir: If True (default), prepend the project data directory to the paths.
             If False, use the paths as provided.
     
@@ -1774,8 +2786,20 @@ def batch_process_files(directory_path: str, operation: str, pattern: str = "*",
         - 'dry_run': Whether this was a simulation
         - 'total_matches': Number of files matched
         - 'total_processed': Number of files processed
+        - 'batch_id', 'max_workers' and 'elapsed_seconds': If this was not a dry run
+        For a background batch, the progress from get_batch_status is returned instead.
     """
     try:
+        if batch_id:
+            with BatchStore(_batch_store_path()) as store:
+                batch = store.load(batch_id)
+            if batch is not None:
+                if batch['operation'] != operation:
+                    error_msg = f"Batch {batch_id} is a '{batch['operation']}' batch, not '{operation}'"
+                    logging.warning(error_msg)
+                    return {"error": error_msg}
+                return _start_batch(batch_id, batch['operation'], batch['params'], max_workers, background, uuid.uuid4().hex, resumed=True)
+        
         # Get the full directory path based on use_data_dir setting
         if use_data_dir:
             full_dir_path = os.path.join(PROJECT_DATA_DIRECTORY, directory_path)
@@ -1816,18 +2840,31 @@ def batch_process_files(directory_path: str, operation: str, pattern: str = "*",
                 logging.error(error_msg)
                 return {"error": error_msg}
                 
-            valid_transforms = ['uppercase', 'lowercase', 'replace']
-            if operation_args['transform_function'] not in valid_transforms:
-                error_msg = f"Invalid transform function: {operation_args['transform_function']}. Valid functions are: {', '.join(valid_transforms)}"
+            if operation_args['transform_function'] not in TRANSFORM_FUNCTIONS:
+                error_msg = f"Invalid transform function: {operation_args['transform_function']}. Valid functions are: {', '.join(TRANSFORM_FUNCTIONS)}"
                 logging.error(error_msg)
                 return {"error": error_msg}
                 
-            if operation_args['transform_function'] == 'replace' and ('search_text' not in operation_args or 'replace_text' not in operation_args):
-                error_msg = "Transform function 'replace' requires 'search_text' and 'replace_text' arguments"
-                logging.error(error_msg)
-                return {"error": error_msg}
+            if operation_args['transform_function'] == 'replace':
+                if 'search_text' not in operation_args or 'replace_text' not in operation_args:
+                    error_msg = "Transform function 'replace' requires 'search_text' and 'replace_text' arguments"
+                    logging.error(error_msg)
+                    return {"error": error_msg}
+                
+                try:
+                    compile_replacement(operation_args['search_text'], operation_args['replace_text'], operation_args.get('use_regex', False))
+                except re.error as e:
+                    error_msg = f"Invalid regular expression or replacement: {str(e)}"
+                    logging.error(error_msg)
+                    return {"error": error_msg}
+        
+        if operation == 'hash' and operation_args.get('algorithm', 'md5').lower() not in HASH_ALGORITHMS:
+            error_msg = f"Invalid hash algorithm: {operation_args['algorithm']}. Valid options are {', '.join(repr(a) for a in HASH_ALGORITHMS)}."
+            logging.error(error_msg)
+            return {"error": error_msg}
         
         # Prepare destination directory for copy/move operations
+        full_dest_path = None
         if operation in ['copy', 'move']:
             if use_data_dir:
                 full_dest_path = os.path.join(PROJECT_DATA_DIRECTORY, operation_args['destination'])
@@ -1838,151 +2875,31 @@ def batch_process_files(directory_path: str, operation: str, pattern: str = "*",
             if not dry_run and not os.path.exists(full_dest_path):
                 os.makedirs(full_dest_path, exist_ok=True)
         
-        # Find matching files
-        matched_files = []
-        
-        if recursive:
-            # Walk through all subdirectories
-            for root, _, files in os.walk(full_dir_path):
-                for file in files:
-                    file_path = os.path.join(root, file)
-                    
-                    # Check if the file matches the pattern
-                    if use_regex:
-                        if re.search(pattern, file):
-                            matched_files.append(file_path)
-                    else:  # Use glob pattern
-                        import fnmatch
-                        if fnmatch.fnmatch(file, pattern):
-                            matched_files.append(file_path)
-        else:
-            # Only check files in the specified directory
-            for file in os.listdir(full_dir_path):
-                file_path = os.path.join(full_dir_path, file)
+        # Find matching files, stopping at the file limit if specified
+        _flush_appends_below(full_dir_path)
+        matching_entries = walk(full_dir_path, pattern=pattern, use_regex=use_regex, recursive=recursive)
+        matched_files = [entry.path for entry in itertools.islice(matching_entries, max_files)]
+        
+        if dry_run:
+            processed_files = []
+            for index, file_path in enumerate(matched_files):
+                result = {
+                    'original_path': file_path,
+                    'file_name': os.path.basename(file_path),
+                    'operation': operation
+                }
                 
-                if os.path.isfile(file_path):
-                    # Check if the file matches the pattern
-                    if use_regex:
-                        if re.search(pattern, file):
-                            matched_files.append(file_path)
-                    else:  # Use glob pattern
-                        import fnmatch
-                        if fnmatch.fnmatch(file, pattern):
-                            matched_files.append(file_path)
-        
-        # Apply file limit if specified
-        if max_files is not None:
-            matched_files = matched_files[:max_files]
-        
-        # Process files
-        processed_files = []
-        
-        for index, file_path in enumerate(matched_files):
-            file_name = os.path.basename(file_path)
-            file_dir = os.path.dirname(file_path)
-            name, ext = os.path.splitext(file_name)
-            
-            result = {
-                'original_path': file_path,
-                'file_name': file_name,
-                'operation': operation
-            }
-            
-            # Skip actual processing if in dry run mode
-            if not dry_run:
-                try:
-                    if operation == 'copy':
-                        dest_file = os.path.join(full_dest_path, file_name)
-                        shutil.copy2(file_path, dest_file)
-                        result['destination'] = dest_file
-                        
-                    elif operation == 'move':
-                        dest_file = os.path.join(full_dest_path, file_name)
-                        shutil.move(file_path, dest_file)
-                        result['destination'] = dest_file
-                        
-                    elif operation == 'delete':
-                        os.remove(file_path)
-                        result['status'] = 'deleted'
-                        
-                    elif operation == 'rename':
-                        # Process rename pattern with placeholders
-                        rename_pattern = operation_args['rename_pattern']
-                        new_name = rename_pattern.format(
-                            index=index+1,
-                            name=name,
-                            ext=ext[1:] if ext else ''  # Remove leading dot from extension
-                        )
-                        
-                        # Ensure the new name has an extension if the original did
-                        if ext and not os.path.splitext(new_name)[1]:
-                            new_name += ext
-                            
-                        new_path = os.path.join(file_dir, new_name)
-                        os.rename(file_path, new_path)
-                        result['new_path'] = new_path
-                        result['new_name'] = new_name
-                        
-                    elif operation == 'hash':
-                        # Use specified algorithm or default to MD5
-                        algorithm = operation_args.get('algorithm', 'md5')
-                        hash_result = calculate_file_hash(file_path, algorithm, use_data_dir=False)  # Using full path already
-                        result['hash'] = hash_result['hash']
-                        result['algorithm'] = algorithm
-                        
-                    elif operation == 'transform':
-                        transform_func = operation_args['transform_function']
-                        
-                        # Read file content
-                        with open(file_path, 'r', encoding='utf-8', errors='replace') as f:
-                            content = f.read()
-                        
-                        # Apply transformation
-                        if transform_func == 'uppercase':
-                            new_content = content.upper()
-                        elif transform_func == 'lowercase':
-                            new_content = content.lower()
-                        elif transform_func == 'replace':
-                            search_text = operation_args['search_text']
-                            replace_text = operation_args['replace_text']
-                            new_content = content.replace(search_text, replace_text)
-                        
-                        # Write transformed content
-                        with open(file_path, 'w', encoding='utf-8') as f:
-                            f.write(new_content)
-                            
-                        result['transform'] = transform_func
-                        result['chars_changed'] = len(content) - len(new_content)
-                        
-                except Exception as e:
-                    result['status'] = 'error'
-                    result['error'] = str(e)
-                    logging.error(f"Error processing file {file_path}: {str(e)}")
-            else:
                 # For dry run, add simulated result
                 if operation == 'copy':
-                    result['destination'] = os.path.join(full_dest_path, file_name)
+                    result['destination'] = os.path.join(full_dest_path, result['file_name'])
                     result['status'] = 'would_copy'
                 elif operation == 'move':
-                    result['destination'] = os.path.join(full_dest_path, file_name)
+                    result['destination'] = os.path.join(full_dest_path, result['file_name'])
                     result['status'] = 'would_move'
                 elif operation == 'delete':
                     result['status'] = 'would_delete'
                 elif operation == 'rename':
-                    rename_pattern = operation_args['rename_pattern']
-                    new_name = rename_pattern.format(
-                        index=index+1,
-                        name=name,
-                        ext=ext[1:] if ext else ''  # Remove leading dot from extension
-                    )
-                    
-                    # Ensure the new name has an extension if the original did
-                    if ext and not os.path.splitext(new_name)[1]:
-                        new_name += ext
-                        
-                    new_path = os.path.join(file_dir, new_name)
-                    result['new_path'] = new_path
-                    result['new_name'] = new_name
+                    result['new_name'], result['new_path'] = _batch_rename_target(file_path, index, operation_args['rename_pattern'])
                     result['status'] = 'would_rename'
                 elif operation == 'hash':
                     result['status'] = 'would_hash'
@@ -1990,34 +2907,138 @@ def batch_process_files(directory_path: str, operation: str, pattern: str = "*",
                 elif operation == 'transform':
                     result['status'] = 'would_transform'
                     result['transform'] = operation_args['transform_function']
+                
+                processed_files.append(result)
             
-            processed_files.append(result)
+            return {
+                'operation': operation,
+                'pattern': pattern,
+                'recursive': recursive,
+                'matched_files': [os.path.basename(f) for f in matched_files],
+                'processed_files': processed_files,
+                'dry_run': dry_run,
+                'total_matches': len(matched_files),
+                'total_processed': len(processed_files)
+            }
         
-        return {
-            'operation': operation,
+        # Record the batch before touching any file, so it can be resumed if interrupted
+        if not batch_id:
+            batch_id = f"batch_{datetime.now().strftime('%Y%m%d%H%M%S')}_{uuid.uuid4().hex[:8]}"
+        params = {
+            'directory': full_dir_path,
             'pattern': pattern,
             'recursive': recursive,
-            'matched_files': [os.path.basename(f) for f in matched_files],
-            'processed_files': processed_files,
-            'dry_run': dry_run,
-            'total_matches': len(matched_files),
-            'total_processed': len(processed_files)
+            'operation_args': operation_args,
+            'destination': full_dest_path
         }
+        # Transforms are not idempotent: remember each file's signature, so that a resumed
+        # batch can tell the files that were already replaced
+        signatures = [_batch_file_signature(path) for path in matched_files] if operation == 'transform' else None
+        owner = uuid.uuid4().hex
+        with BatchStore(_batch_store_path()) as store:
+            store.prune(BATCH_RETENTION_SECONDS)
+            store.create(batch_id, operation, params, matched_files, owner, signatures)
+        
+        return _start_batch(batch_id, operation, params, max_workers or operation_args.get('max_workers'), background, owner)
         
     except Exception as e:
         error_msg = f"Error in batch processing: {str(e)}"
         logging.error(error_msg)
         return {"error": error_msg}
 
-def calculate_file_hash(file_path: str, hash_algorithm: str = "md5", use_data_dir: bool = True) -> Dict[str, Any]:
+def _start_batch(batch_id: str, operation: str, params: Dict[str, Any], max_workers: Optional[int], background: bool, owner: str, resumed: bool = False) -> Dict[str, Any]:
+    """Runs the pending files of a stored batch as owner, in the foreground or in a background thread."""
+    with BatchStore(_batch_store_path()) as store:
+        if not store.acquire(batch_id, owner, BATCH_LEASE_SECONDS):
+            error_msg = f"Batch {batch_id} is already running"
+            logging.warning(error_msg)
+            return {"error": error_msg}
+    
+    max_workers = max_workers or BATCH_IO_BUDGETS[operation]
+    if background:
+        threading.Thread(target=_run_batch, args=(batch_id, owner, max_workers, resumed), name=f"file-handler-{batch_id}", daemon=True).start()
+        with BatchStore(_batch_store_path()) as store:
+            progress = _batch_progress(store, store.load(batch_id))
+        progress['max_workers'] = max_workers
+        return progress
+    
+    start_time = time.monotonic()
+    _run_batch(batch_id, owner, max_workers, resumed)
+    with BatchStore(_batch_store_path()) as store:
+        matched_files = store.paths(batch_id)
+        processed_files = store.results(batch_id)
+    
+    return {
+        'batch_id': batch_id,
+        'operation': operation,
+        'pattern': params['pattern'],
+        'recursive': params['recursive'],
+        'matched_files': [os.path.basename(f) for f in matched_files],
+        'processed_files': processed_files,
+        'dry_run': False,
+        'total_matches': len(matched_files),
+        'total_processed': len(processed_files),
+        'max_workers': max_workers,
+        'elapsed_seconds': round(time.monotonic() - start_time, 3)
+    }
+
+def get_batch_status(batch_id: Optional[str] = None, include_results: bool = False, offset: int = 0, limit: int = 100) -> Dict[str, Any]:
+    """
+    Reports the progress of batches started by batch_process_files.
+    
+    Args:
+        batch_id: ID of the batch. If None, the progress of all recorded batches is listed.
+        include_results: If True, include the results of processed files (in file order).
+        offset: Index of the first result to include. Default is 0.
+        limit: Maximum number of results to include. Default is 100.
+    
+    Returns:
+        A dictionary containing:
+        - 'batch_id', 'operation': The batch
+        - 'status': 'running', 'completed', 'completed_with_errors' or 'interrupted'
+          (stopped before finishing; resume it with batch_process_files and this batch_id).
+          A batch whose process was killed is reported as interrupted once its lease
+          expires, BATCH_LEASE_SECONDS after its last progress check-in.
+        - 'total', 'processed', 'failed', 'pending' and 'percent_complete': Progress counts
+        - 'created_at', 'updated_at': When the batch started and last made progress
+        - 'results': If include_results is True, the results from offset on
+        Without a batch_id, 'batches' lists the progress of every batch.
+    """
+    try:
+        with BatchStore(_batch_store_path()) as store:
+            if batch_id is None:
+                batches = [_batch_progress(store, store.load(stored_id)) for stored_id in store.batch_ids()]
+                return {'batches': batches, 'total_batches': len(batches)}
+            
+            batch = store.load(batch_id)
+            if batch is None:
+                error_msg = f"Batch not found: {batch_id}"
+                logging.warning(error_msg)
+                return {"error": error_msg}
+            
+            progress = _batch_progress(store, batch)
+            if include_results:
+                progress['results'] = store.results(batch_id, offset, limit)
+                progress['offset'] = offset
+            return progress
+        
+    except Exception as e:
+        error_msg = f"Error getting batch status: {str(e)}"
+        logging.error(error_msg)
+        return {"error": error_msg}
+
+def calculate_file_hash(file_path: str, hash_algorithm: str = "md5", use_cache: bool = True, use_data_dir: bool = True) -> Dict[str, Any]:
     """
     Generates a hash checksum for a file to verify file integrity.
     
     Args:
         file_path: Path to the file to hash. If use_data_dir is True, this should be a 
             relative path within the project data directory.
-        hash_algorithm: Hash algorithm to use. Options are 'md5', 'sha1', 'sha256', or 'sha512'.
-            Default is 'md5'.
+        hash_algorithm: Hash algorithm to use. Options are 'md5', 'sha1', 'sha256', 'sha512',
+            'blake2b', 'blake2s', and (if the xxhash package is installed) the fast non-cryptographic
+            'xxh64', 'xxh3_64' and 'xxh3_128'. Default is 'md5'.
+        use_cache: If True (default), reuse the hash computed by an earlier call as long as the
+            file's size, modification time and inode are unchanged.
         use_data_dir: If True (default), prepend the project data directory to the file_path.
             If False, use the file_path as provided.
     
@@ -2027,6 +3048,7 @@ def calculate_file_hash(file_path: str, hash_algorithm: str = "md5", use_data_di
         - 'algorithm': Hash algorithm used
         - 'hash': The generated hash/checksum
         - 'file_size': Size of the file in bytes
+        - 'cached': Whether the hash was reused from an earlier call
     """
     try:
         # Get the full path based on use_data_dir setting
@@ -2041,37 +3063,22 @@ def calculate_file_hash(file_path: str, hash_algorithm: str = "md5", use_data_di
             logging.warning(error_msg)
             return {"error": error_msg}
         
-        # Validate and select hash algorithm
-        hash_func = None
-        if hash_algorithm.lower() == "md5":
-            hash_func = hashlib.md5()
-        elif hash_algorithm.lower() == "sha1":
-            hash_func = hashlib.sha1()
-        elif hash_algorithm.lower() == "sha256":
-            hash_func = hashlib.sha256()
-        elif hash_algorithm.lower() == "sha512":
-            hash_func = hashlib.sha512()
-        else:
-            error_msg = f"Invalid hash algorithm: {hash_algorithm}. Valid options are 'md5', 'sha1', 'sha256', 'sha512'."
+        # Validate the hash algorithm
+        if hash_algorithm.lower() not in HASH_ALGORITHMS:
+            error_msg = f"Invalid hash algorithm: {hash_algorithm}. Valid options are {', '.join(repr(a) for a in HASH_ALGORITHMS)}."
             logging.error(error_msg)
             return {"error": error_msg}
         
-        # Calculate hash in chunks to handle large files efficiently
-        file_size = os.path.getsize(full_path)
-        chunk_size = 8192  # 8KB chunks
-        
-        with open(full_path, 'rb') as f:
-            for chunk in iter(lambda: f.read(chunk_size), b""):
-                hash_func.update(chunk)
-        
-        # Get hexadecimal digest
-        file_hash = hash_func.hexdigest()
+        # Calculate hash with large buffered reads
+        _flush_appends(full_path)
+        file_hash, file_size, cached = hash_file(full_path, hash_algorithm, use_cache)
         
         return {
             'file_path': full_path,
             'algorithm': hash_algorithm.lower(),
             'hash': file_hash,
-            'file_size': file_size
+            'file_size': file_size,
+            'cached': cached
         }
         
     except Exception as e:
@@ -2079,17 +3086,166 @@ def calculate_file_hash(file_path: str, hash_algorithm: str = "md5", use_data_di
         logging.error(error_msg)
         return {"error": error_msg}
 
-def compare_files(file_path1: str, file_path2: str, show_diff: bool = False, use_data_dir: bool = True) -> Dict[str, Any]:
+def find_duplicate_files(directory_path: str, pattern: str = "*", use_regex: bool = False, recursive: bool = True, min_size: int = 1, hash_algorithm: str = "md5", edge_size: int = 4096, max_workers: Optional[int] = None, use_data_dir: bool = True) -> Dict[str, Any]:
+    """
+    Finds files with identical content in a directory, e.g. to reclaim space used by copies.
+    
+    Files are first grouped by size; only files sharing a size are read at all. Of those, only
+    the first and last edge_size bytes are hashed, and only files that still collide are hashed
+    in full. Hard links to the same file are counted once, since they take no extra space.
+    
+    Args:
+        directory_path: Path to the directory to search. If use_data_dir is True, this should be a 
+            relative path within the project data directory.
+        pattern: Pattern to match file names. Can be a glob pattern or regex depending on use_regex.
+            Default is "*" (all files).
+        use_regex: If True, treat the pattern as a regular expression. If False (default),
+            treat it as a glob pattern.
+        recursive: If True (default), include files in subdirectories.
+        min_size: Files smaller than this many bytes are ignored. Default is 1 (skip empty files).
+        hash_algorithm: Algorithm for the full content hash (see calculate_file_hash). Default is 'md5'.
+        edge_size: Number of bytes hashed at the start and end of each file in the partial pass.
+            Default is 4096.
+        max_workers: Number of files hashed in parallel. None uses a default based on the CPU count.
+        use_data_dir: If True (default), prepend the project data directory to the directory_path.
+            If False, use the directory_path as provided.
+    
+    Returns:
+        A dictionary containing:
+        - 'directory': The directory searched
+        - 'duplicate_groups': Groups of identical files (largest reclaimable space first), each with
+          'hash', 'size', 'files' and 'reclaimable_bytes' (space freed by keeping one copy)
+        - 'total_files_scanned': Number of files considered
+        - 'total_duplicate_files': Number of files that could be removed
+        - 'reclaimable_bytes': Total space freed by keeping one copy of each group
+        - 'stats': Number of files hashed partially and fully, and hard links skipped
+    """
+    try:
+        # Get the full path based on use_data_dir setting
+        if use_data_dir:
+            full_path = os.path.join(PROJECT_DATA_DIRECTORY, directory_path)
+        else:
+            full_path = directory_path
+        
+        # Check if the directory exists
+        if not os.path.isdir(full_path):
+            error_msg = f"Directory not found: {full_path}"
+            logging.warning(error_msg)
+            return {"error": error_msg}
+        
+        # Validate the hash algorithm
+        if hash_algorithm.lower() not in HASH_ALGORITHMS:
+            error_msg = f"Invalid hash algorithm: {hash_algorithm}. Valid options are {', '.join(repr(a) for a in HASH_ALGORITHMS)}."
+            logging.error(error_msg)
+            return {"error": error_msg}
+        
+        _flush_appends_below(full_path)
+        stats = {'partially_hashed': 0, 'fully_hashed': 0, 'hard_links_skipped': 0}
+        
+        # Stage 1: bucket files by size (one stat per file, no reads)
+        files_by_size = {}
+        seen_inodes = set()
+        total_files = 0
+        for entry in walk(full_path, pattern=pattern, use_regex=use_regex, recursive=recursive):
+            try:
+                if entry.is_symlink():
+                    continue
+                file_stat = entry.stat()
+            except OSError as e:
+                logging.warning(f"Could not stat {entry.path}: {e}")
+                continue
+            if file_stat.st_size < min_size:
+                continue
+            total_files += 1
+            inode = (file_stat.st_dev, file_stat.st_ino)
+            if inode in seen_inodes:
+                stats['hard_links_skipped'] += 1
+                continue
+            seen_inodes.add(inode)
+            files_by_size.setdefault(file_stat.st_size, []).append(entry.path)
+        
+        def group_by(paths, results):
+            groups = {}
+            for path, result in zip(paths, results):
+                if isinstance(result, Exception):
+                    logging.warning(f"Could not hash {path}: {result}")
+                    continue
+                key = result[0] if isinstance(result, tuple) else result
+                groups.setdefault(key, []).append(path)
+            return [group for group in groups.values() if len(group) > 1]
+        
+        # Stage 2: hash the first and last bytes of same-sized files. Small files are
+        # covered completely by the edges, so they go straight to the full hash.
+        full_hash_candidates = []
+        edge_paths = []
+        edge_path_sizes = {}
+        for size, paths in files_by_size.items():
+            if len(paths) < 2:
+                continue
+            if size <= 2 * edge_size:
+                full_hash_candidates.append((size, paths))
+            else:
+                edge_paths.extend(paths)
+                edge_path_sizes.update((path, size) for path in paths)
+        edge_hashes = hash_files_edges(edge_paths, edge_size, hash_algorithm, max_workers=max_workers)
+        stats['partially_hashed'] = len(edge_paths)
+        for paths in group_by(edge_paths, edge_hashes):
+            # The size is part of the edge hash, so all files of a group share the one
+            # listed in stage 1; no stat that could fail for a file deleted meanwhile
+            full_hash_candidates.append((edge_path_sizes[paths[0]], paths))
+        
+        # Stage 3: fully hash the remaining collisions
+        full_paths = [path for size, paths in full_hash_candidates for path in paths]
+        full_hashes = dict(zip(full_paths, hash_files(full_paths, hash_algorithm, max_workers=max_workers)))
+        stats['fully_hashed'] = len(full_paths)
+        
+        duplicate_groups = []
+        for size, paths in full_hash_candidates:
+            for group in group_by(paths, [full_hashes[path] for path in paths]):
+                duplicate_groups.append({
+                    'hash': full_hashes[group[0]][0],
+                    'size': size,
+                    'files': sorted(group),
+                    'reclaimable_bytes': size * (len(group) - 1)
+                })
+        duplicate_groups.sort(key=lambda g: g['reclaimable_bytes'], reverse=True)
+        
+        return {
+            'directory': full_path,
+            'algorithm': hash_algorithm.lower(),
+            'duplicate_groups': duplicate_groups,
+            'total_files_scanned': total_files,
+            'total_duplicate_files': sum(len(g['files']) - 1 for g in duplicate_groups),
+            'reclaimable_bytes': sum(g['reclaimable_bytes'] for g in duplicate_groups),
+            'stats': stats
+        }
+        
+    except Exception as e:
+        error_msg = f"Error finding duplicate files in {directory_path}: {str(e)}"
+        logging.error(error_msg)
+        return {"error": error_msg}
+
+def compare_files(file_path1: str, file_path2: str, show_diff: bool = False, diff_algorithm: str = "patience", context_lines: int = 3, max_diff_lines: Optional[int] = 1000, ignore_line_endings: bool = False, use_data_dir: bool = True) -> Dict[str, Any]:
     """
     Compares two files and identifies if they are identical or what differences exist.
     
+    Files are compared in large chunks without loading them into memory. The diff is computed
+    on line hashes, so inserted or removed lines are aligned correctly and large files can be
+    diffed in bounded memory.
+    
     Args:
         file_path1: Path to the first file. If use_data_dir is True, this should be a 
             relative path within the project data directory.
         file_path2: Path to the second file. If use_data_dir is True, this should be a 
             relative path within the project data directory.
-        show_diff: If True, includes the actual differences between files in the response.
-            For large files, this can be memory intensive.
+        show_diff: If True, includes a unified diff of the files in the response (text files only).
+        diff_algorithm: 'patience' (default, aligns on unique lines and is easier to read) or
+            'myers' (minimal diff).
+        context_lines: Number of unchanged lines shown around each change. Default is 3.
+        max_diff_lines: Maximum number of diff lines returned. None means no limit. Default is 1000.
+        ignore_line_endings: If True, the diff treats lines that differ only in their line ending
+            (LF vs CRLF) as equal. Default is False: such lines are shown as changed, with the
+            '\r' of CRLF lines kept.
         use_data_dir: If True (default), prepend the project data directory to the file paths.
             If False, use the file paths as provided.
     
@@ -2098,8 +3254,11 @@ def compare_files(file_path1: str, file_path2: str, show_diff: bool = False, use
         - 'identical': Boolean indicating if the files are identical
         - 'file1': Full path to the first file
         - 'file2': Full path to the second file
-        - 'comparison_type': Type of comparison performed ('binary', 'line_by_line')
-        - 'differences': List of differences (if show_diff is True and files differ)
+        - 'comparison_type': Type of comparison performed ('binary', 'unified_diff')
+        - 'first_difference_offset': Byte offset of the first difference (if the files differ)
+        - 'diff': Unified diff lines (if show_diff is True and the files are different text files)
+        - 'diff_count': Number of added plus removed lines
+        - 'truncated': Whether the diff was cut off at max_diff_lines
     """
     try:
         # Get the full paths based on use_data_dir setting
@@ -2121,9 +3280,25 @@ def compare_files(file_path1: str, file_path2: str, show_diff: bool = False, use
             logging.warning(error_msg)
             return {"error": error_msg}
         
-        # Quick shallow comparison first (file size and signature)
-        if filecmp.cmp(full_path1, full_path2, shallow=True):
-            # Files appear identical in shallow comparison
+        if diff_algorithm not in ('patience', 'myers'):
+            error_msg = f"Invalid diff algorithm: {diff_algorithm}. Must be 'patience' or 'myers'"
+            logging.warning(error_msg)
+            return {"error": error_msg}
+        
+        _flush_appends(full_path1)
+        _flush_appends(full_path2)
+        
+        # Quick shallow comparison first (file size and modification time, as filecmp does),
+        # then a chunked binary comparison
+        stat1 = os.stat(full_path1)
+        stat2 = os.stat(full_path2)
+        if (stat1.st_size, stat1.st_mtime) == (stat2.st_size, stat2.st_mtime):
+            difference_offset = None
+        else:
+            difference_offset = first_difference(full_path1, full_path2)
+        
+        if difference_offset is None:
+            # Files are identical
             return {
                 'identical': True,
                 'file1': full_path1,
@@ -2132,60 +3307,39 @@ def compare_files(file_path1: str, file_path2: str, show_diff: bool = False, use
                 'message': "Files are identical (binary comparison)"
             }
         
-        # Files differ - if we need details, do a line-by-line comparison
+        # Files differ - if we need details, compute a line diff
         result = {
             'identical': False,
             'file1': full_path1,
             'file2': full_path2,
             'comparison_type': 'binary',
-            'message': "Files are different"
+            'message': "Files are different",
+            'first_difference_offset': difference_offset
         }
         
         if show_diff:
-            # Try to do a line-by-line text comparison
-            try:
-                result['comparison_type'] = 'line_by_line'
-                differences = []
-                
-                with open(full_path1, 'r', encoding='utf-8', errors='replace') as f1, \
-                     open(full_path2, 'r', encoding='utf-8', errors='replace') as f2:
-                    lines1 = f1.readlines()
-                    lines2 = f2.readlines()
-                
-                # Find differences
-                for i, (line1, line2) in enumerate(zip(lines1, lines2)):
-                    if line1 != line2:
-                        differences.append({
-                            'line_number': i + 1,
-                            'file1_line': line1.rstrip('\n'),
-                            'file2_line': line2.rstrip('\n')
-                        })
-                
-                # Handle case where files have different number of lines
-                if len(lines1) > len(lines2):
-                    for i in range(len(lines2), len(lines1)):
-                        differences.append({
-                            'line_number': i + 1,
-                            'file1_line': lines1[i].rstrip('\n'),
-                            'file2_line': "[No line]"
-                        })
-                elif len(lines2) > len(lines1):
-                    for i in range(len(lines1), len(lines2)):
-                        differences.append({
-                            'line_number': i + 1,
-                            'file1_line': "[No line]",
-                            'file2_line': lines2[i].rstrip('\n')
-                        })
-                
-                result['differences'] = differences
-                result['diff_count'] = len(differences)
-                result['file1_lines'] = len(lines1)
-                result['file2_lines'] = len(lines2)
-                
-            except UnicodeDecodeError:
-                # If we can't do a text comparison, fall back to binary
-                result['comparison_type'] = 'binary'
+            if is_binary_file(full_path1) or is_binary_file(full_path2):
+                # Binary files cannot be compared line by line
                 result['message'] = "Files are different (binary files cannot show line differences)"
+                return result
+            
+            diff_result = unified_diff(
+                full_path1, full_path2,
+                context=context_lines,
+                max_lines=max_diff_lines,
+                algorithm=diff_algorithm,
+                ignore_line_endings=ignore_line_endings
+            )
+            result['comparison_type'] = 'unified_diff'
+            result['algorithm'] = diff_algorithm
+            result['diff'] = diff_result['diff']
+            result['diff_count'] = diff_result['lines_added'] + diff_result['lines_removed']
+            result['lines_added'] = diff_result['lines_added']
+            result['lines_removed'] = diff_result['lines_removed']
+            result['hunk_count'] = diff_result['hunk_count']
+            result['file1_lines'] = diff_result['file1_lines']
+            result['file2_lines'] = diff_result['file2_lines']
+            result['truncated'] = diff_result['truncated']
         
         return result
         
@@ -2228,70 +3382,56 @@ def get_file_metadata(file_path: str, use_data_dir: bool = True) -> Dict[str, An
         else:
             full_path = file_path
         
-        # Check if the path exists
-        if not os.path.exists(full_path):
-            error_msg = f"Path not found: {full_path}"
-            logging.warning(error_msg)
-            return {"error": error_msg}
+        # One lstat (two for symbolic links), with cached owner/group names
+        _flush_appends_below(full_path)
+        return file_metadata(full_path)
         
-        # Get file stats
-        file_stat = os.stat(full_path)
-        file_info = Path(full_path)
+    except FileNotFoundError:
+        error_msg = f"Path not found: {full_path}"
+        logging.warning(error_msg)
+        return {"error": error_msg}
+    except Exception as e:
+        error_msg = f"Error getting metadata for {file_path}: {str(e)}"
+        logging.error(error_msg)
+        return {"error": error_msg}
+
+def get_files_metadata(file_paths: List[str], max_workers: Optional[int] = None, use_data_dir: bool = True) -> Dict[str, Any]:
+    """
+    Gets the metadata of many files at once (see get_file_metadata), in parallel.
+    
+    Prefer it over calling get_file_metadata per file when sweeping a directory.
+    
+    Args:
+        file_paths: Paths of the files or directories. If use_data_dir is True, these should be
+            relative paths within the project data directory.
+        max_workers: Number of paths read in parallel. None (default) picks a value based on the CPU count.
+        use_data_dir: If True (default), prepend the project data directory to the paths.
+            If False, use the paths as provided.
+    
+    Returns:
+        A dictionary containing:
+        - 'files': The metadata of each path, in order (as returned by get_file_metadata).
+          Paths that could not be read have only 'path' and 'error'.
+        - 'total': Number of paths
+        - 'errors': Number of paths that could not be read
+    """
+    try:
+        if use_data_dir:
+            full_paths = [os.path.join(PROJECT_DATA_DIRECTORY, file_path) for file_path in file_paths]
+        else:
+            full_paths = list(file_paths)
         
-        # Get human-readable size
-        def format_size(size_bytes):
-            for unit in ['B', 'KB', 'MB', 'GB', 'TB']:
-                if size_bytes < 1024.0:
-                    return f"{size_bytes:.2f} {unit}"
-                size_bytes /= 1024.0
-            return f"{size_bytes:.2f} PB"
-        
-        # Try to get owner and group (platform dependent)
-        owner = ""
-        group = ""
-        try:
-            if platform.system() != "Windows":
-                # Unix-like systems
-                owner = pwd.getpwuid(file_stat.st_uid).pw_name
-                group = grp.getgrgid(file_stat.st_gid).gr_name
-            else:
-                # Windows systems - these details aren't easily accessible
-                import ctypes
-                try:
-                    # Try to get owner using Windows API, but may not always work
-                    owner = "N/A (Windows)"
-                    group = "N/A (Windows)"
-                except:
-                    owner = "N/A (Windows)"
-                    group = "N/A (Windows)"
-        except Exception as e:
-            # Fallback to numeric IDs
-            owner = str(file_stat.st_uid)
-            group = str(file_stat.st_gid)
-        
-        # Build metadata dictionary
-        metadata = {
-            'name': os.path.basename(full_path),
-            'path': full_path,
-            'size': file_stat.st_size,
-            'size_human': format_size(file_stat.st_size),
-            'created': datetime.fromtimestamp(file_stat.st_ctime).isoformat(),
-            'modified': datetime.fromtimestamp(file_stat.st_mtime).isoformat(),
-            'accessed': datetime.fromtimestamp(file_stat.st_atime).isoformat(),
-            'is_file': os.path.isfile(full_path),
-            'is_dir': os.path.isdir(full_path),
-            'is_symlink': os.path.islink(full_path),
-            'extension': os.path.splitext(full_path)[1].lstrip('.') if os.path.isfile(full_path) else '',
-            'permissions': oct(file_stat.st_mode)[-3:],  # Last 3 digits of octal representation
-            'permissions_full': oct(file_stat.st_mode),
-            'owner': owner,
-            'group': group
+        for full_path in full_paths:
+            _flush_appends_below(full_path)
+        files = files_metadata(full_paths, max_workers)
+        return {
+            'files': files,
+            'total': len(files),
+            'errors': sum(1 for metadata in files if 'error' in metadata)
         }
         
-        return metadata
-        
     except Exception as e:
-        error_msg = f"Error getting metadata for {file_path}: {str(e)}"
+        error_msg = f"Error getting metadata: {str(e)}"
         logging.error(error_msg)
         return {"error": error_msg}
 
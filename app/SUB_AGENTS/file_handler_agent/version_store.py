@@ -0,0 +1,179 @@
+"""Content-addressed, deduplicated on-disk storage of file versions used by file_versioning.
+
+Files are versioned as streams: they are read in fixed-size chunks, and every chunk
+is stored once, zlib-compressed, under the SHA-256 of its content. A version is
+the ordered list of its chunk hashes, recorded in a small SQLite index. Saving an
+unchanged file therefore stores no new data, and versions of files that grow by
+appending (logs, CSV exports, ...) share all chunks but the last.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import tempfile
+import zlib
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from .file_writer import UMASK
+
+CHUNK_SIZE = 1024 * 1024
+
+_COMPRESSION_LEVEL = 6
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS versions (
+    file_path TEXT NOT NULL,
+    name TEXT NOT NULL,
+    timestamp TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    sha256 TEXT NOT NULL,
+    chunks TEXT NOT NULL,
+    PRIMARY KEY (file_path, name)
+);
+"""
+
+
+class VersionStore:
+    """Versions of files, stored below a state directory."""
+
+    def __init__(self, directory: str):
+        """Opens (or creates) the store.
+
+        Args:
+            directory: Directory holding the index database and the 'objects' chunk store.
+        """
+        self.directory = directory
+        self.objects_directory = os.path.join(directory, "objects")
+        os.makedirs(self.objects_directory, exist_ok=True)
+        self._conn = sqlite3.connect(os.path.join(directory, "index.sqlite"), timeout=30)
+        self._conn.executescript(_SCHEMA)
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def __enter__(self) -> "VersionStore":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def _object_path(self, digest: str) -> str:
+        return os.path.join(self.objects_directory, digest[:2], digest[2:])
+
+    def _put_chunk(self, chunk: bytes) -> Tuple[str, bool]:
+        """Stores a chunk unless it is already present. Returns its hash and whether it was new."""
+        digest = hashlib.sha256(chunk).hexdigest()
+        object_path = self._object_path(digest)
+        if os.path.exists(object_path):
+            return digest, False
+        os.makedirs(os.path.dirname(object_path), exist_ok=True)
+        # Write to a temporary file first, so concurrent readers never see partial objects
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(object_path))
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(zlib.compress(chunk, _COMPRESSION_LEVEL))
+            os.replace(temp_path, object_path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+        return digest, True
+
+    def save(self, file_path: str, source_path: str, name: str) -> Dict[str, Any]:
+        """Saves the current content of a file as a new version.
+
+        Args:
+            file_path: The path the version is recorded under.
+            source_path: The file to read (usually the same as file_path).
+            name: Name of the version. An existing version with this name is replaced.
+
+        Returns:
+            The version record ('name', 'timestamp', 'size', 'sha256') with the number
+            of 'new_chunks' and 'reused_chunks'.
+        """
+        chunks = []
+        new_chunks = 0
+        size = 0
+        content_hash = hashlib.sha256()
+        with open(source_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+                digest, is_new = self._put_chunk(chunk)
+                chunks.append(digest)
+                new_chunks += is_new
+                size += len(chunk)
+                content_hash.update(chunk)
+
+        record = {
+            'name': name,
+            'timestamp': datetime.now().isoformat(),
+            'size': size,
+            'sha256': content_hash.hexdigest()
+        }
+        with self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO versions (file_path, name, timestamp, size, sha256, chunks) VALUES (?, ?, ?, ?, ?, ?)",
+                (file_path, name, record['timestamp'], size, record['sha256'], json.dumps(chunks)))
+        record['new_chunks'] = new_chunks
+        record['reused_chunks'] = len(chunks) - new_chunks
+        return record
+
+    def list_versions(self, file_path: str) -> List[Dict[str, Any]]:
+        """Returns the version records of a file, newest first."""
+        rows = self._conn.execute(
+            "SELECT name, timestamp, size, sha256 FROM versions WHERE file_path = ? ORDER BY timestamp DESC, rowid DESC",
+            (file_path,))
+        return [{'name': name, 'timestamp': timestamp, 'size': size, 'sha256': sha256} for name, timestamp, size, sha256 in rows]
+
+    def get_version(self, file_path: str, name: str) -> Optional[Dict[str, Any]]:
+        """Returns the record of one version, or None if it does not exist."""
+        row = self._conn.execute(
+            "SELECT timestamp, size, sha256 FROM versions WHERE file_path = ? AND name = ?",
+            (file_path, name)).fetchone()
+        if row is None:
+            return None
+        return {'name': name, 'timestamp': row[0], 'size': row[1], 'sha256': row[2]}
+
+    def iter_content(self, file_path: str, name: str) -> Iterator[bytes]:
+        """Yields the content of a version chunk by chunk.
+
+        Raises:
+            KeyError: If the version does not exist.
+        """
+        row = self._conn.execute(
+            "SELECT chunks FROM versions WHERE file_path = ? AND name = ?", (file_path, name)).fetchone()
+        if row is None:
+            raise KeyError(name)
+        for digest in json.loads(row[0]):
+            with open(self._object_path(digest), 'rb') as f:
+                yield zlib.decompress(f.read())
+
+    def read_text(self, file_path: str, name: str) -> str:
+        """Returns the content of a version decoded as UTF-8 text."""
+        return b"".join(self.iter_content(file_path, name)).decode('utf-8', errors='replace')
+
+    def restore(self, file_path: str, name: str, target_path: str) -> None:
+        """Writes a version to target_path, atomically replacing the existing file.
+
+        Raises:
+            KeyError: If the version does not exist.
+        """
+        target_directory = os.path.dirname(os.path.abspath(target_path))
+        os.makedirs(target_directory, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=target_directory)
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                for chunk in self.iter_content(file_path, name):
+                    f.write(chunk)
+            if os.path.exists(target_path):
+                os.chmod(temp_path, os.stat(target_path).st_mode & 0o7777)
+            else:
+                # The umask read once at import: querying it here would briefly set
+                # it to 0 for all threads
+                os.chmod(temp_path, 0o666 & ~UMASK)
+            os.replace(temp_path, target_path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
@@ -0,0 +1,169 @@
+"""Single-pass directory tree walker shared by the file handler's directory tools.
+
+The walker is built on os.scandir, so the file type of every entry comes for free
+from the directory listing and its stat information is fetched at most once and
+cached on the entry. Name filtering, depth limits and excluded directories are
+applied before descending, and entries are produced lazily.
+"""
+
+import fnmatch
+import logging
+import os
+import re
+from typing import Callable, Iterable, Iterator, List, Optional
+
+
+class WalkEntry:
+    """A file or directory produced by walk().
+
+    Attributes:
+        path: Full path of the entry.
+        name: Base name of the entry.
+        relpath: Path relative to the walked root directory.
+        depth: Number of directories between the root and the entry (0 for entries
+            directly inside the root).
+    """
+
+    __slots__ = ("_entry", "relpath", "depth")
+
+    def __init__(self, entry: os.DirEntry, relpath: str, depth: int):
+        self._entry = entry
+        self.relpath = relpath
+        self.depth = depth
+
+    @property
+    def path(self) -> str:
+        return self._entry.path
+
+    @property
+    def name(self) -> str:
+        return self._entry.name
+
+    def is_dir(self) -> bool:
+        return self._entry.is_dir()
+
+    def is_file(self) -> bool:
+        return self._entry.is_file()
+
+    def is_symlink(self) -> bool:
+        return self._entry.is_symlink()
+
+    def stat(self, follow_symlinks: bool = True) -> os.stat_result:
+        """Returns the (cached) stat information of the entry."""
+        return self._entry.stat(follow_symlinks=follow_symlinks)
+
+    def __repr__(self) -> str:
+        return f"WalkEntry({self.relpath!r})"
+
+
+def compile_name_filter(pattern: str = "*", use_regex: bool = False) -> Callable[[str], bool]:
+    """Compiles a glob pattern or regular expression into a file name predicate.
+
+    Args:
+        pattern: Glob pattern (default "*") or regular expression if use_regex is True.
+        use_regex: If True, pattern is searched for anywhere in the name (re.search).
+
+    Returns:
+        A function returning True for matching names.
+    """
+    if use_regex:
+        return re.compile(pattern).search
+    if pattern == "*":
+        return lambda name: True
+    glob_regex = re.compile(fnmatch.translate(os.path.normcase(pattern)))
+    return lambda name: glob_regex.match(os.path.normcase(name)) is not None
+
+
+def _list_directory(path: str) -> List[os.DirEntry]:
+    with os.scandir(path) as entries:
+        return list(entries)
+
+
+def walk(root: str, pattern: str = "*", use_regex: bool = False, recursive: bool = True,
+         max_depth: Optional[int] = None, include_files: bool = True, include_dirs: bool = False,
+         sort: bool = False, follow_symlinks: bool = False,
+         exclude_dirs: Optional[Iterable[str]] = None, start_after: Optional[str] = None) -> Iterator[WalkEntry]:
+    """Lazily walks a directory tree in depth-first pre-order.
+
+    Every directory is yielded (if include_dirs is True) before its contents, and its
+    contents are yielded before its next sibling.
+
+    Args:
+        root: The directory to walk.
+        pattern: Glob pattern (or regex if use_regex is True) that file names must match.
+            Directories are not filtered by name.
+        use_regex: If True, treat pattern as a regular expression.
+        recursive: If False, only the entries directly inside root are produced.
+        max_depth: Maximum depth of produced entries (0 = entries directly in root).
+            Deeper directories are never listed. None (default) means no limit.
+        include_files: If True (default), yield files (everything that is not a directory).
+        include_dirs: If True, yield directories as well.
+        sort: If True, entries of each directory are produced sorted by name.
+        follow_symlinks: If True, descend into symbolic links to directories.
+        exclude_dirs: Directories that are neither yielded nor descended into.
+        start_after: Relative path of an entry produced by an earlier sorted walk. The
+            walk resumes right after that entry without listing the directories that
+            precede it, which makes it usable as a pagination cursor. Requires sort.
+
+    Yields:
+        WalkEntry objects.
+
+    Raises:
+        OSError: If the root directory cannot be listed. Errors listing
+            subdirectories are logged and the subdirectory is skipped.
+    """
+    name_matches = compile_name_filter(pattern, use_regex)
+    excluded = {os.path.realpath(d) for d in (exclude_dirs or [])}
+    if not recursive:
+        max_depth = 0
+    if start_after and not sort:
+        raise ValueError("start_after requires sort=True")
+
+    def listing(path, resume):
+        entries = _list_directory(path)
+        if sort:
+            entries.sort(key=lambda e: e.name)
+        if resume:
+            entries = [e for e in entries if e.name >= resume[0]]
+        return iter(entries)
+
+    # Stack of (remaining entries, relative path, depth of the entries, resume position)
+    resume_path = os.path.normpath(start_after).split(os.sep) if start_after else None
+    stack = [(listing(root, resume_path), "", 0, resume_path)]
+    while stack:
+        entries, parent_relpath, depth, resume = stack[-1]
+        entry = next(entries, None)
+        if entry is None:
+            stack.pop()
+            continue
+        relpath = os.path.join(parent_relpath, entry.name) if parent_relpath else entry.name
+
+        # The entry on the resume path was produced by the earlier walk; only its
+        # contents (or the part of them following the resume position) remain
+        child_resume = None
+        resuming = resume is not None and entry.name == resume[0]
+        if resuming:
+            child_resume = resume[1:] or None
+
+        try:
+            is_dir = entry.is_dir()
+        except OSError:
+            is_dir = False
+
+        if not is_dir:
+            if include_files and not resuming and name_matches(entry.name):
+                yield WalkEntry(entry, relpath, depth)
+            continue
+
+        if excluded and os.path.realpath(entry.path) in excluded:
+            continue
+        if include_dirs and not resuming:
+            yield WalkEntry(entry, relpath, depth)
+        if max_depth is not None and depth >= max_depth:
+            continue
+        if entry.is_symlink() and not follow_symlinks:
+            continue
+        try:
+            stack.append((listing(entry.path, child_resume), relpath, depth + 1, child_resume))
+        except OSError as e:
+            logging.warning(f"Could not list directory {entry.path}: {e}")
@@ -0,0 +1,143 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Unit tests for the archive helpers of the file handler agent."""
+
+import os
+import tarfile
+import zipfile
+
+import pytest
+
+from app.SUB_AGENTS.file_handler_agent import archives
+
+
+@pytest.fixture
+def source_files(tmp_path):
+    """A few files of different kinds, as (path, name in the archive) pairs."""
+    source = tmp_path / "source"
+    (source / "nested").mkdir(parents=True)
+    contents = {
+        "text.txt": b"hello archive\n" * 1000,
+        "random.bin": os.urandom(300 * 1024),
+        "image.png": os.urandom(4096),
+        "empty.txt": b"",
+        "nested/deep.txt": "ünïcode\n".encode("utf-8") * 50,
+    }
+    members = []
+    for name, data in contents.items():
+        (source / name).write_bytes(data)
+        members.append((str(source / name), name))
+    return members, contents
+
+
+def _read_tree(directory) -> dict:
+    tree = {}
+    for root, _, files in os.walk(directory):
+        for name in files:
+            path = os.path.join(root, name)
+            with open(path, "rb") as f:
+                tree[os.path.relpath(path, directory).replace(os.sep, "/")] = f.read()
+    return tree
+
+
+@pytest.mark.parametrize("parallel", [True, False])
+@pytest.mark.parametrize("compression_level", [0, 6, 9])
+def test_zip_round_trip(tmp_path, source_files, monkeypatch, parallel: bool, compression_level: int) -> None:
+    members, contents = source_files
+    if not parallel:
+        monkeypatch.setattr(archives, "_can_write_deflated_members", lambda zipf: False)
+    zip_path = tmp_path / "out.zip"
+
+    stats = archives.write_zip(str(zip_path), members, compression_level, max_workers=4)
+
+    assert stats["uncompressed_size"] == sum(len(data) for data in contents.values())
+    with zipfile.ZipFile(zip_path) as zipf:
+        assert zipf.testzip() is None
+        assert zipf.namelist() == [name for _, name in members]
+        stored = [info.filename for info in zipf.infolist() if info.compress_type == zipfile.ZIP_STORED]
+        assert stats["stored_files"] == len(stored)
+        if compression_level:
+            assert "image.png" in stored and "text.txt" not in stored
+        assert {name: zipf.read(name) for name in zipf.namelist()} == contents
+
+
+def test_zip_extraction(tmp_path, source_files) -> None:
+    members, contents = source_files
+    zip_path = tmp_path / "out.zip"
+    archives.write_zip(str(zip_path), members, 6)
+
+    with zipfile.ZipFile(zip_path) as zipf:
+        extracted = archives.extract_zip_members(zipf, zipf.infolist(), str(tmp_path / "extracted"), max_workers=4)
+
+    assert sorted(extracted) == sorted(str(tmp_path / "extracted" / name) for name in contents)
+    assert _read_tree(tmp_path / "extracted") == contents
+
+
+def test_member_filter() -> None:
+    select = archives.compile_member_filter(["*.txt", "data/*.csv"])
+
+    assert select("notes.txt") and select("nested/deep.txt")
+    assert select("data/table.csv") and not select("other/table.csv")
+    assert not select("image.png")
+
+
+@pytest.mark.parametrize("name", ["../escape.txt", "/etc/passwd", "a/../../escape.txt"])
+def test_member_target_path_stays_in_the_output_directory(tmp_path, name: str) -> None:
+    target = archives.member_target_path(str(tmp_path), name)
+
+    assert os.path.commonpath([str(tmp_path), target]) == str(tmp_path)
+
+
+@pytest.mark.parametrize("archive_format", ["tar", "tar.gz", "tar.xz", "tar.zst"])
+def test_tar_round_trip(tmp_path, source_files, monkeypatch, archive_format: str) -> None:
+    if archive_format == "tar.zst" and archives.zstandard is None:
+        pytest.skip("zstandard is not installed")
+    members, contents = source_files
+    # Several compression blocks, so that their concatenation is exercised
+    monkeypatch.setattr(archives, "_COMPRESSION_BLOCK_SIZE", 64 * 1024)
+    directory = os.path.dirname(members[0][0])
+    members = [(os.path.join(directory, "nested"), "nested")] + members
+    archive_path = tmp_path / f"out{archives.ARCHIVE_FORMATS[archive_format]}"
+
+    stats = archives.write_tar(str(archive_path), members, archive_format, max_workers=4)
+
+    assert stats["uncompressed_size"] == sum(len(data) for data in contents.values())
+    assert archives.detect_archive_format(str(archive_path)) == archive_format
+    listed = archives.read_tar(str(archive_path))
+    assert [member["name"] for member in listed] == [name for _, name in members]
+    assert listed[0]["type"] == "directory"
+    archives.read_tar(str(archive_path), str(tmp_path / "extracted"))
+    assert _read_tree(tmp_path / "extracted") == contents
+    if archive_format != "tar.zst":
+        # Readable by the standard library as well
+        with tarfile.open(archive_path, "r:*") as tar:
+            assert tar.extractfile("text.txt").read() == contents["text.txt"]
+
+
+def test_read_tar_selects_members(tmp_path, source_files) -> None:
+    members, contents = source_files
+    archive_path = tmp_path / "out.tar.gz"
+    archives.write_tar(str(archive_path), members, "tar.gz")
+
+    select = archives.compile_member_filter(["*.txt"])
+    listed = archives.read_tar(str(archive_path), str(tmp_path / "extracted"), select=select)
+
+    expected = {name: data for name, data in contents.items() if name.endswith(".txt")}
+    assert sorted(member["name"] for member in listed) == sorted(expected)
+    assert _read_tree(tmp_path / "extracted") == expected
+
+
+def test_unknown_archive_format_is_rejected(tmp_path) -> None:
+    with pytest.raises(ValueError):
+        archives.write_tar(str(tmp_path / "out.rar"), [], "rar")
@@ -0,0 +1,86 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Unit tests for the asyncio variants of the file handler tools."""
+
+import asyncio
+import contextvars
+import inspect
+import threading
+
+from app.SUB_AGENTS.file_handler_agent import tools
+from app.SUB_AGENTS.file_handler_agent.async_tools import BULK_TOOLS, async_tool
+
+request_id = contextvars.ContextVar("request_id", default=None)
+
+
+def test_variant_is_declared_like_the_original() -> None:
+    variant = async_tool(tools.read_file)
+
+    assert inspect.iscoroutinefunction(variant)
+    assert variant.__name__ == "read_file"
+    assert variant.__doc__ == tools.read_file.__doc__
+    assert inspect.signature(variant) == inspect.signature(tools.read_file)
+
+
+def test_bulk_tools_exist() -> None:
+    assert all(callable(getattr(tools, name, None)) for name in BULK_TOOLS)
+
+
+def test_calls_run_on_the_matching_pool_with_the_callers_context() -> None:
+    def read_file(path, suffix=""):
+        return threading.current_thread().name, request_id.get(), path + suffix
+
+    def grep_directory(path):
+        return threading.current_thread().name
+
+    async def main():
+        request_id.set("request-1")
+        return await async_tool(read_file)("a", suffix="!"), await async_tool(grep_directory)("b")
+
+    (io_thread, context_value, result), bulk_thread = asyncio.run(main())
+
+    assert io_thread.startswith("file-handler-io")
+    assert bulk_thread.startswith("file-handler-bulk")
+    assert (context_value, result) == ("request-1", "a!")
+
+
+def test_event_loop_stays_responsive() -> None:
+    release = threading.Event()
+
+    def slow_tool():
+        release.wait(5)
+        return "done"
+
+    async def main():
+        call = asyncio.ensure_future(async_tool(slow_tool)())
+        await asyncio.sleep(0.01)
+        # The loop keeps running while the tool is blocked
+        assert not call.done()
+        release.set()
+        return await call
+
+    assert asyncio.run(main()) == "done"
+
+
+def test_exceptions_are_raised_to_the_caller() -> None:
+    def failing_tool():
+        raise PermissionError("denied")
+
+    async def main():
+        try:
+            await async_tool(failing_tool)()
+        except PermissionError as e:
+            return str(e)
+
+    assert asyncio.run(main()) == "denied"
@@ -0,0 +1,153 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Unit tests for resuming batches of batch_process_files."""
+
+import os
+import sqlite3
+import time
+
+import pytest
+
+from app.SUB_AGENTS.file_handler_agent import tools
+from app.SUB_AGENTS.file_handler_agent.batch_store import DONE, PENDING, BatchStore
+
+
+@pytest.fixture
+def state_directory(tmp_path, monkeypatch):
+    directory = tmp_path / "state"
+    monkeypatch.setattr(tools, "FILE_HANDLER_STATE_DIRECTORY", str(directory))
+    return directory
+
+
+@pytest.fixture
+def data_directory(tmp_path):
+    directory = tmp_path / "data"
+    directory.mkdir()
+    for i in range(6):
+        (directory / f"file{i}.txt").write_text("a-a\n")
+    return directory
+
+
+def _interrupt(state_directory, batch_id: str, from_index: int, owner=None, heartbeat_age: float = 0.0) -> None:
+    """Makes a finished batch look like it stopped before processing the files from from_index on."""
+    with sqlite3.connect(state_directory / "batches.sqlite") as conn:
+        conn.execute("UPDATE items SET status = ?, result = NULL WHERE batch_id = ? AND idx >= ?",
+                     (PENDING, batch_id, from_index))
+        conn.execute("UPDATE batches SET status = 'running', owner = ?, heartbeat_at = ? WHERE batch_id = ?",
+                     (owner, time.time() - heartbeat_age if owner else None, batch_id))
+
+
+def _run(data_directory, operation: str, **kwargs) -> dict:
+    return tools.batch_process_files(str(data_directory), operation, pattern="*.txt", dry_run=False,
+                                     use_data_dir=False, **kwargs)
+
+
+def test_batch_progress_is_recorded(state_directory, data_directory) -> None:
+    result = _run(data_directory, "hash")
+
+    status = tools.get_batch_status(result["batch_id"], include_results=True)
+    assert status["status"] == "completed"
+    assert status["processed"] == status["total"] == 6
+    assert sorted(item["file_name"] for item in status["results"]) == [f"file{i}.txt" for i in range(6)]
+
+
+def test_resumed_transform_does_not_replace_twice(state_directory, data_directory) -> None:
+    operation_args = {"transform_function": "replace", "search_text": "a", "replace_text": "aa"}
+    batch_id = _run(data_directory, "transform", operation_args=operation_args)["batch_id"]
+    # Files 3 to 5 were replaced, but the batch stopped before recording it
+    _interrupt(state_directory, batch_id, 3)
+    assert tools.get_batch_status(batch_id)["status"] == "interrupted"
+
+    result = _run(data_directory, "transform", batch_id=batch_id)
+
+    assert [item.get("status") for item in result["processed_files"][3:]] == ["already_transformed"] * 3
+    assert all((data_directory / f"file{i}.txt").read_text() == "aa-aa\n" for i in range(6))
+    assert tools.get_batch_status(batch_id)["status"] == "completed"
+
+
+def test_resumed_transform_processes_unchanged_files(state_directory, data_directory, monkeypatch) -> None:
+    # The process is killed right after recording the batch
+    with monkeypatch.context() as patch:
+        patch.setattr(tools, "_start_batch", lambda *args, **kwargs: {})
+        _run(data_directory, "transform", operation_args={"transform_function": "uppercase"}, batch_id="killed")
+    assert tools.get_batch_status("killed")["status"] == "running"
+    with sqlite3.connect(state_directory / "batches.sqlite") as conn:
+        conn.execute("UPDATE batches SET heartbeat_at = 0 WHERE batch_id = 'killed'")
+
+    result = _run(data_directory, "transform", batch_id="killed")
+
+    assert [item.get("status") for item in result["processed_files"]] == [None] * 6
+    assert all((data_directory / f"file{i}.txt").read_text() == "A-A\n" for i in range(6))
+
+
+def test_resumed_move_skips_moved_files(state_directory, data_directory, tmp_path) -> None:
+    destination = tmp_path / "moved"
+    batch_id = _run(data_directory, "move", operation_args={"destination": str(destination)})["batch_id"]
+    _interrupt(state_directory, batch_id, 2)
+
+    result = _run(data_directory, "move", batch_id=batch_id)
+
+    assert [item.get("status") for item in result["processed_files"][2:]] == ["already_moved"] * 4
+    assert sorted(os.listdir(destination)) == [f"file{i}.txt" for i in range(6)]
+    assert tools.get_batch_status(batch_id)["failed"] == 0
+
+
+def test_batch_running_in_another_process_is_not_resumed(state_directory, data_directory) -> None:
+    batch_id = _run(data_directory, "hash")["batch_id"]
+    _interrupt(state_directory, batch_id, 0, owner="other-process")
+
+    assert tools.get_batch_status(batch_id)["status"] == "running"
+    assert "already running" in _run(data_directory, "hash", batch_id=batch_id)["error"]
+
+    # Its heartbeat stops: the lease expires and the batch can be taken over
+    _interrupt(state_directory, batch_id, 0, owner="other-process", heartbeat_age=tools.BATCH_LEASE_SECONDS + 1)
+    assert tools.get_batch_status(batch_id)["status"] == "interrupted"
+    assert _run(data_directory, "hash", batch_id=batch_id)["total_processed"] == 6
+    assert tools.get_batch_status(batch_id)["status"] == "completed"
+
+
+def test_resuming_with_another_operation_is_refused(state_directory, data_directory) -> None:
+    batch_id = _run(data_directory, "hash")["batch_id"]
+
+    assert "error" in _run(data_directory, "delete", batch_id=batch_id)
+    assert all((data_directory / f"file{i}.txt").exists() for i in range(6))
+
+
+def test_old_finished_batches_are_pruned(state_directory, data_directory) -> None:
+    old_batch_id = _run(data_directory, "hash")["batch_id"]
+    with sqlite3.connect(state_directory / "batches.sqlite") as conn:
+        conn.execute("UPDATE batches SET updated_at = '2000-01-01T00:00:00' WHERE batch_id = ?", (old_batch_id,))
+
+    new_batch_id = _run(data_directory, "hash")["batch_id"]
+
+    assert "error" in tools.get_batch_status(old_batch_id)
+    assert tools.get_batch_status()["total_batches"] == 1
+    assert tools.get_batch_status(new_batch_id)["status"] == "completed"
+
+
+def test_batch_lease(tmp_path) -> None:
+    with BatchStore(str(tmp_path / "batches.sqlite")) as store:
+        store.create("b", "hash", {}, ["/x", "/y"], owner="first")
+
+        assert not store.acquire("b", "second", lease_seconds=60)
+        assert store.heartbeat("b", "first")
+        assert not store.heartbeat("b", "second")
+
+        store.release("b", "first")
+        assert store.load("b")["owner"] is None
+        assert store.acquire("b", "second", lease_seconds=60)
+        store.record_results("b", [(0, DONE, {"ok": True})])
+        assert store.pending_items("b") == [(1, "/y", None)]
+        store.release("b", "second", "completed")
+        assert store.load("b")["status"] == "completed"
@@ -0,0 +1,149 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Unit tests for the copy engine of the file handler agent."""
+
+import errno
+import os
+import shutil
+import sys
+
+import pytest
+
+from app.SUB_AGENTS.file_handler_agent import copy_engine
+from app.SUB_AGENTS.file_handler_agent.copy_engine import fast_copy, fast_copy_files
+
+linux_only = pytest.mark.skipif(not sys.platform.startswith("linux"), reason="kernel copy mechanisms are Linux-only")
+
+
+@pytest.fixture(autouse=True)
+def forget_unsupported(monkeypatch):
+    monkeypatch.setattr(copy_engine, "_unsupported", {})
+
+
+@pytest.fixture
+def source(tmp_path):
+    path = tmp_path / "source.bin"
+    path.write_bytes(os.urandom(300 * 1024))
+    os.chmod(path, 0o640)
+    os.utime(path, ns=(1_000_000_000, 2_000_000_000))
+    return path
+
+
+def _unsupported(*args, **kwargs):
+    raise OSError(errno.EOPNOTSUPP, "not supported")
+
+
+def test_content_and_metadata_are_copied(source, tmp_path) -> None:
+    target = tmp_path / "target.bin"
+
+    method = fast_copy(str(source), str(target))
+
+    assert method in copy_engine.COPY_METHODS
+    assert target.read_bytes() == source.read_bytes()
+    assert target.stat().st_mode & 0o7777 == 0o640
+    assert target.stat().st_mtime_ns == 2_000_000_000
+
+
+def test_copy_into_a_directory_overwrites(source, tmp_path) -> None:
+    directory = tmp_path / "out"
+    directory.mkdir()
+    (directory / "source.bin").write_bytes(b"old content that is longer than nothing")
+
+    fast_copy(str(source), str(directory), preserve_metadata=False)
+
+    assert (directory / "source.bin").read_bytes() == source.read_bytes()
+    assert (directory / "source.bin").stat().st_mtime_ns != 2_000_000_000
+
+
+def test_same_file_is_rejected(source) -> None:
+    with pytest.raises(shutil.SameFileError):
+        fast_copy(str(source), str(source))
+    assert source.stat().st_size == 300 * 1024
+
+
+@linux_only
+@pytest.mark.parametrize("unsupported, expected", [
+    (["reflink"], "copy_file_range"),
+    (["reflink", "copy_file_range"], "sendfile"),
+    (["reflink", "copy_file_range", "sendfile"], "buffered"),
+])
+def test_unsupported_mechanisms_fall_through(source, tmp_path, monkeypatch, unsupported: list, expected: str) -> None:
+    monkeypatch.setattr(copy_engine, "_reflink", _unsupported)
+    if "copy_file_range" in unsupported:
+        monkeypatch.setattr(os, "copy_file_range", _unsupported, raising=False)
+    if "sendfile" in unsupported:
+        monkeypatch.setattr(os, "sendfile", _unsupported)
+    target = tmp_path / "target.bin"
+
+    assert fast_copy(str(source), str(target)) == expected
+    assert target.read_bytes() == source.read_bytes()
+    assert all(copy_engine._is_unsupported((source.stat().st_dev, target.stat().st_dev), method)
+               for method in unsupported)
+
+
+@linux_only
+def test_mechanism_failing_midway_is_continued(source, tmp_path, monkeypatch) -> None:
+    monkeypatch.setattr(copy_engine, "_reflink", _unsupported)
+    monkeypatch.setattr(copy_engine, "_KERNEL_COPY_SIZE", 64 * 1024)
+    copy_file_range = os.copy_file_range
+    calls = []
+
+    def fail_after_first_call(*args):
+        calls.append(args)
+        if len(calls) > 1:
+            raise OSError(errno.EXDEV, "cross-device")
+        return copy_file_range(*args)
+
+    monkeypatch.setattr(os, "copy_file_range", fail_after_first_call)
+    target = tmp_path / "target.bin"
+
+    assert fast_copy(str(source), str(target)) == "sendfile"
+    assert target.read_bytes() == source.read_bytes()
+
+
+@linux_only
+def test_real_errors_are_raised(source, tmp_path, monkeypatch) -> None:
+    def no_space(*args):
+        raise OSError(errno.ENOSPC, "no space left")
+
+    monkeypatch.setattr(copy_engine, "_reflink", _unsupported)
+    monkeypatch.setattr(os, "copy_file_range", no_space)
+
+    with pytest.raises(OSError) as error:
+        fast_copy(str(source), str(tmp_path / "target.bin"))
+    assert error.value.errno == errno.ENOSPC
+
+
+@linux_only
+def test_files_reporting_a_size_of_zero_are_copied(tmp_path) -> None:
+    target = tmp_path / "version"
+
+    fast_copy("/proc/version", str(target), preserve_metadata=False)
+
+    with open("/proc/version", "rb") as f:
+        assert target.read_bytes() == f.read()
+
+
+def test_fast_copy_files_keeps_the_order_and_reports_errors(tmp_path) -> None:
+    pairs = []
+    for i in range(6):
+        (tmp_path / f"{i}.txt").write_text(str(i))
+        pairs.append((str(tmp_path / f"{i}.txt"), str(tmp_path / f"{i}.copy")))
+    pairs.insert(2, (str(tmp_path / "missing.txt"), str(tmp_path / "missing.copy")))
+
+    results = fast_copy_files(pairs, max_workers=3)
+
+    assert isinstance(results[2], FileNotFoundError)
+    assert all(isinstance(result, str) for i, result in enumerate(results) if i != 2)
+    assert [(tmp_path / f"{i}.copy").read_text() for i in range(6)] == [str(i) for i in range(6)]
@@ -0,0 +1,165 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Unit tests for the persistent snapshots of detect_file_changes."""
+
+import os
+
+import pytest
+
+from app.SUB_AGENTS.file_handler_agent import snapshot_store, tools
+from app.SUB_AGENTS.file_handler_agent.snapshot_store import SnapshotStore, scan_settings, scan_tree
+
+SETTINGS = scan_settings("*", False, True, None)
+
+
+@pytest.fixture
+def tree(tmp_path):
+    root = tmp_path / "tree"
+    (root / "sub" / "deeper").mkdir(parents=True)
+    (root / "a.txt").write_text("a")
+    (root / "sub" / "b.txt").write_text("b")
+    (root / "sub" / "deeper" / "c.log").write_text("c")
+    return root
+
+
+@pytest.fixture
+def state_directory(tmp_path, monkeypatch):
+    directory = tmp_path / "state"
+    monkeypatch.setattr(tools, "FILE_HANDLER_STATE_DIRECTORY", str(directory))
+    return directory
+
+
+def _advance_mtime(path) -> None:
+    """Moves the mtime of a changed entry past the timestamp granularity of the file system."""
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+
+def _scan(root, **kwargs):
+    return scan_tree(str(root), SETTINGS, lambda name: True, **kwargs)
+
+
+def test_scan_tree_records_files_and_directories(tree) -> None:
+    snapshot, stats = _scan(tree)
+
+    assert set(snapshot.files) == {"a.txt", os.path.join("sub", "b.txt"), os.path.join("sub", "deeper", "c.log")}
+    assert set(snapshot.dirs) == {"", "sub", os.path.join("sub", "deeper")}
+    assert stats == {"dirs_listed": 3, "dirs_reused": 0, "files_checked": 3}
+
+
+def test_scan_tree_respects_filter_and_depth(tree) -> None:
+    snapshot, _ = scan_tree(str(tree), SETTINGS, lambda name: name.endswith(".txt"), max_depth=1)
+
+    assert set(snapshot.files) == {"a.txt", os.path.join("sub", "b.txt")}
+
+
+def test_unchanged_directories_are_not_listed_again(tree, monkeypatch) -> None:
+    previous, _ = _scan(tree)
+    (tree / "sub" / "new.txt").write_text("new")
+    _advance_mtime(tree / "sub")
+    listed = []
+    scandir = os.scandir
+    monkeypatch.setattr(snapshot_store.os, "scandir", lambda path: listed.append(path) or scandir(path))
+
+    snapshot, stats = _scan(tree, previous=previous)
+
+    assert listed == [os.path.join(str(tree), "sub")]
+    assert stats["dirs_reused"] == 2
+    assert os.path.join("sub", "new.txt") in snapshot.files
+    assert snapshot.files["a.txt"] == previous.files["a.txt"]
+
+
+def test_trusted_directory_mtimes_skip_file_stats(tree) -> None:
+    previous, _ = _scan(tree)
+
+    snapshot, stats = _scan(tree, previous=previous, trust_directory_mtime=True)
+
+    assert stats["files_checked"] == 0
+    assert snapshot.files == previous.files
+
+
+def test_store_round_trip(tree, tmp_path) -> None:
+    first, _ = _scan(tree)
+    (tree / "a.txt").unlink()
+    (tree / "d.txt").write_text("d")
+    _advance_mtime(tree)
+    second, _ = _scan(tree, previous=first)
+
+    with SnapshotStore(str(tmp_path / "state" / "snapshots.sqlite")) as store:
+        store.save("root", first)
+        store.save("root", second, first)
+        loaded = store.load("root")
+        assert (loaded.settings, loaded.files, loaded.dirs) == (second.settings, second.files, second.dirs)
+        assert store.delete("root")
+        assert store.load("root") is None
+
+
+def _detect(root, action, **kwargs) -> dict:
+    return tools.detect_file_changes(str(root), action, use_data_dir=False, **kwargs)
+
+
+def test_detect_file_changes(tree, state_directory) -> None:
+    assert _detect(tree, "scan")["files_tracked"] == 3
+    (tree / "a.txt").write_text("changed")
+    (tree / "sub" / "b.txt").unlink()
+    (tree / "sub" / "new.txt").write_text("new")
+    _advance_mtime(tree / "sub")
+
+    result = _detect(tree, "check")
+
+    assert result["changed_files"] == [str(tree / "a.txt")]
+    assert result["deleted_files"] == [str(tree / "sub" / "b.txt")]
+    assert result["new_files"] == [str(tree / "sub" / "new.txt")]
+    assert _detect(tree, "check")["total_changes"] == 0
+
+
+def test_touched_files_are_told_apart_with_verify_content(tree, state_directory) -> None:
+    _detect(tree, "scan", verify_content=True)
+    _advance_mtime(tree / "a.txt")
+
+    result = _detect(tree, "check", verify_content=True)
+
+    assert result["touched_files"] == [str(tree / "a.txt")]
+    assert result["changed_files"] == []
+
+
+def test_file_deleted_while_hashing_is_reported_deleted(tree, state_directory, monkeypatch) -> None:
+    _detect(tree, "scan", verify_content=True)
+    (tree / "a.txt").write_text("changed")
+    file_digest = snapshot_store.file_digest
+
+    def delete_then_hash(path):
+        if path.endswith("a.txt"):
+            os.unlink(path)
+        return file_digest(path)
+
+    monkeypatch.setattr(tools, "file_digest", delete_then_hash)
+    result = _detect(tree, "check", verify_content=True)
+
+    assert result["deleted_files"] == [str(tree / "a.txt")]
+    assert result["changed_files"] == []
+    assert result["files_tracked"] == 2
+
+
+def test_unreadable_file_is_reported_changed(tree, state_directory, monkeypatch) -> None:
+    _detect(tree, "scan", verify_content=True)
+    (tree / "a.txt").write_text("changed")
+
+    def unreadable(path):
+        raise PermissionError(path)
+
+    monkeypatch.setattr(tools, "file_digest", unreadable)
+    result = _detect(tree, "check", verify_content=True)
+
+    assert result["changed_files"] == [str(tree / "a.txt")]
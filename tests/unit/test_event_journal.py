@@ -0,0 +1,126 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Unit tests for the event journal of watch_directory."""
+
+from types import SimpleNamespace
+
+import pytest
+
+from app.SUB_AGENTS.file_handler_agent import tools
+from app.SUB_AGENTS.file_handler_agent.event_journal import EventJournal
+
+
+def _event(event_type: str, path: str = "/data/a.txt") -> dict:
+    return {"type": event_type, "path": path}
+
+
+def _types(journal: EventJournal, since_seq: int = 0) -> list:
+    return [(event["type"], event["path"]) for event in journal.events_since(since_seq)["events"]]
+
+
+def test_events_are_numbered_and_polled_incrementally() -> None:
+    journal = EventJournal(debounce_seconds=0)
+    for i in range(3):
+        journal.add(_event("deleted", f"/data/{i}"))
+
+    delta = journal.events_since(1)
+
+    assert [event["seq"] for event in delta["events"]] == [2, 3]
+    assert (delta["last_seq"], delta["latest_seq"], delta["missed_events"]) == (3, 3, 0)
+    assert journal.events_since(3)["events"] == []
+
+
+def test_dropped_events_are_reported_missed() -> None:
+    journal = EventJournal(max_events=5, debounce_seconds=0)
+    for i in range(20):
+        journal.add(_event("deleted", f"/data/{i}"))
+
+    delta = journal.events_since(0)
+
+    assert [event["seq"] for event in delta["events"]] == [16, 17, 18, 19, 20]
+    assert delta["missed_events"] == 15
+
+
+def test_dropped_events_are_read_back_from_the_journal_file(tmp_path) -> None:
+    journal = EventJournal(max_events=5, debounce_seconds=0, journal_path=str(tmp_path / "journal.jsonl"))
+    for i in range(20):
+        journal.add(_event("deleted", f"/data/{i}"))
+
+    delta = journal.events_since(0)
+    limited = journal.events_since(3, limit=4)
+    journal.close()
+
+    assert [event["seq"] for event in delta["events"]] == list(range(1, 21))
+    assert delta["missed_events"] == 0
+    assert [event["seq"] for event in limited["events"]] == [4, 5, 6, 7]
+    reopened = EventJournal(debounce_seconds=0, journal_path=str(tmp_path / "journal.jsonl"))
+    assert reopened.last_seq == 20
+    reopened.close()
+
+
+def test_modify_bursts_are_debounced() -> None:
+    journal = EventJournal(debounce_seconds=60)
+    journal.add(_event("created"))
+    for _ in range(5):
+        journal.add(_event("modified"))
+    journal.add(_event("modified", "/data/b.txt"))
+
+    assert journal.events_since(0)["events"] == []
+    journal.commit_pending()
+
+    assert _types(journal) == [("created", "/data/a.txt"), ("modified", "/data/b.txt")]
+    assert journal.coalesced_count == 5
+
+
+def test_other_events_end_a_burst() -> None:
+    journal = EventJournal(debounce_seconds=60)
+    journal.add(_event("modified"))
+    journal.add(_event("deleted"))
+
+    assert _types(journal) == [("modified", "/data/a.txt"), ("deleted", "/data/a.txt")]
+
+
+def test_access_events_do_not_end_a_burst() -> None:
+    journal = EventJournal(debounce_seconds=60)
+    for _ in range(3):
+        for event_type in ("opened", "modified", "closed"):
+            journal.add(_event(event_type))
+    journal.add(_event("closed_no_write"))
+    journal.commit_pending()
+
+    assert [event_type for event_type, _ in _types(journal)] == ["opened", "closed"] * 3 + ["closed_no_write", "modified"]
+    assert journal.coalesced_count == 2
+
+
+@pytest.fixture
+def observer(tmp_path, monkeypatch):
+    monkeypatch.setattr(tools, "FILE_HANDLER_STATE_DIRECTORY", str(tmp_path / "state"))
+    started = tools.watch_directory(str(tmp_path), "start", observer_id="test", max_events=5,
+                                    persist_journal=True, use_data_dir=False)
+    assert "error" not in started
+    yield tools._active_observers["test"]["handler"]
+    tools._active_observers.pop("test", None)
+
+
+def test_stop_returns_the_persisted_events(tmp_path, observer) -> None:
+    for i in range(20):
+        observer.on_any_event(SimpleNamespace(event_type="deleted", src_path=str(tmp_path / f"{i}"), is_directory=False))
+    observer.on_any_event(SimpleNamespace(event_type="modified", src_path=str(tmp_path / "a"), is_directory=False))
+
+    result = tools.watch_directory(str(tmp_path), "stop", observer_id="test", use_data_dir=False)
+
+    assert result["event_count"] == 21
+    assert result["missed_events"] == 0
+    assert result["events"][-1]["type"] == "modified"
+    assert "test" not in tools._active_observers
@@ -0,0 +1,141 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Unit tests for the streaming line diff behind compare_files."""
+
+import difflib
+import random
+
+import pytest
+
+from app.SUB_AGENTS.file_handler_agent import file_diff, tools
+from app.SUB_AGENTS.file_handler_agent.file_diff import (
+    NO_NEWLINE_MARKER,
+    first_difference,
+    get_opcodes,
+    matching_blocks,
+    unified_diff,
+)
+
+
+def _write(path, lines) -> str:
+    path.write_bytes("".join(lines).encode("utf-8"))
+    return str(path)
+
+
+def _apply(a: list, b: list, opcodes) -> list:
+    result = []
+    for tag, i1, i2, j1, j2 in opcodes:
+        if tag == "equal":
+            assert a[i1:i2] == b[j1:j2]
+            result.extend(a[i1:i2])
+        else:
+            result.extend(b[j1:j2])
+    return result
+
+
+def _lcs_length(a: list, b: list) -> int:
+    previous = [0] * (len(b) + 1)
+    for x in a:
+        current = [0]
+        for j, y in enumerate(b):
+            current.append(previous[j] + 1 if x == y else max(previous[j + 1], current[j]))
+        previous = current
+    return previous[-1]
+
+
+@pytest.mark.parametrize("algorithm", ["patience", "myers"])
+@pytest.mark.parametrize("seed", range(20))
+def test_opcodes_transform_a_into_b(algorithm: str, seed: int) -> None:
+    rng = random.Random(seed)
+    a = [rng.randrange(8) for _ in range(rng.randrange(40))]
+    b = [value for value in a if rng.random() > 0.2]
+    for _ in range(rng.randrange(10)):
+        b.insert(rng.randrange(len(b) + 1), rng.randrange(8))
+
+    opcodes = get_opcodes(matching_blocks(a, b, algorithm), len(a), len(b))
+
+    assert _apply(a, b, opcodes) == b
+    if algorithm == "myers":
+        # Myers' diff is minimal
+        assert sum(i2 - i1 for tag, i1, i2, _, _ in opcodes if tag == "equal") == _lcs_length(a, b)
+
+
+def test_unified_diff_matches_difflib(tmp_path) -> None:
+    a = [f"line {i}\n" for i in range(100)]
+    b = a[:10] + ["inserted\n"] + a[10:50] + a[52:90] + ["changed 90\n"] + a[91:]
+
+    result = unified_diff(_write(tmp_path / "a.txt", a), _write(tmp_path / "b.txt", b), "a", "b")
+
+    assert result["diff"] == [line.rstrip("\n") for line in difflib.unified_diff(a, b, "a", "b")]
+    assert (result["lines_added"], result["lines_removed"], result["hunk_count"]) == (2, 3, 3)
+    assert (result["file1_lines"], result["file2_lines"]) == (100, 99)
+
+
+def test_max_lines_truncates_whole_hunks(tmp_path) -> None:
+    a = [f"line {i}\n" for i in range(100)]
+    b = list(a)
+    for i in (10, 50, 90):
+        b[i] = f"changed {i}\n"
+
+    result = unified_diff(_write(tmp_path / "a.txt", a), _write(tmp_path / "b.txt", b), max_lines=10)
+
+    assert result["truncated"]
+    assert result["hunk_count"] == 3
+    assert sum(line.startswith("@@") for line in result["diff"]) == 1
+
+
+def test_line_ending_changes_are_shown(tmp_path) -> None:
+    path1 = _write(tmp_path / "lf.txt", ["one\n", "two\n"])
+    path2 = _write(tmp_path / "crlf.txt", ["one\r\n", "two\r\n"])
+
+    result = unified_diff(path1, path2, "lf", "crlf")
+
+    assert result["hunk_count"] == 1
+    assert result["diff"][2:] == ["@@ -1,2 +1,2 @@", "-one", "-two", "+one\r", "+two\r"]
+    assert unified_diff(path1, path2, ignore_line_endings=True)["diff"] == []
+
+
+def test_missing_final_newline_is_marked(tmp_path) -> None:
+    path1 = _write(tmp_path / "a.txt", ["one\n", "two\n"])
+    path2 = _write(tmp_path / "b.txt", ["one\n", "two"])
+
+    result = unified_diff(path1, path2, "a", "b")
+
+    assert result["diff"][2:] == ["@@ -1,2 +1,2 @@", " one", "-two", "+two", NO_NEWLINE_MARKER]
+    assert unified_diff(path1, path2, ignore_line_endings=True)["diff"] == []
+
+
+def test_first_difference(tmp_path, monkeypatch) -> None:
+    monkeypatch.setattr(file_diff, "_COMPARE_CHUNK_SIZE", 7)
+    path1 = tmp_path / "a.bin"
+    path2 = tmp_path / "b.bin"
+    path1.write_bytes(b"0123456789" * 3)
+
+    path2.write_bytes(b"0123456789" * 3)
+    assert first_difference(str(path1), str(path2)) is None
+    path2.write_bytes(b"0123456789" * 2 + b"012x456789")
+    assert first_difference(str(path1), str(path2)) == 23
+    path2.write_bytes(b"0123456789" * 2)
+    assert first_difference(str(path1), str(path2)) == 20
+
+
+def test_compare_files_reports_line_ending_differences(tmp_path) -> None:
+    path1 = _write(tmp_path / "lf.txt", ["one\n", "two\n"])
+    path2 = _write(tmp_path / "crlf.txt", ["one\r\n", "two\r\n"])
+
+    result = tools.compare_files(path1, path2, show_diff=True, use_data_dir=False)
+    ignored = tools.compare_files(path1, path2, show_diff=True, ignore_line_endings=True, use_data_dir=False)
+
+    assert (result["identical"], result["first_difference_offset"], result["diff_count"]) == (False, 3, 4)
+    assert (ignored["identical"], ignored["diff"], ignored["hunk_count"]) == (False, [], 0)
@@ -0,0 +1,72 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Unit tests for the file metadata collection of the file handler agent."""
+
+import os
+
+import pytest
+
+from app.SUB_AGENTS.file_handler_agent import tools
+from app.SUB_AGENTS.file_handler_agent.file_metadata import file_metadata, files_metadata, format_size
+
+
+@pytest.fixture
+def files(tmp_path):
+    (tmp_path / "data.csv").write_bytes(b"x" * 2048)
+    os.chmod(tmp_path / "data.csv", 0o640)
+    (tmp_path / "sub").mkdir()
+    os.symlink(tmp_path / "data.csv", tmp_path / "link")
+    os.symlink(tmp_path / "missing", tmp_path / "broken")
+    return tmp_path
+
+
+def test_regular_file(files) -> None:
+    metadata = file_metadata(str(files / "data.csv"))
+
+    assert (metadata["name"], metadata["size"], metadata["size_human"]) == ("data.csv", 2048, "2.00 KB")
+    assert (metadata["is_file"], metadata["is_dir"], metadata["is_symlink"]) == (True, False, False)
+    assert (metadata["extension"], metadata["permissions"]) == ("csv", "640")
+    pwd = pytest.importorskip("pwd")
+    assert metadata["owner"] == pwd.getpwuid(os.getuid()).pw_name
+
+
+def test_directory_and_symbolic_links(files) -> None:
+    directory = file_metadata(str(files / "sub"))
+    link = file_metadata(str(files / "link"))
+
+    assert (directory["is_dir"], directory["is_file"], directory["extension"]) == (True, False, "")
+    assert (link["is_symlink"], link["is_file"], link["size"]) == (True, True, 2048)
+    with pytest.raises(FileNotFoundError):
+        file_metadata(str(files / "broken"))
+
+
+def test_files_metadata_keeps_the_order_and_reports_errors(files) -> None:
+    paths = [str(files / name) for name in ["data.csv", "missing", "sub", "broken", "link"]]
+
+    results = files_metadata(paths, max_workers=3)
+
+    assert [result["path"] for result in results] == paths
+    assert [("error" in result) for result in results] == [False, True, False, True, False]
+
+
+def test_get_files_metadata(files) -> None:
+    result = tools.get_files_metadata([str(files / "data.csv"), str(files / "missing")], use_data_dir=False)
+
+    assert (result["total"], result["errors"]) == (2, 1)
+    assert result["files"][0]["size"] == 2048
+
+
+@pytest.mark.parametrize("size, expected", [(0, "0.00 B"), (1023, "1023.00 B"), (1536, "1.50 KB"), (5 * 1024**5, "5.00 PB")])
+def test_format_size(size: int, expected: str) -> None:
+    assert format_size(size) == expected
@@ -0,0 +1,216 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Unit tests for the append sessions and atomic writes of the file handler agent."""
+
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+from app.SUB_AGENTS.file_handler_agent import file_writer
+from app.SUB_AGENTS.file_handler_agent.file_writer import AppendSessions, atomic_write
+
+requires_proc_fd = pytest.mark.skipif(
+    not sys.platform.startswith("linux"), reason="counts open descriptors in /proc/self/fd"
+)
+
+
+def _open_fds() -> int:
+    return len(os.listdir("/proc/self/fd"))
+
+
+def _wait_for(condition, timeout: float = 5.0) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.01)
+    return condition()
+
+
+@pytest.fixture
+def sessions():
+    return AppendSessions(flush_seconds=0.05)
+
+
+def test_buffered_appends_are_written_on_flush(tmp_path, sessions) -> None:
+    path = tmp_path / "log.txt"
+    path.write_bytes(b"start\n")
+
+    sessions.append(str(path), b"one\n", "buffered")
+    sessions.append(str(path), b"two\n", "buffered")
+
+    assert sessions.pending_size(str(path)) == 8
+    assert sessions.flush(str(path)) == 8
+    assert sessions.pending_size(str(path)) == 0
+    assert path.read_bytes() == b"start\none\ntwo\n"
+
+
+def test_buffered_appends_are_written_by_the_background_thread(tmp_path, sessions) -> None:
+    path = tmp_path / "log.txt"
+    path.write_bytes(b"")
+
+    sessions.append(str(path), b"later\n", "buffered")
+
+    assert _wait_for(lambda: path.read_bytes() == b"later\n")
+
+
+def test_full_buffer_is_written_immediately(tmp_path) -> None:
+    sessions = AppendSessions(buffer_size=10, flush_seconds=60)
+    path = tmp_path / "log.txt"
+    path.write_bytes(b"")
+
+    sessions.append(str(path), b"12345", "buffered")
+    assert path.read_bytes() == b""
+    sessions.append(str(path), b"67890", "buffered")
+    assert path.read_bytes() == b"1234567890"
+
+
+def test_modes_keep_the_call_order(tmp_path, sessions) -> None:
+    path = tmp_path / "log.txt"
+    path.write_bytes(b"")
+
+    sessions.append(str(path), b"a", "buffered")
+    sessions.append(str(path), b"b", "flush")
+    assert path.read_bytes() == b"ab"
+    sessions.append(str(path), b"c", "buffered")
+    sessions.append(str(path), b"d", "fsync")
+    assert path.read_bytes() == b"abcd"
+
+
+def test_fsync_appends_are_fsynced_before_returning(tmp_path, sessions, monkeypatch) -> None:
+    path = tmp_path / "log.txt"
+    path.write_bytes(b"")
+    fsynced = []
+    real_fsync = os.fsync
+    monkeypatch.setattr(os, "fsync", lambda fd: (fsynced.append(os.fstat(fd).st_size), real_fsync(fd)))
+
+    sessions.append(str(path), b"flushed", "flush")
+    assert fsynced == []
+    sessions.append(str(path), b"synced", "fsync")
+    assert fsynced == [13]
+
+
+def test_concurrent_fsync_appends_are_all_written(tmp_path, sessions) -> None:
+    path = tmp_path / "log.txt"
+    path.write_bytes(b"")
+
+    def append(worker):
+        for i in range(20):
+            sessions.append(str(path), f"{worker}:{i}\n".encode(), "fsync")
+
+    threads = [threading.Thread(target=append, args=(worker,)) for worker in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    lines = path.read_bytes().decode().splitlines()
+    assert sorted(lines) == sorted(f"{worker}:{i}" for worker in range(8) for i in range(20))
+    for worker in range(8):
+        assert [line for line in lines if line.startswith(f"{worker}:")] == [f"{worker}:{i}" for i in range(20)]
+
+
+def test_appending_to_a_missing_file_fails(tmp_path, sessions) -> None:
+    with pytest.raises(FileNotFoundError):
+        sessions.append(str(tmp_path / "missing.txt"), b"x", "flush")
+
+
+def test_replaced_file_is_reopened(tmp_path, sessions) -> None:
+    path = tmp_path / "log.txt"
+    path.write_bytes(b"old\n")
+    sessions.append(str(path), b"one\n", "flush")
+
+    replacement = tmp_path / "new.txt"
+    replacement.write_bytes(b"new\n")
+    os.replace(replacement, path)
+    sessions.append(str(path), b"two\n", "flush")
+
+    assert path.read_bytes() == b"new\ntwo\n"
+
+
+@requires_proc_fd
+@pytest.mark.parametrize("durability", ["flush", "fsync"])
+def test_idle_files_are_closed(tmp_path, sessions, monkeypatch, durability: str) -> None:
+    monkeypatch.setattr(file_writer, "_IDLE_CLOSE_SECONDS", 0.0)
+    baseline = _open_fds()
+    paths = [tmp_path / f"file{i}.txt" for i in range(50)]
+    for path in paths:
+        path.write_bytes(b"")
+        sessions.append(str(path), b"x", durability)
+
+    assert _wait_for(lambda: _open_fds() <= baseline)
+    assert all(path.read_bytes() == b"x" for path in paths)
+
+
+@requires_proc_fd
+def test_open_files_are_bounded(tmp_path, sessions, monkeypatch) -> None:
+    monkeypatch.setattr(file_writer, "MAX_OPEN_SESSIONS", 4)
+    monkeypatch.setattr(file_writer, "_IDLE_CLOSE_SECONDS", 3600.0)
+    baseline = _open_fds()
+    for i in range(20):
+        path = tmp_path / f"file{i}.txt"
+        path.write_bytes(b"")
+        sessions.append(str(path), b"x", "flush")
+
+    # The least recently used files were closed to make room for the others
+    assert _open_fds() - baseline <= 4
+
+
+@requires_proc_fd
+def test_close_writes_buffered_content_and_releases_the_file(tmp_path, sessions) -> None:
+    directory = tmp_path / "dir"
+    directory.mkdir()
+    baseline = _open_fds()
+    paths = [directory / f"file{i}.txt" for i in range(3)]
+    for path in paths:
+        path.write_bytes(b"")
+        sessions.append(str(path), b"flushed,", "flush")
+        sessions.append(str(path), b"buffered", "buffered")
+    assert _open_fds() == baseline + 3
+
+    sessions.close(str(paths[0]))
+    assert paths[0].read_bytes() == b"flushed,buffered"
+    assert _open_fds() == baseline + 2
+
+    sessions.close(str(directory))
+    assert all(path.read_bytes() == b"flushed,buffered" for path in paths)
+    assert _open_fds() == baseline
+
+    # Appending again opens a new session
+    sessions.append(str(paths[0]), b"!", "flush")
+    assert paths[0].read_bytes() == b"flushed,buffered!"
+
+
+def test_atomic_write_replaces_content_and_keeps_permissions(tmp_path) -> None:
+    path = tmp_path / "config.txt"
+    path.write_bytes(b"old content")
+    os.chmod(path, 0o640)
+
+    atomic_write(str(path), b"new")
+
+    assert path.read_bytes() == b"new"
+    assert path.stat().st_mode & 0o777 == 0o640
+    assert os.listdir(tmp_path) == ["config.txt"]
+
+
+def test_atomic_write_creates_files_with_the_umask(tmp_path) -> None:
+    path = tmp_path / "new.txt"
+
+    atomic_write(str(path), b"data", fsync=False)
+
+    assert path.read_bytes() == b"data"
+    assert path.stat().st_mode & 0o777 == 0o666 & ~file_writer.UMASK
@@ -0,0 +1,86 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Unit tests for find_duplicate_files."""
+
+import os
+
+from app.SUB_AGENTS.file_handler_agent import tools
+
+
+def _find(root, **kwargs) -> dict:
+    return tools.find_duplicate_files(str(root), use_data_dir=False, **kwargs)
+
+
+def test_duplicates_are_grouped(tmp_path) -> None:
+    big = os.urandom(64 * 1024)
+    (tmp_path / "sub").mkdir()
+    for name in ["a.bin", "sub/b.bin", "sub/c.bin"]:
+        (tmp_path / name).write_bytes(big)
+    # Same size and edges as the copies above, different middle
+    (tmp_path / "d.bin").write_bytes(big[:30000] + bytes([big[30000] ^ 1]) + big[30001:])
+    (tmp_path / "small1.txt").write_text("same")
+    (tmp_path / "small2.txt").write_text("same")
+    (tmp_path / "unique.txt").write_text("unique")
+    (tmp_path / "empty1.txt").write_text("")
+    (tmp_path / "empty2.txt").write_text("")
+
+    result = _find(tmp_path, edge_size=1024)
+
+    assert [group["files"] for group in result["duplicate_groups"]] == [
+        sorted(str(tmp_path / name) for name in ["a.bin", "sub/b.bin", "sub/c.bin"]),
+        [str(tmp_path / "small1.txt"), str(tmp_path / "small2.txt")],
+    ]
+    assert result["reclaimable_bytes"] == 2 * len(big) + 4
+    assert result["total_duplicate_files"] == 3
+    assert result["total_files_scanned"] == 7
+    assert result["stats"] == {"partially_hashed": 4, "fully_hashed": 6, "hard_links_skipped": 0}
+
+
+def test_hard_links_are_not_duplicates(tmp_path) -> None:
+    (tmp_path / "a.txt").write_text("content")
+    os.link(tmp_path / "a.txt", tmp_path / "b.txt")
+
+    result = _find(tmp_path)
+
+    assert result["duplicate_groups"] == []
+    assert result["stats"]["hard_links_skipped"] == 1
+
+
+def test_pattern_and_recursion(tmp_path) -> None:
+    (tmp_path / "sub").mkdir()
+    for name in ["a.txt", "b.log", "sub/c.txt"]:
+        (tmp_path / name).write_text("same")
+
+    assert _find(tmp_path, pattern="*.txt")["total_duplicate_files"] == 1
+    assert _find(tmp_path, recursive=False)["total_duplicate_files"] == 1
+
+
+def test_file_deleted_during_the_scan_is_skipped(tmp_path, monkeypatch) -> None:
+    for name in ["a.txt", "b.txt", "c.txt"]:
+        (tmp_path / name).write_text("same")
+    hash_files = tools.hash_files
+
+    def delete_then_hash(paths, *args, **kwargs):
+        os.unlink(tmp_path / "c.txt")
+        return hash_files(paths, *args, **kwargs)
+
+    monkeypatch.setattr(tools, "hash_files", delete_then_hash)
+    result = _find(tmp_path)
+
+    assert [group["files"] for group in result["duplicate_groups"]] == [[str(tmp_path / "a.txt"), str(tmp_path / "b.txt")]]
+
+
+def test_invalid_arguments(tmp_path) -> None:
+    assert "error" in _find(tmp_path, hash_algorithm="crc32")
+    assert "error" in _find(tmp_path / "missing")
@@ -0,0 +1,83 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Unit tests for the parallel grep engine of the file handler agent."""
+
+import re
+
+import pytest
+
+from app.SUB_AGENTS.file_handler_agent.grep_engine import LineMatcher, iter_matches
+
+CONTENT = "alpha beta\nGamma délta\n\ntrailing space \nã éè\nend"
+
+
+def _expected(path: str, pattern: str, use_regex: bool, case_sensitive: bool) -> list:
+    """Line by line re.search, the reference for both the text and the mmap paths."""
+    regex = re.compile(pattern if use_regex else re.escape(pattern), 0 if case_sensitive else re.IGNORECASE)
+    with open(path, encoding="utf-8") as f:
+        lines = f.read().split("\n")
+    return [(number, line) for number, line in enumerate(lines, 1) if regex.search(line)]
+
+
+@pytest.mark.parametrize(
+    "pattern, use_regex, case_sensitive",
+    [
+        ("beta", False, True),
+        ("gamma", False, False),
+        ("délta", False, True),
+        ("DÉLTA", False, False),
+        (r"a\s", True, True),
+        (r"\s$", True, True),
+        (r"[^a-z ]", True, True),
+        (r"[éè]", True, True),
+        (r"a\Z", True, True),
+        (r"^$", True, True),
+        (r"^\w+$", True, True),
+    ],
+)
+def test_matches_are_per_line(tmp_path, pattern: str, use_regex: bool, case_sensitive: bool) -> None:
+    path = tmp_path / "file.txt"
+    path.write_bytes(CONTENT.encode("utf-8"))
+    matcher = LineMatcher(pattern, use_regex=use_regex, case_sensitive=case_sensitive)
+
+    matches = [(match["line_number"], match["line_content"]) for match in matcher.iter_file(str(path))]
+
+    assert matches == _expected(str(path), pattern, use_regex, case_sensitive)
+
+
+def test_results_are_in_file_order_and_truncated_deterministically(tmp_path) -> None:
+    paths = []
+    for i in range(40):
+        path = tmp_path / f"file{i:02d}.txt"
+        path.write_text("".join(f"match {i} {line}\n" for line in range(i % 5)))
+        paths.append(str(path))
+    matcher = LineMatcher("match")
+
+    runs = []
+    for _ in range(5):
+        matches = iter_matches(paths, matcher, max_workers=8, max_matches_per_file=3)
+        runs.append([(m["file_path"], m["line_number"]) for _, m in zip(range(30), matches)])
+
+    expected = [(path, line) for i, path in enumerate(paths) for line in range(1, min(i % 5, 3) + 1)][:30]
+    assert all(run == expected for run in runs)
+
+
+def test_unreadable_files_are_skipped(tmp_path) -> None:
+    path = tmp_path / "file.txt"
+    path.write_text("needle\n")
+    matcher = LineMatcher("needle")
+
+    matches = list(iter_matches([str(tmp_path / "missing.txt"), str(path)], matcher))
+
+    assert [match["file_path"] for match in matches] == [str(path)]
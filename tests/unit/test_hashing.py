@@ -0,0 +1,99 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Unit tests for the parallel hashing engine of the file handler agent."""
+
+import hashlib
+import os
+import time
+
+import pytest
+
+from app.SUB_AGENTS.file_handler_agent import hashing
+from app.SUB_AGENTS.file_handler_agent.hashing import hash_file, hash_file_edges, hash_files, new_hasher
+
+
+@pytest.fixture(autouse=True)
+def empty_cache(monkeypatch):
+    monkeypatch.setattr(hashing, "_hash_cache", type(hashing._hash_cache)())
+
+
+def _old_file(path, data: bytes):
+    """Writes a file with an mtime old enough for its digest to be memoized."""
+    path.write_bytes(data)
+    old = time.time() - 60
+    os.utime(path, (old, old))
+    return path
+
+
+@pytest.mark.parametrize("algorithm", hashing.HASHLIB_ALGORITHMS)
+@pytest.mark.parametrize("size", [0, 1, hashing._READ_BUFFER_SIZE + 7])
+def test_digests_match_hashlib(tmp_path, algorithm: str, size: int) -> None:
+    data = os.urandom(size)
+    path = tmp_path / "data.bin"
+    path.write_bytes(data)
+
+    assert hash_file(str(path), algorithm) == (hashlib.new(algorithm, data).hexdigest(), size, False)
+
+
+def test_unknown_algorithm_is_rejected() -> None:
+    with pytest.raises(ValueError):
+        new_hasher("crc32")
+
+
+def test_unchanged_files_are_served_from_the_cache(tmp_path) -> None:
+    path = _old_file(tmp_path / "data.txt", b"first")
+    hash_file(str(path))
+
+    assert hash_file(str(path))[2]
+    assert not hash_file(str(path), use_cache=False)[2]
+
+    _old_file(path, b"second content")
+    digest, size, cached = hash_file(str(path))
+    assert (digest, size, cached) == (hashlib.md5(b"second content").hexdigest(), 14, False)
+
+
+def test_recently_modified_files_are_not_memoized(tmp_path) -> None:
+    path = tmp_path / "data.txt"
+    path.write_bytes(b"fresh")
+    hash_file(str(path))
+
+    assert not hash_file(str(path))[2]
+
+
+def test_edge_hashes_tell_apart_sizes_and_edges(tmp_path) -> None:
+    a = tmp_path / "a.bin"
+    b = tmp_path / "b.bin"
+    a.write_bytes(b"x" * 100 + b"middle" + b"y" * 100)
+    b.write_bytes(b"x" * 100 + b"MIDDLE" + b"y" * 100)
+
+    assert hash_file_edges(str(a), 16) == hash_file_edges(str(b), 16)
+    b.write_bytes(b"x" * 100 + b"middle" + b"y" * 99 + b"z")
+    assert hash_file_edges(str(a), 16) != hash_file_edges(str(b), 16)
+    b.write_bytes(b"x" * 100 + b"middle!" + b"y" * 100)
+    assert hash_file_edges(str(a), 16) != hash_file_edges(str(b), 16)
+
+
+def test_hash_files_keeps_the_order_and_reports_errors(tmp_path) -> None:
+    paths = []
+    for i in range(10):
+        path = tmp_path / f"{i}.txt"
+        path.write_text(str(i))
+        paths.append(str(path))
+    paths.insert(3, str(tmp_path / "missing.txt"))
+
+    results = hash_files(paths, "sha256", max_workers=4)
+
+    assert isinstance(results[3], FileNotFoundError)
+    del results[3]
+    assert [digest for digest, _, _ in results] == [hashlib.sha256(str(i).encode()).hexdigest() for i in range(10)]
@@ -0,0 +1,38 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Unit tests for the row limit pushed into BigQuery queries."""
+
+import pytest
+
+from app.SUB_AGENTS.data_science.sub_agents.bigquery.tools import limit_query
+
+
+@pytest.mark.parametrize(
+    "sql, expected",
+    [
+        ("SELECT * FROM `p.d.t`", "SELECT * FROM `p.d.t` LIMIT 80"),
+        ("SELECT * FROM p.d.t LIMIT 1000", "SELECT * FROM p.d.t LIMIT 80"),
+        ("SELECT * FROM p.d.t LIMIT 5;", "SELECT * FROM p.d.t LIMIT 5;"),
+        # Only the top-level LIMIT counts, and a trailing comment stays last
+        (
+            "SELECT a FROM (SELECT a FROM p.d.t LIMIT 1000) -- c",
+            "SELECT a FROM (SELECT a FROM p.d.t LIMIT 1000) LIMIT 80 -- c",
+        ),
+        ("SELECT limit_value FROM p.d.t", "SELECT limit_value FROM p.d.t LIMIT 80"),
+        # Several statements are left alone
+        ("SELECT 1; SELECT 2", "SELECT 1; SELECT 2"),
+    ],
+)
+def test_limit_query(sql: str, expected: str) -> None:
+    assert limit_query(sql, 80) == expected
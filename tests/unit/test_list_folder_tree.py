@@ -0,0 +1,77 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Unit tests for the pagination and summaries of list_folder_tree."""
+
+import pytest
+
+from app.SUB_AGENTS.file_handler_agent import tools
+
+
+@pytest.fixture
+def tree(tmp_path):
+    root = tmp_path / "tree"
+    for relpath, size in [("a.txt", 1), ("b/c.txt", 10), ("b/d/e.txt", 100), ("b/d/f.txt", 1000), ("g/h.txt", 5)]:
+        path = root / relpath
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(b"x" * size)
+    return root
+
+
+def _list(root, **kwargs):
+    return tools.list_folder_tree(str(root), use_data_dir=False, **kwargs)
+
+
+@pytest.mark.parametrize("page_size", [1, 3, 100])
+def test_pages_cover_the_whole_tree(tree, page_size: int) -> None:
+    entries = []
+    cursor = None
+    while True:
+        result = _list(tree, page_size=page_size, cursor=cursor)
+        assert len(result["entries"]) <= page_size
+        entries.extend(result["entries"])
+        cursor = result["next_cursor"]
+        if cursor is None:
+            break
+
+    assert sorted(entries, key=lambda item: item["path"]) == sorted(_list(tree), key=lambda item: item["path"])
+
+
+def test_fields_and_depth(tree) -> None:
+    result = _list(tree, page_size=100, fields=["path", "size"], max_depth=0)
+
+    assert result["entries"] == [{"path": "a.txt", "size": 1}, {"path": "b", "size": (tree / "b").stat().st_size},
+                                 {"path": "g", "size": (tree / "g").stat().st_size}]
+
+
+def test_invalid_arguments_are_rejected(tree) -> None:
+    assert isinstance(_list(tree, fields=["owner"]), ValueError)
+    assert isinstance(_list(tree, page_size=0), ValueError)
+    assert isinstance(_list(tree / "missing"), FileNotFoundError)
+
+
+def test_summaries_include_subdirectories(tree) -> None:
+    summaries = {summary["path"]: summary for summary in _list(tree, summary_only=True)["summaries"]}
+
+    assert summaries["."] == {"path": ".", "file_count": 5, "dir_count": 3, "total_size": 1116}
+    assert summaries["b"] == {"path": "b", "file_count": 3, "dir_count": 1, "total_size": 1110}
+    assert summaries["b/d"] == {"path": "b/d", "file_count": 2, "dir_count": 0, "total_size": 1100}
+
+
+def test_summaries_are_paginated_and_depth_limited(tree) -> None:
+    first = _list(tree, summary_only=True, page_size=2, max_depth=0)
+    second = _list(tree, summary_only=True, page_size=2, max_depth=0, cursor=first["next_cursor"])
+
+    assert [summary["path"] for summary in first["summaries"]] == [".", "b"]
+    assert [summary["path"] for summary in second["summaries"]] == ["g"]
+    assert second["next_cursor"] is None
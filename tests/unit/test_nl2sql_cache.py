@@ -0,0 +1,69 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Unit tests for the NL2SQL cache of the BigQuery agent."""
+
+import pytest
+
+from app.SUB_AGENTS.data_science.sub_agents.bigquery.nl2sql_cache import (
+    NL2SQLCache,
+    normalize_question,
+)
+
+
+@pytest.mark.parametrize(
+    "question, expected",
+    [
+        ("  How many   Orders were placed?? ", "how many orders were placed"),
+        ("Sales for 'ACME  Corp' in 2024.", "sales for 'ACME  Corp' in 2024"),
+        ('Top ＡＢＣ customers named "Smith"!', 'top abc customers named "Smith"'),
+    ],
+)
+def test_normalize_question(question: str, expected: str) -> None:
+    assert normalize_question(question) == expected
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return NL2SQLCache(str(tmp_path / "nl2sql.sqlite"), max_entries=2, ttl_seconds=60, similarity=0.5)
+
+
+def test_exact_and_normalized_hits(cache) -> None:
+    fingerprint = NL2SQLCache.fingerprint("CREATE TABLE t (a INT64)", "model", 0.1, "baseline")
+    cache.put("How many orders?", fingerprint, "SELECT COUNT(*) FROM t")
+
+    assert cache.get("how many   ORDERS", fingerprint) == "SELECT COUNT(*) FROM t"
+    other = NL2SQLCache.fingerprint("CREATE TABLE t (a INT64, b INT64)", "model", 0.1, "baseline")
+    assert cache.get("How many orders?", other) is None
+
+
+def test_literals_must_match(cache) -> None:
+    fingerprint = NL2SQLCache.fingerprint("ddl", "model", 0.1, "baseline")
+    cache.put("Orders of customer 'ACME' in 2024", fingerprint, "SELECT 1")
+
+    assert cache.get("orders of customer 'ACME' in 2024", fingerprint) == "SELECT 1"
+    assert cache.get("Orders of customer 'acme' in 2024", fingerprint) is None
+    assert cache.get("Orders of customer 'ACME' in 2023", fingerprint) is None
+    # A near-duplicate with the same literals
+    assert cache.get("Show the orders of customer 'ACME' in 2024", fingerprint) == "SELECT 1"
+
+
+def test_least_recently_used_entries_are_evicted(cache) -> None:
+    fingerprint = NL2SQLCache.fingerprint("ddl", "model", 0.1, "baseline")
+    cache.put("first question 1", fingerprint, "SELECT 1")
+    cache.put("second question 2", fingerprint, "SELECT 2")
+    cache.get("first question 1", fingerprint)
+    cache.put("third question 3", fingerprint, "SELECT 3")
+
+    assert cache.get("second question 2", fingerprint) is None
+    assert cache.get("first question 1", fingerprint) == "SELECT 1"
@@ -0,0 +1,85 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Unit tests for the result cache of run_bigquery_validation."""
+
+import pytest
+
+from app.SUB_AGENTS.data_science.sub_agents.bigquery.query_cache import (
+    QueryResultCache,
+    canonicalize_sql,
+)
+
+
+def test_canonicalize_sql_ignores_formatting_and_alias_names() -> None:
+    first = canonicalize_sql("select a from p.d.t as x where x.b = 1")
+    second = canonicalize_sql("SELECT a\n  FROM p.d.t AS y\n WHERE y.b=1")
+
+    assert first is not None
+    assert first == second
+    assert first[1] == [("p", "d", "t")]
+
+
+def test_canonicalize_sql_keeps_aliases_that_name_the_row() -> None:
+    canonical, _ = canonicalize_sql("SELECT t FROM p.d.table1 AS t")
+
+    assert "__alias" not in canonical
+
+
+def test_canonicalize_sql_skips_ctes() -> None:
+    assert canonicalize_sql("WITH c AS (SELECT 1 AS a) SELECT a FROM c") == (
+        "WITH c AS (SELECT 1 AS a) SELECT a FROM c",
+        [],
+    )
+
+
+@pytest.mark.parametrize(
+    "sql",
+    [
+        "SELECT RAND() FROM p.d.t",
+        "SELECT CURRENT_TIMESTAMP()",
+        "SELECT * FROM t",
+        "SELECT * FROM p.d.`t*`",
+        "SELECT * FROM p.d.INFORMATION_SCHEMA.TABLES",
+        "SELECT * FROM p.d.t TABLESAMPLE SYSTEM (1 PERCENT)",
+        "SELECT 1; SELECT 2",
+        "SELECT FROM WHERE",
+    ],
+)
+def test_canonicalize_sql_rejects_uncacheable_queries(sql: str) -> None:
+    assert canonicalize_sql(sql) is None
+
+
+def test_query_result_cache_returns_copies_and_evicts() -> None:
+    cache = QueryResultCache(max_bytes=200, ttl_seconds=60)
+    key = cache.key("SELECT 1", [("p.d.t", "1")], 80)
+
+    cache.put(key, {"rows": [1, 2, 3]})
+    result = cache.get(key)
+    result["rows"].append(4)
+
+    assert cache.get(key) == {"rows": [1, 2, 3]}
+    assert cache.key("SELECT 1", [("p.d.t", "2")], 80) != key
+
+    for i in range(10):
+        cache.put(f"other{i}", {"rows": ["x" * 20]})
+    assert cache.get(key) is None
+    assert cache.stats()["bytes"] <= 200
+    assert cache.stats()["evictions"] > 0
+
+
+def test_query_result_cache_expires_entries() -> None:
+    cache = QueryResultCache(max_bytes=1000, ttl_seconds=0)
+    cache.put("key", {"rows": []})
+
+    assert cache.get("key") is None
@@ -0,0 +1,88 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Unit tests for the ranged and paged reads of read_file."""
+
+import pytest
+
+from app.SUB_AGENTS.file_handler_agent import tools
+
+LINES = [f"line {number}\n" for number in range(1, 2501)]
+
+
+@pytest.fixture
+def text_file(tmp_path, monkeypatch):
+    monkeypatch.setattr(tools, "LINE_INDEX_STRIDE", 100)
+    monkeypatch.setattr(tools, "_line_index_cache", type(tools._line_index_cache)())
+    path = tmp_path / "lines.txt"
+    path.write_text("".join(LINES))
+    return path
+
+
+def _read(path, **kwargs) -> dict:
+    return tools.read_file(str(path), use_data_dir=False, **kwargs)
+
+
+def test_byte_range(text_file) -> None:
+    data = text_file.read_bytes()
+
+    result = _read(text_file, offset=10, length=25)
+
+    assert result["content"] == data[10:35].decode()
+    assert (result["offset"], result["next_offset"], result["eof"]) == (10, 35, False)
+    assert _read(text_file, offset=len(data) - 5)["eof"]
+
+
+@pytest.mark.parametrize("start_line, end_line", [(1, 1), (99, 102), (1000, 1000), (2400, None), (None, 3), (2490, 9999)])
+def test_line_range(text_file, start_line, end_line) -> None:
+    first = start_line or 1
+    last = min(end_line or len(LINES), len(LINES))
+
+    result = _read(text_file, start_line=start_line, end_line=end_line)
+
+    assert result["content"] == "".join(LINES[first - 1:last])
+    assert (result["start_line"], result["end_line"], result["total_lines"]) == (first, last, len(LINES))
+    assert result["eof"] == (last == len(LINES))
+
+
+def test_line_index_is_rebuilt_when_the_file_changes(text_file) -> None:
+    assert _read(text_file, start_line=2500)["content"] == LINES[-1]
+
+    text_file.write_text("".join(LINES) + "extra line")
+
+    result = _read(text_file, start_line=2501)
+    assert result["content"] == "extra line"
+    assert result["total_lines"] == len(LINES) + 1
+
+
+@pytest.mark.parametrize("start_line, end_line", [(0, None), (5, 4), (2501, None)])
+def test_invalid_line_range(text_file, start_line, end_line) -> None:
+    assert "error" in _read(text_file, start_line=start_line, end_line=end_line)
+
+
+def test_pages_cover_the_file_on_line_boundaries(text_file) -> None:
+    pages = []
+    result = _read(text_file, page_size=1000)
+    while True:
+        pages.append(result["content"])
+        if result["continuation_token"] is None:
+            break
+        result = _read(text_file, page_size=1000, continuation_token=result["continuation_token"])
+
+    assert result["eof"]
+    assert "".join(pages) == "".join(LINES)
+    assert all(page.endswith("\n") and len(page.encode()) <= 1000 for page in pages)
+
+
+def test_modes_cannot_be_combined(text_file) -> None:
+    assert "error" in _read(text_file, offset=0, start_line=1)
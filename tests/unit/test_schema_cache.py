@@ -0,0 +1,113 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Unit tests for the on-disk DDL cache of get_bigquery_schema."""
+
+import datetime
+from types import SimpleNamespace
+
+import pytest
+
+from app.SUB_AGENTS.data_science.sub_agents.bigquery import schema_cache, tools
+from app.SUB_AGENTS.data_science.sub_agents.bigquery.schema_cache import SchemaCache
+
+
+@pytest.fixture
+def cache_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(schema_cache, "SCHEMA_CACHE_DIR", str(tmp_path))
+    return tmp_path
+
+
+def test_entries_are_reused_while_the_table_is_unmodified(cache_dir) -> None:
+    SchemaCache("p", "d").save({"t": {"modified": "2025-01-01", "ddl": "CREATE TABLE t"}})
+
+    cache = SchemaCache("p", "d")
+
+    assert cache.get("t", "2025-01-01") == "CREATE TABLE t"
+    assert cache.get("t", "2025-02-01") is None
+    assert cache.get("other", "2025-01-01") is None
+    assert SchemaCache("p", "other_dataset").get("t", "2025-01-01") is None
+
+
+def test_unreadable_cache_is_ignored(cache_dir) -> None:
+    (cache_dir / "p.d.json").write_text("{not json")
+
+    cache = SchemaCache("p", "d")
+
+    assert cache.entries == {}
+    cache.save({"t": {"modified": "", "ddl": "ddl"}})
+    assert SchemaCache("p", "d").get("t", "") == "ddl"
+
+
+class _FakeClient:
+    """The parts of bigquery.Client used by get_bigquery_schema."""
+
+    def __init__(self, tables: dict):
+        self.tables = tables
+        self.rows_listed = []
+
+    def _table(self, table_id):
+        table_type, modified = self.tables[table_id]
+        return SimpleNamespace(
+            table_id=table_id,
+            table_type=table_type,
+            reference=f"p.d.{table_id}",
+            modified=datetime.datetime(2025, 1, modified) if modified else None,
+            schema=[SimpleNamespace(name="id", field_type="INT64", mode="NULLABLE", description=None)],
+        )
+
+    def list_tables(self, dataset_ref):
+        return [SimpleNamespace(table_id=table_id, table_type=self.tables[table_id][0], reference=table_id)
+                for table_id in self.tables]
+
+    def get_table(self, reference):
+        return self._table(reference)
+
+    def list_rows(self, table_obj, max_results):
+        self.rows_listed.append(table_obj.table_id)
+        return SimpleNamespace(to_dataframe=lambda: SimpleNamespace(empty=True))
+
+
+def test_only_modified_tables_are_fetched_again(cache_dir) -> None:
+    client = _FakeClient({"a": ("TABLE", 1), "b": ("TABLE", 1), "v": ("VIEW", 1)})
+    first = tools.get_bigquery_schema("d", client=client, project_id="p")
+
+    client.tables["b"] = ("TABLE", 2)
+    client.rows_listed = []
+    second = tools.get_bigquery_schema("d", client=client, project_id="p")
+
+    assert first == second
+    assert first.index("`p.d.a`") < first.index("`p.d.b`")
+    assert "p.d.v" not in first
+    assert client.rows_listed == ["b"]
+
+
+def test_dropped_tables_leave_the_cache(cache_dir) -> None:
+    client = _FakeClient({"a": ("TABLE", 1), "b": ("TABLE", 1)})
+    tools.get_bigquery_schema("d", client=client, project_id="p")
+
+    del client.tables["b"]
+    ddl = tools.get_bigquery_schema("d", client=client, project_id="p")
+
+    assert "p.d.b" not in ddl
+    assert set(SchemaCache("p", "d").entries) == {"a"}
+
+
+def test_cache_can_be_bypassed(cache_dir) -> None:
+    client = _FakeClient({"a": ("TABLE", 1)})
+    tools.get_bigquery_schema("d", client=client, project_id="p")
+    client.rows_listed = []
+
+    tools.get_bigquery_schema("d", client=client, project_id="p", use_cache=False)
+
+    assert client.rows_listed == ["a"]
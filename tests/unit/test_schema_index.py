@@ -0,0 +1,92 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Unit tests for the question-dependent pruning of NL2SQL schemas."""
+
+import pytest
+
+from app.SUB_AGENTS.data_science.sub_agents.bigquery import schema_index
+from app.SUB_AGENTS.data_science.sub_agents.bigquery.schema_index import SchemaIndex, _tokens, prune_schema
+
+
+def _ddl(table: str, columns: list, example: str = "") -> str:
+    """DDL in the format generated by get_bigquery_schema."""
+    ddl = f"CREATE OR REPLACE TABLE `p.d.{table}` (\n"
+    ddl += ",\n".join(f"  `{name}` {column_type}" for name, column_type in columns)
+    ddl += "\n);\n\n"
+    if example:
+        ddl += f"-- Example values for table `p.d.{table}`:\nINSERT INTO `p.d.{table}` VALUES\n({example});\n\n"
+    return ddl
+
+
+TABLES = {
+    "customers": _ddl("customers", [("customer_id", "INT64"), ("name", "STRING"), ("country", "STRING")], "1,'Ada','France'"),
+    "orders": _ddl("orders", [("order_id", "INT64"), ("customer_id", "INT64"), ("order_date", "DATE")]),
+    "order_items": _ddl("order_items", [("order_id", "INT64"), ("product_id", "INT64"), ("quantity", "INT64")]),
+    "products": _ddl("products", [("product_id", "INT64"), ("productName", "STRING"), ("price", "FLOAT64")]),
+    "weather": _ddl("weather", [("station", "STRING"), ("temperature", "FLOAT64")]),
+}
+SCHEMA = "".join(TABLES.values())
+
+
+def _selected(index: SchemaIndex, question: str, top_k: int) -> list:
+    return [index.tables[i].name.rsplit(".", 1)[-1] for i in index.select(question, top_k)]
+
+
+def test_tokens_split_names_and_drop_stopwords() -> None:
+    assert _tokens("What are the orderDate and customer_id of all Orders?") == ["order", "date", "customer", "id", "order"]
+    assert _tokens("HTTPServer class") == ["http", "server", "class"]
+
+
+def test_tables_are_ranked_by_the_question() -> None:
+    index = SchemaIndex(SCHEMA)
+
+    assert [table.name for table in index.tables] == [f"p.d.{table}" for table in TABLES]
+    assert _selected(index, "average temperature per station", 1) == ["weather"]
+    assert _selected(index, "customers from France", 1) == ["customers"]
+
+
+def test_tables_joining_the_selected_ones_are_added() -> None:
+    index = SchemaIndex(SCHEMA)
+
+    # orders shares customer_id with customers and order_id with order_items
+    assert _selected(index, "quantity sold per country", 2) == ["customers", "orders", "order_items"]
+    # No table shares a key with both customers and products
+    assert _selected(index, "customer names and product price", 2) == ["customers", "products"]
+
+
+def test_small_schemas_are_kept_whole() -> None:
+    assert SchemaIndex(SCHEMA).pruned_schema("weather", top_k=5) == SCHEMA
+    assert prune_schema(SCHEMA, "") == SCHEMA
+    assert prune_schema("", "weather") == ""
+
+
+def test_pruned_schema_keeps_the_selected_ddl(monkeypatch) -> None:
+    monkeypatch.setattr(schema_index, "SCHEMA_TOP_K", 1)
+
+    assert prune_schema(SCHEMA, "temperature by station") == TABLES["weather"]
+
+
+def test_wide_tables_keep_relevant_columns_and_keys(monkeypatch) -> None:
+    monkeypatch.setattr(schema_index, "SCHEMA_MAX_COLUMNS", 3)
+    wide = _ddl("events", [("event_id", "INT64"), ("customer_id", "INT64")] + [(f"metric{i}", "INT64") for i in range(10)]
+                + [("revenue", "FLOAT64")], "1,2,3")
+    index = SchemaIndex(TABLES["customers"] + wide)
+
+    pruned = index.pruned_schema("revenue of customers", top_k=2)
+
+    assert "`revenue` FLOAT64" in pruned and "`customer_id` INT64" in pruned
+    assert "metric" not in pruned
+    assert "INSERT INTO `p.d.events`" not in pruned
+    assert "-- 11 columns not relevant to the question are omitted" in pruned
+    assert pruned.startswith(TABLES["customers"])
@@ -0,0 +1,77 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Unit tests for the trigram search index of the file handler agent."""
+
+import pytest
+
+from app.SUB_AGENTS.file_handler_agent.search_index import (
+    TrigramIndex,
+    extract_trigrams,
+    required_literals,
+)
+
+
+@pytest.mark.parametrize(
+    "pattern, expected",
+    [
+        ("hello world", ["hello world"]),
+        (r"foo\.bar", ["foo.bar"]),
+        (r"error: \d+ files", ["error: ", " files"]),
+        ("abcd?efg", ["abc", "efg"]),
+        ("abc*defg", ["defg"]),
+        ("abc{2,3}defg", ["defg"]),
+        ("start[0-9]+end", ["start", "end"]),
+        ("(group)outside", ["outside"]),
+        ("one|two", []),
+        ("ab", []),
+    ],
+)
+def test_required_literals(pattern: str, expected: list) -> None:
+    assert required_literals(pattern) == expected
+
+
+@pytest.mark.parametrize(
+    "pattern, expected",
+    [
+        (r"foo\x41bar", ["foo", "bar"]),
+        (r"foo\u00e9bar", ["foo", "bar"]),
+        (r"foo\U0001F600bar", ["foo", "bar"]),
+        (r"foo\N{LATIN SMALL LETTER E WITH ACUTE}bar", ["foo", "bar"]),
+        (r"(foo)\1234bar", ["bar"]),
+    ],
+)
+def test_required_literals_skips_escape_arguments(pattern: str, expected: list) -> None:
+    assert required_literals(pattern) == expected
+
+
+def test_trigrams_do_not_span_lines() -> None:
+    assert extract_trigrams(["abc\n", "de\n"]) == {"abc"}
+
+
+def test_candidates_are_pruned_and_refreshed(tmp_path) -> None:
+    directory = tmp_path / "data"
+    directory.mkdir()
+    (directory / "a.txt").write_text("the quick brown fox\n")
+    (directory / "b.txt").write_text("lazy dog\n")
+    (directory / "c.bin").write_bytes(b"quick\0brown")
+
+    with TrigramIndex(str(directory), str(tmp_path / "index.sqlite")) as index:
+        assert index.refresh()["added"] == 3
+        assert index.candidates(["quick"]) == [str(directory / "a.txt")]
+        assert index.candidates([]) == [str(directory / "a.txt"), str(directory / "b.txt")]
+
+        (directory / "b.txt").write_text("a quick dog, longer than before\n")
+        stats = index.refresh()
+        assert stats["updated"] == 1 and stats["unchanged"] == 2
+        assert index.candidates(["quick"]) == [str(directory / "a.txt"), str(directory / "b.txt")]
@@ -0,0 +1,97 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Unit tests for the streaming text transforms of batch_process_files."""
+
+import re
+
+import pytest
+
+from app.SUB_AGENTS.file_handler_agent.text_transform import transform_file
+
+
+def _transform(tmp_path, content: str, chunk_size: int, **kwargs) -> tuple:
+    path = tmp_path / "input.txt"
+    path.write_bytes(content.encode("utf-8"))
+    stats = transform_file(str(path), chunk_size=chunk_size, **kwargs)
+    return path.read_bytes().decode("utf-8"), stats
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 7, 64, 1024 * 1024])
+@pytest.mark.parametrize(
+    "search_text, replace_text",
+    [
+        ("needle", "thread"),
+        ("aa", "a"),
+        ("a", "aa"),
+        ("needle\nhay", "joined"),
+    ],
+)
+def test_literal_replace_matches_re_subn(tmp_path, chunk_size: int, search_text: str, replace_text: str) -> None:
+    content = "hay needle hay\nneedle\nhay aaaa needle" * 5
+    expected, count = re.subn(re.escape(search_text), lambda match: replace_text, content)
+
+    output, stats = _transform(
+        tmp_path, content, chunk_size,
+        transform_function="replace", search_text=search_text, replace_text=replace_text,
+    )
+
+    assert output == expected
+    assert stats["replacements"] == count
+    assert stats["modified"] == (count > 0)
+
+
+@pytest.mark.parametrize("chunk_size", [1, 5, 16, 1024 * 1024])
+@pytest.mark.parametrize(
+    "pattern, replacement",
+    [
+        (r"(\w+)@(\w+)\.com", r"\2 at \1"),
+        (r"\d+", "#"),
+        (r"(?P<key>\w+)=(?P<value>\w+)", r"\g<value>=\g<key>"),
+        (r"^hay", "HAY"),
+        (r"x*", "-"),
+    ],
+)
+def test_regex_replace_matches_re_subn(tmp_path, chunk_size: int, pattern: str, replacement: str) -> None:
+    content = "hay user@example.com 12 key=value\nhay 345 other@host.com\n" * 4
+    expected, count = re.subn(pattern, replacement, content)
+
+    output, stats = _transform(
+        tmp_path, content, chunk_size,
+        transform_function="replace", search_text=pattern, replace_text=replacement, use_regex=True,
+    )
+
+    assert output == expected
+    assert stats["replacements"] == count
+
+
+@pytest.mark.parametrize("chunk_size", [1, 3, 1024])
+def test_case_conversion_across_chunks(tmp_path, chunk_size: int) -> None:
+    content = "ΟΔΟΣ Straße\r\nMixed Case ΣΑΣ\n"
+
+    output, stats = _transform(tmp_path, content, chunk_size, transform_function="lowercase")
+
+    assert output == content.lower()
+    assert stats["modified"]
+
+
+def test_unchanged_file_is_not_replaced(tmp_path) -> None:
+    path = tmp_path / "input.txt"
+    path.write_text("nothing to do\n")
+    inode = path.stat().st_ino
+
+    stats = transform_file(str(path), "replace", search_text="absent", replace_text="x")
+
+    assert not stats["modified"]
+    assert path.stat().st_ino == inode
+    assert [p.name for p in tmp_path.iterdir()] == ["input.txt"]
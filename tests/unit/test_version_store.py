@@ -0,0 +1,92 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Unit tests for the deduplicated version store of file_versioning."""
+
+import os
+
+import pytest
+
+from app.SUB_AGENTS.file_handler_agent import version_store
+from app.SUB_AGENTS.file_handler_agent.file_writer import UMASK
+from app.SUB_AGENTS.file_handler_agent.version_store import VersionStore
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    monkeypatch.setattr(version_store, "CHUNK_SIZE", 16)
+    with VersionStore(str(tmp_path / "versions")) as store:
+        yield store
+
+
+def _objects(store: VersionStore) -> int:
+    return sum(len(files) for _, _, files in os.walk(store.objects_directory))
+
+
+def test_save_and_read_back(store, tmp_path) -> None:
+    path = tmp_path / "data.txt"
+    path.write_bytes(b"0123456789abcdef" * 3 + b"tail")
+
+    record = store.save(str(path), str(path), "v1")
+
+    assert (record["size"], record["new_chunks"], record["reused_chunks"]) == (52, 2, 2)
+    assert b"".join(store.iter_content(str(path), "v1")) == path.read_bytes()
+    assert store.get_version(str(path), "v1")["sha256"] == record["sha256"]
+    assert store.get_version(str(path), "missing") is None
+
+
+def test_appended_versions_share_chunks(store, tmp_path) -> None:
+    path = tmp_path / "log.txt"
+    path.write_bytes(b"a" * 16 + b"b" * 16)
+    store.save(str(path), str(path), "v1")
+    with open(path, "ab") as f:
+        f.write(b"c" * 16)
+
+    record = store.save(str(path), str(path), "v2")
+
+    assert (record["new_chunks"], record["reused_chunks"]) == (1, 2)
+    assert _objects(store) == 3
+    assert [version["name"] for version in store.list_versions(str(path))] == ["v2", "v1"]
+    assert store.read_text(str(path), "v1") == "a" * 16 + "b" * 16
+
+
+def test_restore_keeps_the_permissions_of_the_existing_file(store, tmp_path) -> None:
+    path = tmp_path / "script.sh"
+    path.write_text("old")
+    store.save(str(path), str(path), "v1")
+    path.write_text("new")
+    os.chmod(path, 0o750)
+
+    store.restore(str(path), "v1", str(path))
+
+    assert path.read_text() == "old"
+    assert path.stat().st_mode & 0o7777 == 0o750
+
+
+def test_restore_to_a_new_file_applies_the_umask(store, tmp_path) -> None:
+    path = tmp_path / "data.txt"
+    path.write_text("content")
+    store.save(str(path), str(path), "v1")
+    target = tmp_path / "restored" / "data.txt"
+
+    store.restore(str(path), "v1", str(target))
+
+    assert target.read_text() == "content"
+    assert target.stat().st_mode & 0o777 == 0o666 & ~UMASK
+    assert os.listdir(target.parent) == ["data.txt"]
+
+
+def test_unknown_version_is_rejected(store, tmp_path) -> None:
+    with pytest.raises(KeyError):
+        store.restore(str(tmp_path / "data.txt"), "v1", str(tmp_path / "data.txt"))
+    assert not (tmp_path / "data.txt").exists()
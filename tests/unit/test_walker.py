@@ -0,0 +1,105 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Unit tests for the scandir tree walker of the file handler agent."""
+
+import os
+
+import pytest
+
+from app.SUB_AGENTS.file_handler_agent.walker import compile_name_filter, walk
+
+
+@pytest.fixture
+def tree(tmp_path):
+    for relpath in ["a.txt", "b.py", "sub/c.txt", "sub/deeper/d.txt", "sub/deeper/e.py", "z/f.txt"]:
+        path = tmp_path / relpath
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(relpath)
+    return tmp_path
+
+
+def _relpaths(root, **kwargs) -> list:
+    return [entry.relpath.replace(os.sep, "/") for entry in walk(str(root), **kwargs)]
+
+
+def test_walk_matches_os_walk(tree) -> None:
+    expected = sorted(
+        os.path.relpath(os.path.join(directory, name), tree).replace(os.sep, "/")
+        for directory, _, files in os.walk(tree) for name in files
+    )
+
+    assert sorted(_relpaths(tree)) == expected
+
+
+def test_sorted_walk_is_depth_first_pre_order(tree) -> None:
+    assert _relpaths(tree, sort=True, include_dirs=True) == [
+        "a.txt", "b.py", "sub", "sub/c.txt", "sub/deeper", "sub/deeper/d.txt", "sub/deeper/e.py", "z", "z/f.txt",
+    ]
+
+
+def test_pattern_filters_files_only(tree) -> None:
+    assert _relpaths(tree, pattern="*.py", sort=True, include_dirs=True) == [
+        "b.py", "sub", "sub/deeper", "sub/deeper/e.py", "z",
+    ]
+    assert _relpaths(tree, pattern=r"^[cd]\.", use_regex=True, sort=True) == ["sub/c.txt", "sub/deeper/d.txt"]
+
+
+def test_depth_limits(tree) -> None:
+    assert _relpaths(tree, recursive=False, sort=True) == ["a.txt", "b.py"]
+    assert _relpaths(tree, max_depth=1, sort=True) == ["a.txt", "b.py", "sub/c.txt", "z/f.txt"]
+    assert [entry.depth for entry in walk(str(tree), sort=True)] == [0, 0, 1, 2, 2, 1]
+
+
+def test_excluded_directories_are_not_descended(tree) -> None:
+    assert _relpaths(tree, sort=True, include_dirs=True, exclude_dirs=[str(tree / "sub")]) == [
+        "a.txt", "b.py", "z", "z/f.txt",
+    ]
+
+
+@pytest.mark.parametrize("page_size", [1, 2, 4])
+def test_start_after_resumes_a_sorted_walk(tree, page_size: int) -> None:
+    full = _relpaths(tree, sort=True, include_dirs=True)
+    pages = []
+    cursor = None
+    while True:
+        page = _relpaths(tree, sort=True, include_dirs=True, start_after=cursor)[:page_size]
+        if not page:
+            break
+        pages.extend(page)
+        cursor = page[-1]
+
+    assert pages == full
+
+
+def test_start_after_requires_sort(tree) -> None:
+    with pytest.raises(ValueError):
+        list(walk(str(tree), start_after="a.txt"))
+
+
+def test_symlinked_directories_are_only_followed_on_request(tree) -> None:
+    os.symlink(tree / "z", tree / "link")
+
+    assert "link/f.txt" not in _relpaths(tree)
+    assert "link/f.txt" in _relpaths(tree, follow_symlinks=True)
+
+
+def test_missing_root_raises(tmp_path) -> None:
+    with pytest.raises(OSError):
+        list(walk(str(tmp_path / "missing")))
+
+
+def test_compile_name_filter() -> None:
+    assert compile_name_filter()("anything")
+    assert compile_name_filter("*.txt")("notes.txt") and not compile_name_filter("*.txt")("notes.py")
+    assert compile_name_filter("te", use_regex=True)("notes.txt")